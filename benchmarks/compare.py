@@ -0,0 +1,31 @@
+"""
+对比两次压测结果
+运行方式: python benchmarks/compare.py before.json after.json
+"""
+import json
+import sys
+
+
+def main():
+    if len(sys.argv) != 3:
+        raise SystemExit('用法: python benchmarks/compare.py before.json after.json')
+    with open(sys.argv[1], encoding='utf-8') as f:
+        before = json.load(f)
+    with open(sys.argv[2], encoding='utf-8') as f:
+        after = json.load(f)
+
+    print(f'提交: {before.get("commit", "?")} -> {after.get("commit", "?")}')
+    print(f'总 RPS: {before["total_rps"]} -> {after["total_rps"]}')
+    print(f'{"接口":<14}{"RPS":>18}{"p50(ms)":>20}{"p95(ms)":>20}{"p99(ms)":>20}')
+    for name in sorted(set(before['endpoints']) | set(after['endpoints'])):
+        b = before['endpoints'].get(name, {})
+        a = after['endpoints'].get(name, {})
+        cols = [
+            f'{b.get(key, "-")} -> {a.get(key, "-")}'
+            for key in ('rps', 'p50_ms', 'p95_ms', 'p99_ms')
+        ]
+        print(f'{name:<14}{cols[0]:>18}{cols[1]:>20}{cols[2]:>20}{cols[3]:>20}')
+
+
+if __name__ == '__main__':
+    main()
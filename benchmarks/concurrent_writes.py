@@ -0,0 +1,118 @@
+"""
+SQLite 并发写入压测
+多个进程同时模拟借书、还书，统计 "database is locked" 错误次数，
+对比默认配置与 config/db.py 中 WAL 等优化配置的差异。
+
+运行方式: python benchmarks/concurrent_writes.py --processes 8 --duration 10
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django():
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def worker(index, duration, queue):
+    """模拟借还书：借书在一个事务中先查询可借副本再更新"""
+    from django.db import OperationalError, transaction
+    from django.utils import timezone
+    from books.models import BookCopy, BorrowRecord
+
+    ops = locked = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        try:
+            with transaction.atomic():
+                copy = BookCopy.objects.filter(status='available').order_by('?').first()
+                if copy is None:
+                    continue
+                BookCopy.objects.filter(pk=copy.pk).update(status='borrowed')
+                record = BorrowRecord.objects.create(user_id=index + 1, book_id=copy.book_id, book_copy=copy)
+            with transaction.atomic():
+                BorrowRecord.objects.filter(pk=record.pk).update(status='returned', return_date=timezone.now())
+                BookCopy.objects.filter(pk=copy.pk).update(status='available')
+            ops += 1
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            locked += 1
+    queue.put((ops, locked))
+
+
+def run(processes, duration):
+    """在当前环境变量指定的数据库上执行一轮压测"""
+    setup_django()
+    from django.core.management import call_command
+    from django.db import connections
+    from books.models import Book, BookCopy
+    from users.models import User
+
+    call_command('migrate', verbosity=0)
+    User.objects.bulk_create([User(username=f'writer{i}') for i in range(processes)])
+    for i in range(50):
+        book = Book.objects.create(isbn=f'978{i:010d}', title=f'并发测试 {i}', author='测试')
+        BookCopy.objects.create_many(book, 10)
+    connections.close_all()
+
+    queue = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=worker, args=(i, duration, queue))
+        for i in range(processes)
+    ]
+    for p in workers:
+        p.start()
+    results = [queue.get() for _ in workers]
+    for p in workers:
+        p.join()
+
+    ops = sum(r[0] for r in results)
+    locked = sum(r[1] for r in results)
+    return {
+        'operations': ops,
+        'lock_errors': locked,
+        'ops_per_second': round(ops / duration, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite 并发写入压测')
+    parser.add_argument('--processes', type=int, default=8, help='并发进程数')
+    parser.add_argument('--duration', type=float, default=10, help='每轮时长（秒）')
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run(args.processes, args.duration)))
+        return
+
+    # 每种配置在独立进程和独立数据库文件中运行
+    results = {}
+    for name, tuning in [('default', '0'), ('tuned', '1')]:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DB_ENGINE='sqlite', DB_NAME=os.path.join(tmp, 'bench.sqlite3'),
+                       DB_SQLITE_TUNING=tuning, DB_REPLICAS='')
+            output = subprocess.check_output(
+                [sys.executable, os.path.abspath(__file__), '--single',
+                 '--processes', str(args.processes), '--duration', str(args.duration)],
+                env=env, text=True,
+            )
+            results[name] = json.loads(output.strip().splitlines()[-1])
+            print(f'{name:>8}: {results[name]}')
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
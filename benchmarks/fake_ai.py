@@ -0,0 +1,70 @@
+"""
+本地模拟的 AI 服务（兼容 OpenAI chat/completions 格式）
+运行方式: python benchmarks/fake_ai.py --port 9100 --delay 0.5
+
+压测时设置:
+AI_API_KEY=fake AI_API_URL=http://127.0.0.1:9100/v1/chat/completions
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+RECOMMEND_CONTENT = json.dumps({
+    'recommendations': [
+        {'title': '测试图书 1', 'reason': '模拟推荐'},
+        {'title': '测试图书 2', 'reason': '模拟推荐'},
+    ],
+    'summary': '模拟 AI 推荐结果',
+}, ensure_ascii=False)
+
+CHAT_CONTENT = '推荐您阅读《测试图书 1》【本馆有藏】，这是一本模拟回复中的图书。'
+
+
+class FakeAIHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except json.JSONDecodeError:
+            payload = {}
+        time.sleep(self.delay)
+
+        # 推荐接口要求返回 JSON 内容，对话接口返回普通文本
+        prompt = json.dumps(payload.get('messages', []), ensure_ascii=False)
+        content = RECOMMEND_CONTENT if 'JSON' in prompt else CHAT_CONTENT
+        body = json.dumps({
+            'choices': [{'message': {'role': 'assistant', 'content': content}}]
+        }, ensure_ascii=False).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟 AI 服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--delay', type=float, default=0.5, help='每个请求的模拟延迟（秒）')
+    args = parser.parse_args()
+
+    FakeAIHandler.delay = args.delay
+    server = ThreadingHTTPServer((args.host, args.port), FakeAIHandler)
+    print(f'模拟 AI 服务已启动: http://{args.host}:{args.port}/v1/chat/completions (延迟 {args.delay}s)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
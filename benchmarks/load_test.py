@@ -0,0 +1,231 @@
+"""
+图书管理系统压测脚本
+按真实比例混合浏览、搜索、详情、借还、预约和 AI 请求，输出每个接口的
+p50/p95/p99 延迟和每秒请求数（JSON），便于在不同提交之间对比。
+
+使用方法：
+1. 生成数据:   python benchmarks/generate_data.py --books 10000 --users 500
+2. 模拟 AI:    python benchmarks/fake_ai.py --port 9100 --delay 0.5
+3. 启动服务:   RATELIMIT_ENABLED=0 AI_API_KEY=fake AI_API_URL=http://127.0.0.1:9100/v1/chat/completions \\
+               gunicorn config.wsgi -w 4 -b 127.0.0.1:8000
+4. 压测:       python benchmarks/load_test.py --base-url http://127.0.0.1:8000 \\
+               --concurrency 16 --duration 60 --books 10000 --users 500 -o result.json
+5. 对比:       python benchmarks/compare.py before.json after.json
+
+所有压测客户端来自同一个 IP，登录（每分钟 10 次）和 AI 对话（每用户每分钟 10 次）会触发频率限制，
+压测时应关闭频率限制（RATELIMIT_ENABLED=0）。被限流的请求（429）单独计入 limited，不计入 errors。
+"""
+import argparse
+import json
+import random
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+
+# 操作 -> 权重
+WORKLOAD = {
+    'browse': 35,
+    'search': 20,
+    'detail': 25,
+    'borrow_return': 8,
+    'reserve': 4,
+    'ai_chat': 4,
+    'ai_recommend': 4,
+}
+
+SEARCH_KEYWORDS = ['测试', '图书', '作者 1', '出版社', 'Python', '历史', '979']
+
+RECORD_RE = re.compile(r'/record/(\d+)/return/')
+
+
+def percentile(values, p):
+    if not values:
+        return 0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class Stats:
+    """线程安全的延迟记录"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.limited = {}
+
+    def record(self, name, elapsed, ok, limited=False):
+        with self.lock:
+            self.latencies.setdefault(name, []).append(elapsed)
+            if limited:
+                self.limited[name] = self.limited.get(name, 0) + 1
+            elif not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self, duration):
+        result = {}
+        for name, values in sorted(self.latencies.items()):
+            result[name] = {
+                'count': len(values),
+                'errors': self.errors.get(name, 0),
+                'limited': self.limited.get(name, 0),
+                'rps': round(len(values) / duration, 2),
+                'mean_ms': round(sum(values) / len(values) * 1000, 2),
+                'p50_ms': round(percentile(values, 50) * 1000, 2),
+                'p95_ms': round(percentile(values, 95) * 1000, 2),
+                'p99_ms': round(percentile(values, 99) * 1000, 2),
+            }
+        return result
+
+
+class Worker:
+    """模拟一个已登录的读者"""
+
+    def __init__(self, base_url, username, password, args, stats):
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        self.username = username
+        self.password = password
+        self.args = args
+        self.stats = stats
+        self.rng = random.Random(username)
+
+    def request(self, name, method, path, **kwargs):
+        kwargs.setdefault('allow_redirects', False)
+        kwargs.setdefault('timeout', self.args.timeout)
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, **kwargs)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        limited = response is not None and response.status_code == 429
+        self.stats.record(name, time.perf_counter() - start, ok, limited)
+        return response
+
+    def csrf_token(self):
+        return self.session.cookies.get('csrftoken', '')
+
+    def login(self):
+        self.session.get(self.base_url + '/users/login/', timeout=self.args.timeout)
+        response = self.session.post(self.base_url + '/users/login/', data={
+            'username': self.username,
+            'password': self.password,
+            'csrfmiddlewaretoken': self.csrf_token(),
+        }, allow_redirects=False, timeout=self.args.timeout)
+        return response.status_code == 302
+
+    def random_book(self):
+        return self.rng.randint(self.args.first_book, self.args.first_book + self.args.books - 1)
+
+    def browse(self):
+        page = self.rng.randint(1, max(1, self.args.books // 12))
+        self.request('browse', 'GET', f'/?page={page}')
+
+    def search(self):
+        params = {'keyword': self.rng.choice(SEARCH_KEYWORDS)}
+        if self.rng.random() < 0.3:
+            params['available_only'] = 'on'
+        if self.rng.random() < 0.3:
+            params['sort'] = self.rng.choice(['popular', 'newest', 'available'])
+        self.request('search', 'GET', '/', params=params)
+
+    def detail(self):
+        self.request('detail', 'GET', f'/book/{self.random_book()}/')
+
+    def borrow_return(self):
+        self.request('borrow', 'GET', f'/book/{self.random_book()}/borrow/')
+        response = self.request('profile', 'GET', '/users/profile/')
+        if response is not None:
+            record_ids = RECORD_RE.findall(response.text)
+            if record_ids:
+                self.request('return', 'GET', f'/record/{self.rng.choice(record_ids)}/return/')
+
+    def reserve(self):
+        self.request('reserve', 'GET', f'/book/{self.random_book()}/reserve/')
+
+    def ai_chat(self):
+        self.request('ai_chat', 'POST', '/chat/api/', json={'message': '推荐几本好书', 'history': []},
+                     headers={'X-CSRFToken': self.csrf_token()})
+
+    def ai_recommend(self):
+        self.request('ai_recommend', 'GET', '/recommend/')
+
+    def run(self, deadline, operations):
+        while time.monotonic() < deadline:
+            getattr(self, self.rng.choices(operations[0], weights=operations[1])[0])()
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='图书管理系统压测')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--concurrency', type=int, default=8, help='并发用户数（线程数）')
+    parser.add_argument('--duration', type=float, default=30, help='压测时长（秒）')
+    parser.add_argument('--books', type=int, default=1000, help='图书数量（ID 连续）')
+    parser.add_argument('--first-book', type=int, default=1, help='起始图书 ID')
+    parser.add_argument('--users', type=int, default=50, help='可用读者数量（reader0 ~ readerN-1）')
+    parser.add_argument('--password', default='test123')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--no-ai', action='store_true', help='不发送 AI 请求')
+    parser.add_argument('-o', '--output', help='结果输出文件，默认输出到标准输出')
+    args = parser.parse_args()
+
+    workload = {k: v for k, v in WORKLOAD.items() if not (args.no_ai and k.startswith('ai_'))}
+    operations = (list(workload), list(workload.values()))
+
+    stats = Stats()
+    workers = [
+        Worker(args.base_url, f'reader{i % args.users}', args.password, args, stats)
+        for i in range(args.concurrency)
+    ]
+    for worker in workers:
+        if not worker.login():
+            raise SystemExit(f'用户 {worker.username} 登录失败，请先运行 generate_data.py，'
+                             f'并以 RATELIMIT_ENABLED=0 启动服务')
+
+    start = time.monotonic()
+    deadline = start + args.duration
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [executor.submit(worker.run, deadline, operations) for worker in workers]
+        # 取结果使 worker 线程中的异常在这里抛出，而不是被静默丢弃
+        for future in futures:
+            future.result()
+    duration = time.monotonic() - start
+
+    endpoints = stats.summary(duration)
+    total = sum(e['count'] for e in endpoints.values())
+    result = {
+        'commit': git_commit(),
+        'config': {
+            'base_url': args.base_url,
+            'concurrency': args.concurrency,
+            'duration': round(duration, 2),
+            'books': args.books,
+            'users': args.users,
+            'workload': workload,
+        },
+        'total_requests': total,
+        'total_rps': round(total / duration, 2),
+        'endpoints': endpoints,
+    }
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+会话存储压测
+以同一组请求（匿名浏览、登录、借书、还书、个人中心）分别在不同的 SESSION_ENGINE 下运行，
+统计每个请求对 django_session 表的读写次数和其他写操作次数。
+
+运行方式: python benchmarks/session_writes.py --rounds 20
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENGINES = ['db', 'cached_db', 'signed_cookies']
+
+
+class QueryCounter:
+    """connection.execute_wrapper 回调，按类型统计 SQL"""
+
+    def __init__(self):
+        self.session_reads = 0
+        self.session_writes = 0
+        self.other_writes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        is_write = sql.lstrip().split(' ', 1)[0].upper() in ('INSERT', 'UPDATE', 'DELETE')
+        if 'django_session' in sql:
+            if is_write:
+                self.session_writes += 1
+            else:
+                self.session_reads += 1
+        elif is_write:
+            self.other_writes += 1
+        return execute(sql, params, many, context)
+
+
+def run(rounds):
+    """在当前环境变量指定的数据库和会话配置下执行一轮压测"""
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test import Client
+    from django.urls import reverse
+    from books.models import BorrowRecord
+    from books.sample_data import build_library
+
+    call_command('migrate', verbosity=0)
+    data = build_library(books=200, users=5, records=100, reservations=10)
+    book_id = data['book_ids'][-1]
+
+    counter = QueryCounter()
+    requests = 0
+
+    def request(client, method, url, data=None):
+        nonlocal requests
+        requests += 1
+        with connection.execute_wrapper(counter):
+            return getattr(client, method)(url, data or {})
+
+    for _ in range(rounds):
+        client = Client()
+        request(client, 'get', reverse('books:index'))
+        request(client, 'get', reverse('books:detail', args=[book_id]))
+        request(client, 'get', reverse('users:login'))
+        request(client, 'post', reverse('users:login'), {'username': 'reader0', 'password': 'test123'})
+        request(client, 'get', reverse('books:index'))
+        request(client, 'get', reverse('books:borrow', args=[book_id]))
+        request(client, 'get', reverse('books:detail', args=[book_id]))
+        record = BorrowRecord.objects.filter(
+            user__username='reader0', book_id=book_id, status='borrowed'
+        ).latest('borrow_date')
+        request(client, 'get', reverse('books:return', args=[record.pk]))
+        request(client, 'get', reverse('users:profile'))
+        request(client, 'get', reverse('books:my_reservations'))
+        request(client, 'get', reverse('users:logout'))
+
+    return {
+        'requests': requests,
+        'session_reads_per_request': round(counter.session_reads / requests, 2),
+        'session_writes_per_request': round(counter.session_writes / requests, 2),
+        'other_writes_per_request': round(counter.other_writes / requests, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='会话存储压测')
+    parser.add_argument('--rounds', type=int, default=20, help='每种配置重复执行的轮数')
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run(args.rounds)))
+        return
+
+    # 每种配置在独立进程、独立数据库和独立缓存目录中运行
+    results = {}
+    for engine in ENGINES:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, SESSION_ENGINE=engine, DB_ENGINE='sqlite',
+                       DB_NAME=os.path.join(tmp, 'bench.sqlite3'), DB_REPLICAS='',
+                       CACHE_DIR=os.path.join(tmp, 'cache'), REDIS_URL='')
+            output = subprocess.check_output(
+                [sys.executable, os.path.abspath(__file__), '--single', '--rounds', str(args.rounds)],
+                env=env, text=True,
+            )
+            results[engine] = json.loads(output.strip().splitlines()[-1])
+            print(f'{engine:>15}: {results[engine]}')
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
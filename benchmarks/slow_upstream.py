@@ -0,0 +1,145 @@
+"""
+慢速 AI 上游压测
+模拟 AI 接口响应很慢（默认 10 秒）时，AI 对话请求对图书目录页面的影响：
+  - sync:  所有请求由同一组同步 worker 处理（原部署方式），每个 AI 请求占用一个 worker 直到上游返回
+  - split: 按 gunicorn.conf.py 部署，页面由同步 worker 处理，AI 接口由单独的 Uvicorn worker（config.asgi）处理，
+           压测客户端按路径把请求发往不同端口，相当于 Nginx 的转发规则
+两种部署的页面 worker 数量相同。输出首页、详情页和 AI 对话的请求数、错误数和延迟分位数（JSON）。
+
+运行方式: python benchmarks/slow_upstream.py --delay 10 --ai-clients 16 --catalog-clients 4 --duration 30
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+import requests
+from fake_ai import FakeAIHandler
+from load_test import Stats, Worker
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+WEB_PORT = 8101
+AI_PORT = 8102
+FAKE_AI_PORT = 9101
+
+CATALOG_OPERATIONS = (['browse', 'detail'], [1, 1])
+AI_OPERATIONS = (['ai_chat'], [1])
+
+
+def prepare_database(env, args):
+    subprocess.run([sys.executable, 'manage.py', 'migrate', '-v', '0'], cwd=ROOT, env=env, check=True)
+    subprocess.run([
+        sys.executable, os.path.join(BENCHMARK_DIR, 'generate_data.py'),
+        '--books', str(args.books), '--users', str(args.users),
+        '--loans', str(args.books), '--reservations', '0',
+    ], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+
+
+def start_gunicorn(env, role, port, workers):
+    env = dict(env, GUNICORN_ROLE=role, GUNICORN_BIND=f'127.0.0.1:{port}', GUNICORN_WORKERS=str(workers),
+               GUNICORN_TIMEOUT='120')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f'http://127.0.0.1:{port}/users/login/', timeout=5)
+            return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit(f'Gunicorn（{role}）未能在 127.0.0.1:{port} 启动')
+
+
+def run_clients(web_url, ai_url, args):
+    stats = Stats()
+    # load_test.Worker 需要的参数
+    worker_args = argparse.Namespace(timeout=120, first_book=1, books=args.books)
+    clients = [
+        (Worker(web_url, f'reader{i % args.users}', 'test123', worker_args, stats), CATALOG_OPERATIONS)
+        for i in range(args.catalog_clients)
+    ] + [
+        (Worker(ai_url, f'reader{i % args.users}', 'test123', worker_args, stats), AI_OPERATIONS)
+        for i in range(args.ai_clients)
+    ]
+    for client, _ in clients:
+        if not client.login():
+            raise SystemExit(f'用户 {client.username} 登录失败')
+
+    start = time.monotonic()
+    deadline = start + args.duration
+    with ThreadPoolExecutor(max_workers=len(clients)) as executor:
+        futures = [executor.submit(client.run, deadline, operations) for client, operations in clients]
+        for future in futures:
+            future.result()
+    return stats.summary(time.monotonic() - start)
+
+
+def run_scenario(name, env, args):
+    processes = [start_gunicorn(env, 'web', WEB_PORT, args.workers)]
+    try:
+        if name == 'split':
+            processes.append(start_gunicorn(env, 'ai', AI_PORT, 1))
+            ai_url = f'http://127.0.0.1:{AI_PORT}'
+        else:
+            ai_url = f'http://127.0.0.1:{WEB_PORT}'
+        return run_clients(f'http://127.0.0.1:{WEB_PORT}', ai_url, args)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='慢速 AI 上游压测')
+    parser.add_argument('--delay', type=float, default=10, help='模拟 AI 服务的响应延迟（秒）')
+    parser.add_argument('--ai-clients', type=int, default=16, help='持续发送 AI 对话请求的用户数')
+    parser.add_argument('--catalog-clients', type=int, default=4, help='持续浏览首页和详情页的用户数')
+    parser.add_argument('--workers', type=int, default=3, help='页面 worker 数量')
+    parser.add_argument('--duration', type=float, default=30, help='每种部署的压测时长（秒）')
+    parser.add_argument('--books', type=int, default=500)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--scenarios', default='sync,split')
+    args = parser.parse_args()
+
+    FakeAIHandler.delay = args.delay
+    fake_ai = ThreadingHTTPServer(('127.0.0.1', FAKE_AI_PORT), FakeAIHandler)
+    fake_ai.daemon_threads = True
+    threading.Thread(target=fake_ai.serve_forever, daemon=True).start()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE='config.settings',
+            DB_NAME=os.path.join(tmp, 'bench.sqlite3'),
+            CACHE_DIR=os.path.join(tmp, 'cache'),
+            AI_API_KEY='fake',
+            AI_API_URL=f'http://127.0.0.1:{FAKE_AI_PORT}/v1/chat/completions',
+            RATELIMIT_ENABLED='0',
+        )
+        prepare_database(env, args)
+        for name in args.scenarios.split(','):
+            results[name] = run_scenario(name, env, args)
+    fake_ai.shutdown()
+
+    for name, endpoints in results.items():
+        for endpoint in ('browse', 'detail', 'ai_chat'):
+            e = endpoints.get(endpoint)
+            if e:
+                print(f'{name:>6} {endpoint:>8}: {e["count"]:5d} 个请求 错误 {e["errors"]:3d}  '
+                      f'p50 {e["p50_ms"]:8.1f} ms  p95 {e["p95_ms"]:8.1f} ms  p99 {e["p99_ms"]:8.1f} ms')
+    print(json.dumps({'config': vars(args), 'results': results}, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+静态文件传输量测试
+模拟浏览器打开首页时加载的静态文件（样式表、脚本、图片和样式表引用的 woff2 字体），
+统计首次访问和再次访问时的请求数和传输字节数：
+  - before: collectstatic 原样复制，不压缩，文件名不带哈希，再次访问时逐个发送条件请求
+  - after: config/storage.py 处理后的文件（裁剪样式表、内容哈希、预压缩），由 config/static.py 提供，
+           带哈希的文件一年内不再请求
+只统计响应体字节数，不含响应头。
+
+运行方式: python benchmarks/static_transfer.py
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+from urllib.parse import quote, unquote
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGE_TEMPLATES = ['templates/base.html', 'templates/books/index.html']
+STATIC_TAG_RE = re.compile(r"""\{%\s*static\s+['"]([^'"]+)['"]\s*%\}""")
+FONT_URL_RE = re.compile(r'url\("?([^")]+\.woff2)[^)]*\)')
+
+CONFIGS = {
+    'before': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    'after': 'config.storage.CompressedManifestStaticFilesStorage',
+}
+
+
+def page_assets():
+    names = []
+    for template in PAGE_TEMPLATES:
+        with open(os.path.join(ROOT, template), encoding='utf-8') as f:
+            for name in STATIC_TAG_RE.findall(f.read()):
+                if name not in names:
+                    names.append(name)
+    return names
+
+
+def not_found(environ, start_response):
+    start_response('404 Not Found', [])
+    return []
+
+
+def request(app, path, accept_encoding, etag=None):
+    environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'HTTP_ACCEPT_ENCODING': accept_encoding}
+    if etag:
+        environ['HTTP_IF_NONE_MATCH'] = etag
+    result = {}
+
+    def start_response(status, headers):
+        result['status'] = int(status.split()[0])
+        result['headers'] = dict(headers)
+
+    body = b''.join(app(environ, start_response))
+    result['bytes'] = len(body)
+    return result
+
+
+def measure(storage_backend, accept_encoding):
+    from django.conf import settings
+    from django.contrib.staticfiles.storage import staticfiles_storage
+    from django.core.management import call_command
+    from django.test.utils import override_settings
+    from config.static import StaticFilesMiddleware
+
+    with tempfile.TemporaryDirectory() as root:
+        storages = dict(settings.STORAGES, staticfiles={'BACKEND': storage_backend})
+        with override_settings(STATIC_ROOT=root, STORAGES=storages):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            app = StaticFilesMiddleware(not_found, root, settings.STATIC_URL)
+            # DEBUG 下 url() 不使用带哈希的文件名，这里直接取 collectstatic 保存的文件名
+            stored_name = getattr(staticfiles_storage, 'stored_name', lambda name: name)
+            urls = [settings.STATIC_URL + quote(stored_name(name)) for name in page_assets()]
+
+            first = []
+            for url in urls:
+                response = request(app, url, accept_encoding)
+                first.append((url, response))
+                if url.endswith('.css'):
+                    # 样式表引用的字体，从未压缩的文件中查找
+                    path = os.path.join(root, unquote(url[len(settings.STATIC_URL):]))
+                    with open(path, encoding='utf-8') as f:
+                        for font_url in FONT_URL_RE.findall(f.read()):
+                            first.append((font_url, request(app, font_url, accept_encoding)))
+
+            repeat = []
+            for url, response in first:
+                if 'immutable' in response['headers'].get('Cache-Control', ''):
+                    continue
+                repeat.append(request(app, url, accept_encoding, response['headers'].get('ETag')))
+
+    return {
+        'first_requests': len(first),
+        'first_bytes': sum(r['bytes'] for _, r in first),
+        'repeat_requests': len(repeat),
+        'repeat_bytes': sum(r['bytes'] for r in repeat),
+        'files': {url: r['bytes'] for url, r in first},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='静态文件传输量测试')
+    parser.add_argument('--accept-encoding', default='gzip, deflate, br', help='模拟的浏览器 Accept-Encoding')
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+    results = {name: measure(backend, args.accept_encoding) for name, backend in CONFIGS.items()}
+    for name, result in results.items():
+        print(f'{name:>7}: 首次访问 {result["first_requests"]} 个请求 {result["first_bytes"] / 1024:.1f} KB，'
+              f'再次访问 {result["repeat_requests"]} 个请求 {result["repeat_bytes"] / 1024:.1f} KB')
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
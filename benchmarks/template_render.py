@@ -0,0 +1,114 @@
+"""
+首页模板渲染压测
+分别在 12 张和 48 张图书卡片下，对比以下配置渲染 books/index.html 的平均耗时：
+  - uncached: 不缓存模板，每次渲染都重新读取和编译模板文件
+  - cached_loader: 缓存模板加载器（config/settings_production.py）
+  - fragments: 缓存模板加载器 + 片段缓存（已预热）
+查询集在计时前已经取出，只统计模板渲染本身（片段未命中时分类下拉框仍需查询分类表）。
+
+运行方式: python benchmarks/template_render.py --rounds 200
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CARD_COUNTS = [12, 48]
+
+FILESYSTEM_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+# DummyCache 不保存任何内容，{% cache %} 每次都重新渲染
+DUMMY_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def templates_setting(loaders):
+    from django.conf import settings
+    template = dict(settings.TEMPLATES[0], APP_DIRS=False)
+    template['OPTIONS'] = dict(template['OPTIONS'], loaders=loaders)
+    return [template]
+
+
+def run(rounds):
+    """在当前环境变量指定的数据库上执行一轮压测"""
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+    from django.contrib.auth.models import AnonymousUser
+    from django.core.management import call_command
+    from django.core.paginator import Paginator
+    from django.template.loader import render_to_string
+    from django.test import RequestFactory
+    from django.test.utils import override_settings
+    from books.forms import BookSearchForm
+    from books.models import Book
+    from books.sample_data import build_library
+
+    call_command('migrate', verbosity=0)
+    build_library(books=100, users=5, records=50, reservations=5)
+
+    configs = {
+        'uncached': (FILESYSTEM_LOADERS, DUMMY_CACHE),
+        'cached_loader': ([('django.template.loaders.cached.Loader', FILESYSTEM_LOADERS)], DUMMY_CACHE),
+        'fragments': ([('django.template.loaders.cached.Loader', FILESYSTEM_LOADERS)], LOCMEM_CACHE),
+    }
+
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+
+    results = {}
+    for cards in CARD_COUNTS:
+        books = Book.objects.select_related('category').prefetch_related('copies')
+        page = Paginator(books, cards).get_page(1)
+        list(page)
+        context = {'books': page, 'form': BookSearchForm({})}
+        results[cards] = {}
+        for name, (loaders, caches) in configs.items():
+            with override_settings(TEMPLATES=templates_setting(loaders), CACHES=caches):
+                # 预热：缓存加载器编译模板，片段写入缓存
+                render_to_string('books/index.html', context, request)
+                start = time.perf_counter()
+                for _ in range(rounds):
+                    render_to_string('books/index.html', context, request)
+                elapsed = time.perf_counter() - start
+            results[cards][name] = round(elapsed / rounds * 1000, 3)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='首页模板渲染压测')
+    parser.add_argument('--rounds', type=int, default=200, help='每种配置渲染的次数')
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run(args.rounds)))
+        return
+
+    # 在独立进程和独立数据库文件中运行
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DB_ENGINE='sqlite', DB_NAME=os.path.join(tmp, 'bench.sqlite3'), DB_REPLICAS='')
+        output = subprocess.check_output(
+            [sys.executable, os.path.abspath(__file__), '--single', '--rounds', str(args.rounds)],
+            env=env, text=True,
+        )
+    results = json.loads(output.strip().splitlines()[-1])
+
+    print(f'{"卡片数":<8}' + ''.join(f'{name + "(ms)":>20}' for name in results[str(CARD_COUNTS[0])]))
+    for cards, timings in results.items():
+        print(f'{cards:<8}' + ''.join(f'{ms:>20}' for ms in timings.values()))
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
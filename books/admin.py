@@ -1,11 +1,57 @@
+from django import forms
 from django.contrib import admin
-from .models import Category, Book, BookCopy, BorrowRecord, Reservation
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.html import format_html
+from users.models import User
+from .models import ArchivedBorrowRecord, Category, Book, BookCopy, BorrowRecord, Reservation, soft_delete_books
+from .paginators import EstimatedCountPaginator
+
+
+def isbn_search_term(search_term):
+    """搜索词是 ISBN 时返回去掉连字符的 ISBN，否则返回 None"""
+    isbn = search_term.strip().replace('-', '')
+    if isbn.isdigit() and len(isbn) in (10, 13):
+        return isbn
+    return None
+
+
+class LoanAdminMixin:
+    """
+    借阅记录和归档记录后台的公共部分。
+    搜索时先在用户、图书、副本表上找出匹配的ID，再按借阅表的外键索引筛选，
+    不对借阅表做连接后逐行 LIKE，也不需要 DISTINCT
+    """
+    search_help_text = '按用户名、书名、ISBN 或副本编号/条码搜索'
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        isbn = isbn_search_term(term)
+        if isbn:
+            books = Book.all_objects.filter(isbn__in=[term, isbn])
+        else:
+            books = Book.all_objects.filter(title__icontains=term)
+        users = User.objects.filter(username__istartswith=term)
+        copies = BookCopy.objects.filter(Q(copy_number=term) | Q(barcode=term))
+        queryset = queryset.filter(
+            Q(book_id__in=books.values('pk'))
+            | Q(user_id__in=users.values('pk'))
+            | Q(book_copy_id__in=copies.values('pk'))
+        )
+        return queryset, False
+
+    # 副本的 __str__ 会访问副本所属图书，列表中只显示副本编号
+    @admin.display(description='图书副本', ordering='book_copy__copy_number')
+    def copy_number(self, obj):
+        return obj.book_copy.copy_number if obj.book_copy else '-'
 
 
 class BookCopyInline(admin.TabularInline):
     """图书副本内联管理"""
     model = BookCopy
-    extra = 1
+    extra = 0
     fields = ['copy_number', 'status', 'condition', 'notes']
 
 
@@ -15,34 +61,101 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ['name']
 
 
+class BookAdminForm(forms.ModelForm):
+
+    def clean_isbn(self):
+        # 默认管理器不包含已删除的图书，唯一性校验查不到它们，保存时会违反唯一约束
+        isbn = self.cleaned_data['isbn']
+        if Book.all_objects.filter(isbn=isbn, deleted_at__isnull=False).exclude(pk=self.instance.pk).exists():
+            raise forms.ValidationError('该ISBN属于已删除的图书，请在前台“添加图书”页面输入该ISBN恢复该图书')
+        return isbn
+
+
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
-    list_display = ['title', 'author', 'isbn', 'category', 'available_copies', 'total_copies', 'created_at']
+    form = BookAdminForm
+    # 可借副本数和副本总数使用冗余字段，不再每行执行 COUNT
+    list_display = ['title', 'author', 'isbn', 'category', 'available_count', 'total_count', 'created_at']
+    list_select_related = ['category']
     list_filter = ['category', 'publisher']
     search_fields = ['title', 'author', 'isbn']
     ordering = ['-created_at']
     inlines = [BookCopyInline]
+    readonly_fields = ['copy_management']
+    show_full_result_count = False
+    # 副本超过该数量时不在编辑页内联显示，改用前台的副本管理页（分页、批量修改状态）
+    inline_copy_limit = 50
+
+    def get_inlines(self, request, obj):
+        if obj is not None and obj.copies.count() > self.inline_copy_limit:
+            return []
+        return super().get_inlines(request, obj)
+
+    @admin.display(description='副本管理')
+    def copy_management(self, obj):
+        if obj.pk is None:
+            return '-'
+        return format_html('<a href="{}">批量管理副本</a>', reverse('books:book_copies', args=[obj.pk]))
+
+    def get_search_results(self, request, queryset, search_term):
+        # ISBN 走唯一索引精确匹配
+        isbn = isbn_search_term(search_term)
+        if isbn:
+            return queryset.filter(isbn__in=[search_term.strip(), isbn]), False
+        return super().get_search_results(request, queryset, search_term)
+
+    # 后台删除同样使用软删除
+    def delete_model(self, request, obj):
+        obj.soft_delete()
+
+    def delete_queryset(self, request, queryset):
+        soft_delete_books(queryset.values_list('pk', flat=True))
 
 
 @admin.register(BookCopy)
 class BookCopyAdmin(admin.ModelAdmin):
-    list_display = ['copy_number', 'book', 'status', 'condition', 'created_at']
+    list_display = ['copy_number', 'barcode', 'book', 'status', 'condition', 'created_at']
+    list_select_related = ['book']
     list_filter = ['status', 'book__category']
-    search_fields = ['copy_number', 'book__title']
+    search_fields = ['copy_number', 'barcode', 'book__title']
     ordering = ['book', 'copy_number']
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 @admin.register(BorrowRecord)
-class BorrowRecordAdmin(admin.ModelAdmin):
-    list_display = ['user', 'book', 'book_copy', 'borrow_date', 'due_date', 'return_date', 'status']
+class BorrowRecordAdmin(LoanAdminMixin, admin.ModelAdmin):
+    list_display = ['user', 'book', 'copy_number', 'borrow_date', 'due_date', 'return_date', 'status']
+    list_select_related = ['user', 'book', 'book_copy']
     list_filter = ['status', 'borrow_date']
+    # 搜索由 LoanAdminMixin 处理，search_fields 只用于显示搜索框
     search_fields = ['user__username', 'book__title', 'book_copy__copy_number']
     ordering = ['-borrow_date']
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+
+@admin.register(ArchivedBorrowRecord)
+class ArchivedBorrowRecordAdmin(LoanAdminMixin, admin.ModelAdmin):
+    """归档记录只读"""
+    list_display = ['user', 'book', 'copy_number', 'borrow_date', 'due_date', 'return_date']
+    list_select_related = ['user', 'book', 'book_copy']
+    search_fields = ['user__username', 'book__title']
+    ordering = ['-borrow_date']
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Reservation)
 class ReservationAdmin(admin.ModelAdmin):
     list_display = ['user', 'book', 'created_at', 'status', 'notified_at']
+    list_select_related = ['user', 'book']
     list_filter = ['status', 'created_at']
     search_fields = ['user__username', 'book__title']
     ordering = ['-created_at']
@@ -2,11 +2,23 @@
 AI 对话服务
 类似豆包的对话式图书推荐助手
 """
-import json
-import requests
+import logging
+import httpx
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from .ai_client import AIBusyError, chat_completion
+from .categories import registry
 from .models import Book, Category
 
+logger = logging.getLogger(__name__)
+
+NOT_CONFIGURED_MESSAGE = 'AI 服务暂未配置，请联系管理员。'
+TIMEOUT_MESSAGE = '请求超时，AI 服务响应较慢，请稍后再试。'
+NETWORK_ERROR_MESSAGE = '网络请求失败，请检查网络连接。'
+FORMAT_ERROR_MESSAGE = 'AI 响应格式异常，请稍后再试。'
+UNKNOWN_ERROR_MESSAGE = '发生未知错误，请稍后再试。'
+BUSY_MESSAGE = '当前咨询人数较多，请稍后再试。'
+
 
 class AIChatService:
     """AI 对话服务类"""
@@ -18,18 +30,19 @@ class AIChatService:
 
     def get_library_books_info(self):
         """获取图书馆所有图书信息，用于 AI 判断是否收录"""
-        books = Book.objects.all().select_related('category')
+        # 使用冗余的可借副本数，不逐本统计副本（每次对话都会读取全部图书）
+        books = Book.objects.values_list('id', 'title', 'author', 'category_id', 'available_count', 'description')
         return {
-            book.title: {
-                'id': book.id,
-                'title': book.title,
-                'author': book.author,
-                'category': book.category.name if book.category else '未分类',
-                'available': book.available_copies > 0,
-                'available_copies': book.available_copies,
-                'description': book.description or '',
+            title: {
+                'id': book_id,
+                'title': title,
+                'author': author,
+                'category': registry.name(category_id, '未分类'),
+                'available': available_count > 0,
+                'available_copies': available_count,
+                'description': description or '',
             }
-            for book in books
+            for book_id, title, author, category_id, available_count, description in books
         }
 
     def build_system_prompt(self, library_books):
@@ -57,29 +70,9 @@ class AIChatService:
 请用友好、专业的语气与用户对话，像一个热爱阅读的朋友一样给出建议。
 回复时可以使用 Markdown 格式来美化输出，如使用 **加粗**、*斜体*、列表等。"""
 
-    def chat(self, user_message, conversation_history=None):
-        """
-        与 AI 对话
-
-        Args:
-            user_message: 用户消息
-            conversation_history: 之前的对话历史 [{'role': 'user/assistant', 'content': '...'}]
-
-        Returns:
-            dict: {'success': bool, 'message': str, 'books_mentioned': list}
-        """
-        if not self.api_key:
-            return {
-                'success': False,
-                'message': 'AI 服务暂未配置，请联系管理员。',
-                'books_mentioned': []
-            }
-
-        library_books = self.get_library_books_info()
-        system_prompt = self.build_system_prompt(library_books)
-
-        # 构建消息列表
-        messages = [{'role': 'system', 'content': system_prompt}]
+    def build_messages(self, library_books, user_message, conversation_history=None):
+        """构建发送给 AI 的消息列表"""
+        messages = [{'role': 'system', 'content': self.build_system_prompt(library_books)}]
 
         # 添加对话历史（最多保留最近10轮对话）
         if conversation_history:
@@ -87,74 +80,77 @@ class AIChatService:
 
         # 添加当前用户消息
         messages.append({'role': 'user', 'content': user_message})
+        return messages
 
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {self.api_key}'
-        }
-
-        data = {
+    def build_request_data(self, messages):
+        """构建 AI API 请求体"""
+        return {
             'model': self.model,
             'messages': messages,
             'temperature': 0.8,
             'max_tokens': 2000
         }
 
-        try:
-            response = requests.post(self.api_url, headers=headers, json=data, timeout=60)
-            response.raise_for_status()
-            result = response.json()
-
-            # 处理可能包含 thinking 的响应格式
-            ai_message = result['choices'][0]['message']['content']
-
-            # 检查是否有 thinking 字段（某些模型会返回思考过程）
-            if 'thinking' in result['choices'][0]['message']:
-                # 只返回实际回复，不返回思考过程
-                pass
-
-            # 查找消息中提到的图书馆书籍
-            books_mentioned = []
-            for title, info in library_books.items():
-                if title in ai_message:
-                    books_mentioned.append({
-                        'id': info['id'],
-                        'title': info['title'],
-                        'author': info['author'],
-                        'available': info['available'],
-                        'available_copies': info['available_copies']
-                    })
-
-            return {
-                'success': True,
-                'message': ai_message,
-                'books_mentioned': books_mentioned
-            }
+    def build_chat_result(self, ai_message, library_books):
+        """返回 AI 回复和其中提到的馆藏图书"""
+        books_mentioned = []
+        for title, info in library_books.items():
+            if title in ai_message:
+                books_mentioned.append({
+                    'id': info['id'],
+                    'title': info['title'],
+                    'author': info['author'],
+                    'available': info['available'],
+                    'available_copies': info['available_copies']
+                })
 
-        except requests.exceptions.Timeout:
-            return {
-                'success': False,
-                'message': '请求超时，AI 服务响应较慢，请稍后再试。',
-                'books_mentioned': []
-            }
-        except requests.exceptions.RequestException as e:
-            return {
-                'success': False,
-                'message': f'网络请求失败，请检查网络连接。',
-                'books_mentioned': []
-            }
-        except (KeyError, IndexError, json.JSONDecodeError) as e:
-            return {
-                'success': False,
-                'message': 'AI 响应格式异常，请稍后再试。',
-                'books_mentioned': []
-            }
-        except Exception as e:
-            return {
-                'success': False,
-                'message': f'发生未知错误，请稍后再试。',
-                'books_mentioned': []
-            }
+        return {
+            'success': True,
+            'message': ai_message,
+            'books_mentioned': books_mentioned
+        }
+
+    def error_result(self, message):
+        return {
+            'success': False,
+            'message': message,
+            'books_mentioned': []
+        }
+
+    async def achat(self, user_message, conversation_history=None):
+        """
+        与 AI 对话，只有查询馆藏时使用线程，等待 AI 响应时不占用线程
+
+        Args:
+            user_message: 用户消息
+            conversation_history: 之前的对话历史 [{'role': 'user/assistant', 'content': '...'}]
+
+        Returns:
+            dict: {'success': bool, 'message': str, 'books_mentioned': list}
+        """
+        if not self.api_key:
+            return self.error_result(NOT_CONFIGURED_MESSAGE)
+
+        library_books = await sync_to_async(self.get_library_books_info)()
+        messages = self.build_messages(library_books, user_message, conversation_history)
+
+        try:
+            ai_message = await chat_completion(
+                self.api_url, self.api_key, self.build_request_data(messages), timeout=60,
+            )
+            return self.build_chat_result(ai_message, library_books)
+
+        except AIBusyError:
+            return self.error_result(BUSY_MESSAGE)
+        except httpx.TimeoutException:
+            return self.error_result(TIMEOUT_MESSAGE)
+        except httpx.HTTPError:
+            return self.error_result(NETWORK_ERROR_MESSAGE)
+        except (KeyError, IndexError, ValueError):
+            return self.error_result(FORMAT_ERROR_MESSAGE)
+        except Exception:
+            logger.exception('AI 对话请求失败')
+            return self.error_result(UNKNOWN_ERROR_MESSAGE)
 
     def get_quick_suggestions(self):
         """获取快捷建议问题"""
@@ -0,0 +1,64 @@
+"""
+异步 AI 接口客户端
+AI 接口一次请求需要 30～60 秒，同步视图等待期间会一直占用 Gunicorn worker。
+AI 接口部署在单独的 ASGI 应用中（见 config/asgi.py 和 gunicorn.conf.py），
+通过 httpx.AsyncClient 发送请求，等待上游响应时不占用线程，同一进程可以同时处理大量 AI 请求。
+
+同时发往上游的请求数由信号量限制（AI_MAX_CONCURRENCY），避免突发流量耗尽 AI 服务的并发额度；
+超出的请求排队，排队超过 AI_QUEUE_TIMEOUT 秒抛出 AIBusyError。
+"""
+import asyncio
+import ssl
+import weakref
+from functools import cache
+import certifi
+import httpx
+from django.conf import settings
+
+# 事件循环 -> 信号量。asyncio.Semaphore 只能在一个事件循环中使用；
+# ASGI worker 只有一个事件循环，WSGI 下每个请求使用新的事件循环，并发由 worker 数量限制
+_semaphores = weakref.WeakKeyDictionary()
+
+
+class AIBusyError(Exception):
+    """等待上游并发名额超时"""
+
+
+@cache
+def get_ssl_context():
+    """创建 SSL 上下文需要加载全部 CA 证书，耗时数十毫秒，所有请求共用一个"""
+    return ssl.create_default_context(cafile=certifi.where())
+
+
+def get_semaphore():
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(settings.AI_MAX_CONCURRENCY)
+    return semaphore
+
+
+async def chat_completion(api_url, api_key, data, timeout):
+    """
+    发送 chat/completions 请求，返回回复内容
+
+    排队超时抛出 AIBusyError，请求超时抛出 httpx.TimeoutException，网络错误和非 2xx 响应抛出 httpx.HTTPError，
+    响应格式不符时抛出 KeyError、IndexError 或 ValueError
+    """
+    headers = {
+        'Content-Type': 'application/json',
+        'Authorization': f'Bearer {api_key}'
+    }
+    semaphore = get_semaphore()
+    try:
+        await asyncio.wait_for(semaphore.acquire(), settings.AI_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise AIBusyError('AI 请求排队超时') from None
+    try:
+        # 请求耗时远大于建立连接的耗时，每次请求使用新的客户端，不跨事件循环共享连接
+        async with httpx.AsyncClient(timeout=timeout, verify=get_ssl_context()) as client:
+            response = await client.post(api_url, headers=headers, json=data)
+            response.raise_for_status()
+    finally:
+        semaphore.release()
+    return response.json()['choices'][0]['message']['content']
@@ -3,11 +3,22 @@ AI 图书推荐服务
 基于用户借阅历史和偏好进行智能推荐
 """
 import json
-import requests
+import logging
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.db.models import Count, Q
+from .ai_client import chat_completion
+from .categories import registry
 from .models import Book, BorrowRecord, Category
 
+logger = logging.getLogger(__name__)
+
+NO_BOOKS_RESULT = {
+    'success': False,
+    'message': '图书馆暂无可借阅的书籍',
+    'recommendations': []
+}
+
 
 class AIRecommendService:
     """AI 推荐服务类"""
@@ -20,9 +31,12 @@ class AIRecommendService:
 
     def get_user_reading_profile(self, user):
         """获取用户阅读画像"""
-        borrow_records = BorrowRecord.objects.filter(user=user).select_related('book', 'book__category')
+        # 包括已归档的借阅记录，只取需要的字段
+        borrow_records = list(BorrowRecord.history.with_archived(
+            user=user, fields=['book__title', 'book__author', 'book__category_id'],
+        ))
 
-        if not borrow_records.exists():
+        if not borrow_records:
             return None
 
         # 统计用户借阅的分类
@@ -30,16 +44,15 @@ class AIRecommendService:
         authors = []
         books_borrowed = []
 
-        for record in borrow_records:
-            book = record.book
-            books_borrowed.append(book.title)
+        for title, author, category_id in borrow_records:
+            books_borrowed.append(title)
 
-            if book.category:
-                cat_name = book.category.name
+            cat_name = registry.name(category_id)
+            if cat_name:
                 category_counts[cat_name] = category_counts.get(cat_name, 0) + 1
 
-            if book.author:
-                authors.append(book.author)
+            if author:
+                authors.append(author)
 
         # 找出最喜欢的分类
         favorite_categories = sorted(category_counts.items(), key=lambda x: x[1], reverse=True)[:3]
@@ -56,13 +69,13 @@ class AIRecommendService:
         # 使用注解查询可借阅副本数量
         books = Book.objects.annotate(
             avail_copies=Count('copies', filter=Q(copies__status='available'))
-        ).filter(avail_copies__gt=0).select_related('category')
+        ).filter(avail_copies__gt=0)
         return [
             {
                 'id': book.id,
                 'title': book.title,
                 'author': book.author,
-                'category': book.category.name if book.category else '未分类',
+                'category': registry.name(book.category_id, '未分类'),
                 'description': book.description[:100] if book.description else '',
             }
             for book in books
@@ -117,17 +130,9 @@ class AIRecommendService:
 """
         return prompt
 
-    def call_ai_api(self, prompt):
-        """调用 AI API"""
-        if not self.api_key:
-            return None
-
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {self.api_key}'
-        }
-
-        data = {
+    def build_request_data(self, prompt):
+        """构建 AI API 请求体"""
+        return {
             'model': self.model,
             'messages': [
                 {'role': 'system', 'content': '你是一个专业的图书推荐助手，善于根据用户喜好推荐合适的书籍。'},
@@ -137,62 +142,68 @@ class AIRecommendService:
             'max_tokens': 1000
         }
 
+    def parse_ai_content(self, content):
+        """解析 AI 返回的 JSON 内容"""
+        # 移除可能的 markdown 代码块标记
+        content = content.strip()
+        if content.startswith('```json'):
+            content = content[7:]
+        if content.startswith('```'):
+            content = content[3:]
+        if content.endswith('```'):
+            content = content[:-3]
+        return json.loads(content.strip())
+
+    async def acall_ai_api(self, prompt):
+        """调用 AI API，等待响应时不占用线程；失败时返回 None，由调用方改用规则推荐"""
+        if not self.api_key:
+            return None
+
         try:
-            response = requests.post(self.api_url, headers=headers, json=data, timeout=30)
-            response.raise_for_status()
-            result = response.json()
-            content = result['choices'][0]['message']['content']
-            # 尝试解析 JSON
-            # 移除可能的 markdown 代码块标记
-            content = content.strip()
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.startswith('```'):
-                content = content[3:]
-            if content.endswith('```'):
-                content = content[:-3]
-            return json.loads(content.strip())
-        except Exception as e:
-            print(f"AI API 调用失败: {e}")
+            content = await chat_completion(self.api_url, self.api_key, self.build_request_data(prompt), timeout=30)
+            return self.parse_ai_content(content)
+        except Exception:
+            logger.warning('AI 推荐接口调用失败', exc_info=True)
             return None
 
-    def get_recommendations(self, user, user_input=None):
-        """获取推荐结果"""
+    def get_recommendation_inputs(self, user):
+        """推荐所需的用户画像和可借阅图书"""
         user_profile = self.get_user_reading_profile(user) if user.is_authenticated else None
-        available_books = self.get_available_books()
+        return user_profile, self.get_available_books()
+
+    def match_ai_recommendations(self, ai_result):
+        """把 AI 推荐的书名匹配到馆藏图书"""
+        recommendations = []
+        for rec in ai_result.get('recommendations', []):
+            book = Book.objects.filter(title__icontains=rec['title']).first()
+            if book:
+                recommendations.append({
+                    'book': book,
+                    'reason': rec['reason']
+                })
+
+        return {
+            'success': True,
+            'message': ai_result.get('summary', 'AI 为您精选的推荐'),
+            'recommendations': recommendations,
+            'is_ai': True
+        }
+
+    async def aget_recommendations(self, user, user_input=None):
+        """获取推荐结果，数据库查询在线程中执行，等待 AI 响应时不占用线程"""
+        user_profile, available_books = await sync_to_async(self.get_recommendation_inputs)(user)
 
         if not available_books:
-            return {
-                'success': False,
-                'message': '图书馆暂无可借阅的书籍',
-                'recommendations': []
-            }
+            return NO_BOOKS_RESULT.copy()
 
-        # 尝试调用 AI API
         if self.api_key:
             prompt = self.build_recommendation_prompt(user_profile, available_books, user_input)
-            ai_result = self.call_ai_api(prompt)
+            ai_result = await self.acall_ai_api(prompt)
 
             if ai_result:
-                # 匹配图书 ID
-                recommendations = []
-                for rec in ai_result.get('recommendations', []):
-                    book = Book.objects.filter(title__icontains=rec['title']).first()
-                    if book:
-                        recommendations.append({
-                            'book': book,
-                            'reason': rec['reason']
-                        })
-
-                return {
-                    'success': True,
-                    'message': ai_result.get('summary', 'AI 为您精选的推荐'),
-                    'recommendations': recommendations,
-                    'is_ai': True
-                }
-
-        # 如果 AI 不可用，使用基于规则的推荐
-        return self.get_rule_based_recommendations(user_profile, available_books)
+                return await sync_to_async(self.match_ai_recommendations)(ai_result)
+
+        return await sync_to_async(self.get_rule_based_recommendations)(user_profile, available_books)
 
     def get_rule_based_recommendations(self, user_profile, available_books):
         """基于规则的推荐（AI 不可用时的备选方案）"""
@@ -202,10 +213,13 @@ class AIRecommendService:
         if user_profile and user_profile['favorite_categories']:
             # 推荐用户喜欢的分类中的书
             for cat in user_profile['favorite_categories']:
+                category = registry.get_by_name(cat)
+                if category is None:
+                    continue
                 books = Book.objects.annotate(
                     avail_copies=Count('copies', filter=Q(copies__status='available'))
                 ).filter(
-                    category__name=cat,
+                    category_id=category.id,
                     avail_copies__gt=0
                 ).exclude(title__in=borrowed_titles)[:2]
 
@@ -246,17 +260,17 @@ class AIRecommendService:
         similar = []
 
         # 同分类的书
-        if book.category:
+        if book.category_id:
             same_category = Book.objects.annotate(
                 avail_copies=Count('copies', filter=Q(copies__status='available'))
             ).filter(
-                category=book.category,
+                category_id=book.category_id,
                 avail_copies__gt=0
             ).exclude(id=book.id)[:3]
             for b in same_category:
                 similar.append({
                     'book': b,
-                    'reason': f'同属"{book.category.name}"分类'
+                    'reason': f'同属"{registry.name(book.category_id)}"分类'
                 })
 
         # 同作者的书
@@ -0,0 +1,94 @@
+"""
+副本条码查询
+扫码时按条码查找副本，进程内 LRU 缓存 条码 -> (副本ID, 图书ID, 状态)。
+本进程修改副本状态时立即失效；其他进程的缓存最多在 ENTRY_TTL 秒后过期，
+因此缓存中的状态只用于展示，借还书时仍在事务中锁定副本并重新检查状态。
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from django.db import transaction
+
+CopyRef = namedtuple('CopyRef', ['copy_id', 'book_id', 'status'])
+
+# 缓存条目数上限和有效期（秒）
+MAX_ENTRIES = 50000
+ENTRY_TTL = 60
+
+
+class BarcodeLookup:
+    """带过期时间的 LRU 缓存"""
+
+    def __init__(self, maxsize=MAX_ENTRIES, ttl=ENTRY_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _get_cached(self, barcode, now):
+        entry = self.entries.get(barcode)
+        if entry is None or entry[1] < now:
+            return None
+        self.entries.move_to_end(barcode)
+        return entry[0]
+
+    def _store(self, barcode, ref, now):
+        self.entries[barcode] = (ref, now + self.ttl)
+        self.entries.move_to_end(barcode)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def get_many(self, barcodes):
+        """批量查询，返回 {条码: CopyRef}，不存在的条码不在结果中"""
+        from .models import BookCopy
+
+        now = time.monotonic()
+        found = {}
+        missing = []
+        with self.lock:
+            for barcode in barcodes:
+                ref = self._get_cached(barcode, now)
+                if ref is None:
+                    missing.append(barcode)
+                else:
+                    found[barcode] = ref
+            self.hits += len(found)
+            self.misses += len(missing)
+
+        if missing:
+            rows = BookCopy.objects.filter(barcode__in=missing).values_list('barcode', 'pk', 'book_id', 'status')
+            with self.lock:
+                for barcode, copy_id, book_id, status in rows:
+                    ref = CopyRef(copy_id, book_id, status)
+                    self._store(barcode, ref, now)
+                    found[barcode] = ref
+        return found
+
+    def get(self, barcode):
+        return self.get_many([barcode]).get(barcode)
+
+    def invalidate(self, barcodes):
+        with self.lock:
+            for barcode in barcodes:
+                self.entries.pop(barcode, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self.lock:
+            return {'size': len(self.entries), 'hits': self.hits, 'misses': self.misses}
+
+
+lookup = BarcodeLookup()
+
+
+def invalidate_barcodes(barcodes):
+    """副本状态变化后失效缓存，事务提交后再失效一次，避免提交前读到旧状态"""
+    barcodes = list(barcodes)
+    lookup.invalidate(barcodes)
+    transaction.on_commit(lambda: lookup.invalidate(barcodes))
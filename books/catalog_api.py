@@ -0,0 +1,162 @@
+"""
+目录同步接口
+自助借还机和移动端通过 JSON 接口同步图书目录，不再抓取首页 HTML。
+图书按 (updated_at, id) 排序分页，客户端保存返回的游标，下次请求带上 ?since=<游标>
+只获取之后有变化的图书和已删除的图书ID（来自 CatalogTombstone）。
+响应带强 ETag，内容未变化时返回 304；客户端支持时使用 gzip 压缩。
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from django.utils.text import compress_string
+from .categories import registry
+from .models import Book, BookCopy, CatalogTombstone
+
+# 每页最多返回的图书数
+PAGE_SIZE = 200
+
+# 只返回 SYNC_LAG 之前更新的数据：事务提交时 updated_at 可能早于提交时间，
+# 留出时间窗口，避免客户端游标越过尚未提交的修改。
+# 截止时间再按整分钟取整，同一分钟内没有变化时响应内容相同，客户端可以得到 304
+SYNC_LAG = timedelta(seconds=5)
+
+# 删除记录保留天数，游标早于该时间时客户端需要重新全量同步
+TOMBSTONE_RETENTION_DAYS = 30
+
+# 小于该大小的响应不压缩
+GZIP_MIN_LENGTH = 200
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+BOOK_FIELDS = [
+    'id', 'isbn', 'title', 'author', 'publisher', 'publish_date', 'category_id',
+    'description', 'cover', 'location', 'available_count', 'updated_at',
+]
+
+
+class CursorExpired(Exception):
+    """游标早于删除记录的保留时间"""
+
+
+def encode_cursor(updated_at, pk):
+    """游标：更新时间（微秒）和图书ID"""
+    micros = (updated_at - EPOCH) // timedelta(microseconds=1)
+    return f'{micros}_{pk}'
+
+
+def decode_cursor(cursor):
+    try:
+        micros, pk = cursor.split('_')
+        return EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (ValueError, OverflowError):
+        return None
+
+
+def serialize_book(row, copies):
+    return {
+        'id': row['id'],
+        'isbn': row['isbn'],
+        'title': row['title'],
+        'author': row['author'],
+        'publisher': row['publisher'],
+        'publish_date': row['publish_date'].isoformat() if row['publish_date'] else None,
+        'category_id': row['category_id'],
+        'description': row['description'],
+        'cover': default_storage.url(row['cover']) if row['cover'] else None,
+        'location': row['location'],
+        'available_count': row['available_count'],
+        'total_copies': len(copies),
+        'copies': copies,
+        'updated_at': row['updated_at'].isoformat(),
+    }
+
+
+def book_changes(since=None, page_size=PAGE_SIZE):
+    """
+    返回 since 游标之后的一页变化：
+    {'books': [...], 'deleted': [图书ID], 'next': 游标, 'has_more': bool}
+    since 为 None 时从头全量同步（不返回删除记录）
+    """
+    now = timezone.now()
+    until = (now - SYNC_LAG).replace(second=0, microsecond=0)
+    if since is not None and since[0] < now - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+        raise CursorExpired()
+
+    books = Book.objects.filter(updated_at__lt=until).order_by('updated_at', 'id')
+    if since is not None:
+        since_time, since_pk = since
+        books = books.filter(Q(updated_at__gt=since_time) | Q(updated_at=since_time, id__gt=since_pk))
+    rows = list(books.values(*BOOK_FIELDS)[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    copies = {row['id']: [] for row in rows}
+    for book_id, barcode, copy_number, status in (
+            BookCopy.objects.filter(book_id__in=copies).order_by('book_id', 'copy_number')
+            .values_list('book_id', 'barcode', 'copy_number', 'status')):
+        copies[book_id].append({'barcode': barcode, 'copy_number': copy_number, 'status': status})
+
+    # 本页覆盖的时间范围为 (since, end]，删除记录按同样的范围返回，各页之间不重不漏
+    if has_more:
+        end = rows[-1]['updated_at']
+        next_cursor = encode_cursor(end, rows[-1]['id'])
+    elif since is not None and since[0] >= until:
+        end = since[0]
+        next_cursor = encode_cursor(*since)
+    else:
+        end = until
+        next_cursor = encode_cursor(until, 0)
+
+    deleted = []
+    if since is not None and since[0] < end:
+        deleted = list(CatalogTombstone.objects.filter(
+            model='book', deleted_at__gt=since[0], deleted_at__lte=end,
+        ).values_list('object_id', flat=True))
+        # 导入目录时可能恢复已删除的图书，恢复后的图书不再报告为已删除
+        if deleted:
+            restored = set(Book.objects.filter(pk__in=deleted).values_list('pk', flat=True))
+            deleted = [pk for pk in deleted if pk not in restored]
+
+    return {
+        'books': [serialize_book(row, copies[row['id']]) for row in rows],
+        'deleted': deleted,
+        'next': next_cursor,
+        'has_more': has_more,
+    }
+
+
+def category_list():
+    return {'categories': [category._asdict() for category in registry.all()]}
+
+
+def json_response(request, data):
+    """
+    返回带强 ETag 的 JSON 响应，If-None-Match 匹配时返回 304。
+    gzip 压缩后的内容使用不同的 ETag，两种表示都是字节级一致的
+    （compress_string 不写入时间戳），因此可以使用强 ETag。
+    """
+    content = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+    etag = hashlib.sha1(content).hexdigest()
+
+    gzip = 'gzip' in request.headers.get('Accept-Encoding', '') and len(content) >= GZIP_MIN_LENGTH
+    if gzip:
+        content = compress_string(content)
+        etag += '-gz'
+    etag = quote_etag(etag)
+
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(content, content_type='application/json')
+        if gzip:
+            response['Content-Encoding'] = 'gzip'
+    response['ETag'] = etag
+    patch_vary_headers(response, ['Accept-Encoding'])
+    patch_cache_control(response, no_cache=True)
+    return response
@@ -0,0 +1,97 @@
+"""
+分类缓存
+分类很少变化，进程内缓存全部分类（按名称排序）。搜索表单的分类选项、AI 服务中的分类名称、
+封面生成的风格映射都从这里读取，不再查询分类表。
+本进程修改分类时立即失效；其他进程每隔 VERSION_CHECK_INTERVAL 秒检查一次共享缓存中的版本号
+（与模板片段缓存共用 categories 分组的版本号，见 books/fragments.py），版本号变化时重新加载。
+"""
+import threading
+import time
+from collections import namedtuple
+from django.db import transaction
+from .fragments import get_fragment_versions
+
+CategoryInfo = namedtuple('CategoryInfo', ['id', 'name', 'description'])
+
+# 检查共享版本号的间隔（秒），即其他进程修改分类后本进程最长的延迟
+VERSION_CHECK_INTERVAL = 5
+
+
+class CategoryRegistry:
+    """进程内的分类列表，按需加载"""
+
+    def __init__(self, check_interval=VERSION_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.categories = None
+        self.by_id = {}
+        self.version = None
+        self.checked_at = 0
+        # 每次失效加一，加载期间发生失效时丢弃加载结果
+        self.generation = 0
+        self.loads = 0
+
+    def _load(self):
+        from .models import Category
+
+        now = time.monotonic()
+        with self.lock:
+            if self.categories is not None and now < self.checked_at + self.check_interval:
+                return self.categories, self.by_id
+            generation = self.generation
+
+        # 先取版本号再查询，查询之后发生的修改会删除这个版本号
+        version = get_fragment_versions()['categories']
+        with self.lock:
+            if self.categories is not None and version == self.version and generation == self.generation:
+                self.checked_at = now
+                return self.categories, self.by_id
+
+        categories = [
+            CategoryInfo(*row)
+            for row in Category.objects.order_by('name').values_list('pk', 'name', 'description')
+        ]
+        by_id = {category.id: category for category in categories}
+        with self.lock:
+            self.loads += 1
+            if generation == self.generation:
+                self.categories, self.by_id = categories, by_id
+                self.version, self.checked_at = version, now
+        return categories, by_id
+
+    def all(self):
+        """全部分类，按名称排序"""
+        return self._load()[0]
+
+    def get(self, pk):
+        return self._load()[1].get(pk)
+
+    def name(self, pk, default=''):
+        """分类名称，分类不存在或为空时返回 default"""
+        category = self.get(pk)
+        return category.name if category else default
+
+    def get_by_name(self, name):
+        for category in self.all():
+            if category.name == name:
+                return category
+        return None
+
+    def choices(self):
+        """表单选项 [(id, 名称), ...]"""
+        return [(category.id, category.name) for category in self.all()]
+
+    def invalidate(self):
+        with self.lock:
+            self.categories = None
+            self.by_id = {}
+            self.generation += 1
+
+
+registry = CategoryRegistry()
+
+
+def invalidate_categories():
+    """分类修改后失效缓存，事务提交后再失效一次，避免提交前读到旧数据"""
+    registry.invalidate()
+    transaction.on_commit(registry.invalidate)
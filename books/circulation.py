@@ -0,0 +1,198 @@
+"""
+流通台批量借还
+扫码枪一次扫描多本书（副本条码或 ISBN），在一个事务中批量更新副本状态、
+批量创建借阅记录，并返回每一项的处理结果。
+"""
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .barcodes import invalidate_barcodes, lookup
+from .models import (
+    Book, BookCopy, BorrowRecord, Reservation, invalidate_loan_summary, update_available_counts,
+)
+
+# 单次请求最多处理的条目数
+MAX_BATCH_ITEMS = 100
+
+# 默认借阅期限
+LOAN_DAYS = 30
+
+
+def clean_items(items):
+    """去除空白和重复的条目，保持扫描顺序"""
+    seen = set()
+    cleaned = []
+    for item in items:
+        item = str(item).strip()
+        if item and item not in seen:
+            seen.add(item)
+            cleaned.append(item)
+    return cleaned
+
+
+def find_books_by_isbn(items):
+    """按 ISBN 查找图书（同时匹配带连字符和不带连字符的写法）"""
+    lookups = {}
+    for item in items:
+        lookups[item] = item
+        lookups[item.replace('-', '')] = item
+    books = {}
+    for book in Book.objects.filter(isbn__in=list(lookups)):
+        item = lookups.get(book.isbn) or lookups.get(book.isbn.replace('-', ''))
+        books.setdefault(item, book)
+    return books
+
+
+def result(item, success, message, **extra):
+    return dict({'item': item, 'success': success, 'message': message}, **extra)
+
+
+def batch_borrow(user, items):
+    """为用户批量借书，items 为副本条码或 ISBN"""
+    items = clean_items(items)
+    results = {}
+    now = timezone.now()
+
+    refs = lookup.get_many(items)
+    with transaction.atomic():
+        copies = {
+            c.barcode: c
+            for c in BookCopy.objects.select_for_update(of=('self',)).select_related('book')
+            .filter(pk__in=[ref.copy_id for ref in refs.values()], book__deleted_at__isnull=True)
+        }
+        isbn_books = find_books_by_isbn([i for i in items if i not in copies])
+
+        # ISBN 条目从该书的可借副本中按编号顺序分配
+        available = defaultdict(list)
+        for copy in (BookCopy.objects.select_for_update(of=('self',)).select_related('book')
+                     .filter(book__in=isbn_books.values(), status='available')
+                     .order_by('copy_number')):
+            available[copy.book_id].append(copy)
+
+        borrowed_books = set(BorrowRecord.objects.filter(
+            user=user, status='borrowed'
+        ).order_by().values_list('book_id', flat=True))
+
+        chosen = []
+        for item in items:
+            if item in copies:
+                copy = copies[item]
+                if copy.status != 'available':
+                    results[item] = result(item, False, f'副本 {item} 当前不可借阅（{copy.get_status_display()}）。')
+                    continue
+            elif item in isbn_books:
+                book = isbn_books[item]
+                if not available[book.pk]:
+                    results[item] = result(item, False, f'《{book.title}》暂无可借阅的副本。')
+                    continue
+                copy = available[book.pk].pop(0)
+            else:
+                results[item] = result(item, False, '未找到对应的副本或图书。')
+                continue
+
+            if copy.book_id in borrowed_books:
+                results[item] = result(item, False, f'已借阅《{copy.book.title}》，不能重复借阅。')
+                continue
+            borrowed_books.add(copy.book_id)
+            chosen.append((item, copy))
+
+        if chosen:
+            copy_ids = [copy.pk for _, copy in chosen]
+            book_ids = [copy.book_id for _, copy in chosen]
+            BookCopy.objects.filter(pk__in=copy_ids).update(status='borrowed')
+            invalidate_barcodes(copy.barcode for _, copy in chosen)
+            records = BorrowRecord.objects.bulk_create([
+                BorrowRecord(
+                    user=user, book_id=copy.book_id, book_copy=copy,
+                    borrow_date=now, due_date=now + timedelta(days=LOAN_DAYS),
+                )
+                for _, copy in chosen
+            ])
+            # 同一用户同一本书只能借一本，每本书的借阅次数加一
+            Book.objects.filter(pk__in=book_ids).update(recent_borrow_count=F('recent_borrow_count') + 1)
+            update_available_counts(book_ids)
+            Reservation.objects.filter(
+                user=user, book_id__in=book_ids, status__in=['waiting', 'notified']
+            ).update(status='fulfilled')
+            invalidate_loan_summary(user.pk)
+
+            for (item, copy), record in zip(chosen, records):
+                results[item] = result(
+                    item, True, f'成功借阅《{copy.book.title}》[{copy.copy_number}]。',
+                    copy_number=copy.copy_number, barcode=copy.barcode, record_id=record.pk,
+                    due_date=record.due_date.isoformat(),
+                )
+
+    return [results[item] for item in items]
+
+
+def batch_return(items, user=None):
+    """批量还书，items 为副本条码或 ISBN（按 ISBN 还书时必须指定用户）"""
+    from .tasks import notify_reservation
+
+    items = clean_items(items)
+    results = {}
+    now = timezone.now()
+
+    refs = lookup.get_many(items)
+    with transaction.atomic():
+        borrowed = (BorrowRecord.objects.select_for_update(of=('self',))
+                    .select_related('user', 'book', 'book_copy').filter(status='borrowed'))
+        if user is not None:
+            borrowed = borrowed.filter(user=user)
+
+        by_copy = {
+            r.book_copy.barcode: r
+            for r in borrowed.filter(book_copy_id__in=[ref.copy_id for ref in refs.values()])
+        }
+        isbn_items = [i for i in items if i not in by_copy]
+        isbn_books = find_books_by_isbn(isbn_items) if user is not None else {}
+        by_book = {r.book_id: r for r in borrowed.filter(book__in=isbn_books.values())}
+
+        returned = []
+        returned_ids = set()
+        for item in items:
+            if item in by_copy:
+                record = by_copy[item]
+            elif item in isbn_books and isbn_books[item].pk in by_book:
+                record = by_book[isbn_books[item].pk]
+            elif user is None:
+                results[item] = result(item, False, '未找到该副本的借阅记录（按 ISBN 还书需指定用户）。')
+                continue
+            else:
+                results[item] = result(item, False, '未找到对应的借阅记录。')
+                continue
+
+            if record.pk in returned_ids:
+                results[item] = result(item, False, f'《{record.book.title}》已在本次请求中归还。')
+                continue
+            returned_ids.add(record.pk)
+            returned.append((item, record))
+
+        if returned:
+            records = [record for _, record in returned]
+            BorrowRecord.objects.filter(pk__in=returned_ids).update(status='returned', return_date=now)
+            BookCopy.objects.filter(
+                pk__in=[r.book_copy_id for r in records if r.book_copy_id]
+            ).update(status='available')
+            invalidate_barcodes(r.book_copy.barcode for r in records if r.book_copy_id)
+            book_ids = {r.book_id for r in records}
+            update_available_counts(book_ids)
+            for user_id in {r.user_id for r in records}:
+                invalidate_loan_summary(user_id)
+
+            # 提交后每本书只通知一次预约者
+            books = {r.book_id: r.book for r in records if r.book_copy_id}
+            for book in books.values():
+                transaction.on_commit(lambda book=book: notify_reservation(book))
+
+            for item, record in returned:
+                copy_info = f'[{record.book_copy.copy_number}]' if record.book_copy else ''
+                results[item] = result(
+                    item, True, f'成功归还《{record.book.title}》{copy_info}。',
+                    record_id=record.pk, username=record.user.username,
+                )
+
+    return [results[item] for item in items]
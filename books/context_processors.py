@@ -0,0 +1,22 @@
+"""
+模板上下文处理器
+"""
+from django.utils.functional import SimpleLazyObject
+from .fragments import FRAGMENT_TIMEOUT, get_fragment_versions
+from .models import get_loan_summary
+
+
+def loan_summary(request):
+    """导航栏的借阅摘要，只有模板用到时才读取"""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'loan_summary': SimpleLazyObject(lambda: get_loan_summary(user.pk))}
+
+
+def fragment_cache(request):
+    """模板片段缓存的缓存时间和版本号，版本号只有渲染到 {% cache %} 时才读取"""
+    return {
+        'fragment_timeout': FRAGMENT_TIMEOUT,
+        'fragment_versions': SimpleLazyObject(get_fragment_versions),
+    }
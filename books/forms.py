@@ -2,6 +2,7 @@ import re
 from django import forms
 from django.core.validators import RegexValidator
 from django.utils.html import strip_tags
+from .categories import registry
 from .models import Book, Category, BookCopy
 
 
@@ -103,23 +104,30 @@ class BookForm(forms.ModelForm):
         # 移除可能的连字符
         isbn = isbn.replace('-', '')
 
-        # 检查是否已存在（排除当前编辑的图书）
-        existing = Book.objects.filter(isbn=isbn)
+        # 检查是否已存在（排除当前编辑的图书，已删除的图书仍占用 ISBN）
+        existing = Book.all_objects.filter(isbn=isbn)
         if self.instance.pk:
             existing = existing.exclude(pk=self.instance.pk)
-        if existing.exists():
-            raise forms.ValidationError('该ISBN已被其他图书使用')
+        existing = existing.first()
+        if existing is not None:
+            if self.instance.pk or existing.deleted_at is None:
+                raise forms.ValidationError('该ISBN已被其他图书使用')
+            # 添加已删除图书的 ISBN 时恢复该图书（与 import_catalog 相同），保留其借阅记录和副本序号
+            self.instance = existing
+            self.restored = True
 
         return isbn
 
     def save(self, commit=True):
+        is_new = self.instance.pk is None or getattr(self, 'restored', False)
+        if getattr(self, 'restored', False):
+            self.instance.deleted_at = None
         book = super().save(commit=commit)
 
-        # 如果是新建图书，创建副本
-        if commit and not self.instance.pk:
+        # 如果是新建图书，批量创建副本
+        if commit and is_new:
             copies_count = self.cleaned_data.get('copies_count', 1) or 1
-            for i in range(copies_count):
-                BookCopy.objects.create(book=book)
+            BookCopy.objects.create_many(book, copies_count)
 
         return book
 
@@ -147,13 +155,38 @@ class BookSearchForm(forms.Form):
             'placeholder': '搜索书名、作者、ISBN...'
         })
     )
-    category = forms.ModelChoiceField(
+    # 选项来自进程内的分类缓存，渲染和校验都不查询分类表；cleaned_data 中为分类ID
+    category = forms.TypedChoiceField(
         required=False,
-        queryset=Category.objects.all(),
+        choices=lambda: [('', '所有分类')] + registry.choices(),
+        coerce=int,
+        empty_value=None,
         label='分类',
-        empty_label='所有分类',
         widget=forms.Select(attrs={'class': 'form-control'})
     )
+    available_only = forms.BooleanField(
+        required=False,
+        label='仅显示可借',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+    sort = forms.ChoiceField(
+        required=False,
+        label='排序',
+        choices=[
+            ('', '默认排序'),
+            ('popular', '最受欢迎'),
+            ('newest', '最新上架'),
+            ('available', '可借数量'),
+        ],
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+
+    # 排序方式对应的字段，均有对应的数据库索引
+    SORT_ORDERINGS = {
+        'popular': ['-recent_borrow_count', '-created_at'],
+        'newest': ['-created_at'],
+        'available': ['-available_count', '-created_at'],
+    }
 
     def clean_keyword(self):
         """清理搜索关键词"""
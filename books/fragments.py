@@ -0,0 +1,40 @@
+"""
+模板片段缓存
+首页中变化很少、渲染开销较大的片段（搜索表单的分类下拉框、图书卡片、导航栏菜单）用 {% cache %} 缓存。
+片段的缓存键带有版本号，版本号保存在共享缓存中，相关数据修改时由信号删除版本号，
+所有 worker 中的旧片段随即失效。图书卡片的缓存键还包含图书的 updated_at，
+图书本身和副本状态的变化不需要额外处理。
+"""
+import uuid
+from django.core.cache import cache
+from django.db import transaction
+
+# 片段的缓存时间（秒），版本号的有效期相同
+FRAGMENT_TIMEOUT = 3600
+
+# 版本号分组，模板中通过 fragment_versions.<分组> 使用
+FRAGMENT_GROUPS = ['categories']
+
+
+def version_key(group):
+    return f'fragment:version:{group}'
+
+
+def get_fragment_versions():
+    """所有分组的当前版本号，不存在时生成新版本号"""
+    keys = {group: version_key(group) for group in FRAGMENT_GROUPS}
+    versions = cache.get_many(keys.values())
+    missing = [key for key in keys.values() if key not in versions]
+    if missing:
+        # 并发请求同时生成时以先写入的为准
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex, FRAGMENT_TIMEOUT)
+        versions.update(cache.get_many(missing))
+    return {group: versions.get(key) for group, key in keys.items()}
+
+
+def invalidate_fragments(group):
+    """使该分组的所有片段失效"""
+    cache.delete(version_key(group))
+    # 事务提交后再删除一次，避免提交前有请求用旧数据渲染并写入新版本号
+    transaction.on_commit(lambda: cache.delete(version_key(group)))
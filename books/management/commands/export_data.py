@@ -0,0 +1,41 @@
+"""
+导出借阅记录、预约记录或图书目录
+
+使用方法：
+python manage.py export_data records --status borrowed -o records.csv
+python manage.py export_data books --format jsonl --gzip -o catalog.jsonl.gz
+"""
+import sys
+from django.core.management.base import BaseCommand
+from books.exports import EXPORTS, FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    help = '流式导出借阅记录、预约记录或图书目录（CSV/JSONL，可选 gzip）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(EXPORTS), help='导出的数据类型')
+        parser.add_argument('--format', choices=list(FORMATS), default='csv', help='导出格式（默认 csv）')
+        parser.add_argument('--gzip', action='store_true', help='使用 gzip 压缩输出')
+        parser.add_argument('--status', help='按状态筛选（借阅记录、预约记录）')
+        parser.add_argument('-o', '--output', help='输出文件路径，默认输出到标准输出')
+
+    def handle(self, *args, **options):
+        chunks = iter_export(
+            options['kind'],
+            fmt=options['format'],
+            status=options['status'],
+            compress=options['gzip'],
+        )
+
+        if options['output']:
+            total = 0
+            with open(options['output'], 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    total += len(chunk)
+            self.stderr.write(self.style.SUCCESS(f'已导出到 {options["output"]}（{total} 字节）'))
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
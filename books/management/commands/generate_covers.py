@@ -7,8 +7,21 @@ import requests
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from django.core.files.base import ContentFile
+from books.categories import registry
 from books.models import Book
 
+# 分类对应的封面风格
+CATEGORY_STYLES = {
+    '计算机': 'modern tech style, circuit patterns, blue and white colors',
+    '文学': 'elegant literary style, classic design, warm colors',
+    '历史': 'vintage historical style, ancient textures, sepia tones',
+    '哲学': 'philosophical abstract style, deep colors, minimalist',
+    '心理学': 'mind and brain imagery, soft colors, professional',
+    '经济': 'business professional style, charts and graphs, gold and navy',
+    '科学': 'scientific illustration style, cosmos and atoms, vibrant',
+    '艺术': 'artistic creative style, colorful, expressive brushstrokes',
+}
+
 
 class Command(BaseCommand):
     help = '使用AI生成图书封面'
@@ -22,19 +35,9 @@ class Command(BaseCommand):
 
     def generate_cover_prompt(self, book):
         """根据图书信息生成封面提示词"""
-        category_style = {
-            '计算机': 'modern tech style, circuit patterns, blue and white colors',
-            '文学': 'elegant literary style, classic design, warm colors',
-            '历史': 'vintage historical style, ancient textures, sepia tones',
-            '哲学': 'philosophical abstract style, deep colors, minimalist',
-            '心理学': 'mind and brain imagery, soft colors, professional',
-            '经济': 'business professional style, charts and graphs, gold and navy',
-            '科学': 'scientific illustration style, cosmos and atoms, vibrant',
-            '艺术': 'artistic creative style, colorful, expressive brushstrokes',
-        }
-
-        cat_name = book.category.name if book.category else '文学'
-        style = category_style.get(cat_name, 'elegant book cover design, professional')
+        # 分类名称来自进程内的分类缓存，逐本生成时不查询分类表
+        cat_name = registry.name(book.category_id, '文学')
+        style = CATEGORY_STYLES.get(cat_name, 'elegant book cover design, professional')
 
         prompt = f"Book cover design for '{book.title}' by {book.author}, {style}, high quality, professional publishing standard, no text"
         return prompt
@@ -0,0 +1,249 @@
+"""
+批量导入图书目录
+
+使用方法：
+python manage.py import_catalog catalog.csv
+python manage.py import_catalog catalog.jsonl --batch-size 2000
+cat catalog.jsonl | python manage.py import_catalog - --format jsonl
+
+CSV/JSONL 字段：isbn, title, author, publisher, publish_date, category,
+description, location, copies（副本数，可选）
+
+逐行流式读取，按批次校验 ISBN、解析分类，并使用
+bulk_create(update_conflicts=True) 以 ISBN 为键批量插入或更新图书，
+副本编号通过 F() 自增预留后批量创建。结束时输出每秒处理行数。
+"""
+import csv
+import io
+import json
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from books.models import Book, BookCopy, Category, format_copy_number, update_available_counts
+
+
+BOOK_FIELDS = ['title', 'author', 'publisher', 'publish_date', 'category', 'description', 'location']
+
+
+def text(value):
+    """字段值转换为去掉首尾空白的字符串，JSONL 中的数字等类型也按文本处理"""
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def normalize_isbn(value):
+    """清理 ISBN，格式不正确时返回 None"""
+    isbn = text(value)
+    isbn_clean = isbn.replace('-', '')
+    if not isbn_clean.isdigit() or len(isbn_clean) not in [10, 13]:
+        return None
+    return isbn
+
+
+class Command(BaseCommand):
+    help = '从 CSV/JSONL 文件批量导入图书目录'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='导入文件路径，"-" 表示从标准输入读取')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'jsonl'],
+            help='文件格式，默认根据扩展名判断',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='每批处理的行数（默认1000）',
+        )
+        parser.add_argument(
+            '--default-copies',
+            type=int,
+            default=1,
+            help='未指定 copies 字段时每本书的副本数（默认1）',
+        )
+        parser.add_argument(
+            '--encoding',
+            default='utf-8-sig',
+            help='文件编码（默认 utf-8-sig）',
+        )
+
+    def iter_rows(self, stream, fmt):
+        """流式读取每一行"""
+        if fmt == 'csv':
+            yield from csv.DictReader(stream)
+        else:
+            for line in stream:
+                line = line.strip()
+                if not line:
+                    continue
+                row = json.loads(line)
+                if isinstance(row, dict):
+                    yield row
+                else:
+                    # 合法的 JSON 但不是对象（如数组、字符串），跳过
+                    self.stats['rows'] += 1
+                    self.stats['skipped'] += 1
+
+    def open_stream(self, path, encoding):
+        if path == '-':
+            return io.TextIOWrapper(sys.stdin.buffer, encoding=encoding)
+        try:
+            return open(path, encoding=encoding, newline='')
+        except OSError as e:
+            raise CommandError(f'无法打开文件: {e}')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format']
+        if not fmt:
+            if path.endswith('.csv'):
+                fmt = 'csv'
+            elif path.endswith('.jsonl') or path.endswith('.json'):
+                fmt = 'jsonl'
+            else:
+                raise CommandError('无法判断文件格式，请使用 --format 指定')
+
+        self.batch_size = max(options['batch_size'], 1)
+        self.default_copies = max(options['default_copies'], 0)
+        # 分类名称 -> ID 的内存映射，整个导入过程只查询一次
+        self.category_map = dict(Category.objects.values_list('name', 'id'))
+        self.stats = {'rows': 0, 'books': 0, 'copies': 0, 'skipped': 0}
+
+        start = time.monotonic()
+        stream = self.open_stream(path, options['encoding'])
+        try:
+            batch = []
+            for row in self.iter_rows(stream, fmt):
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    self.import_batch(batch)
+                    batch = []
+                    self.report_progress(start)
+            if batch:
+                self.import_batch(batch)
+                self.report_progress(start)
+        except (csv.Error, json.JSONDecodeError) as e:
+            raise CommandError(f'第 {self.stats["rows"] + 1} 行附近解析失败: {e}')
+        finally:
+            if path != '-':
+                stream.close()
+
+        elapsed = time.monotonic() - start
+        rate = self.stats['rows'] / elapsed if elapsed > 0 else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'导入完成: 共 {self.stats["rows"]} 行, 图书 {self.stats["books"]} 本, '
+            f'新增副本 {self.stats["copies"]} 个, 跳过 {self.stats["skipped"]} 行'
+        ))
+        self.stdout.write(f'耗时 {elapsed:.2f} 秒, 速率 {rate:.0f} 行/秒')
+
+    def report_progress(self, start):
+        elapsed = time.monotonic() - start
+        rate = self.stats['rows'] / elapsed if elapsed > 0 else 0
+        self.stdout.write(f'  已处理 {self.stats["rows"]} 行 ({rate:.0f} 行/秒)')
+
+    def resolve_category(self, name):
+        """通过内存映射解析分类，不存在时创建"""
+        name = text(name)
+        if not name:
+            return None
+        if name not in self.category_map:
+            category, _ = Category.objects.get_or_create(name=name)
+            self.category_map[name] = category.id
+        return self.category_map[name]
+
+    def build_book(self, row):
+        """将一行数据转换为 Book 实例，数据无效时返回 None"""
+        isbn = normalize_isbn(row.get('isbn'))
+        title = text(row.get('title'))
+        author = text(row.get('author'))
+        if not isbn or not title or not author:
+            return None
+
+        publish_date = row.get('publish_date') or None
+        if publish_date:
+            try:
+                publish_date = parse_date(str(publish_date))
+            except ValueError:
+                publish_date = None
+            if publish_date and publish_date > timezone.now().date():
+                publish_date = None
+
+        return Book(
+            isbn=isbn,
+            title=title[:200],
+            author=author[:200],
+            publisher=text(row.get('publisher'))[:200],
+            publish_date=publish_date,
+            category_id=self.resolve_category(row.get('category')),
+            description=text(row.get('description')),
+            location=text(row.get('location'))[:100],
+        )
+
+    def copies_wanted(self, row):
+        copies = row.get('copies')
+        if copies is None or copies == '':
+            return self.default_copies
+        try:
+            return max(int(copies), 0)
+        except (TypeError, ValueError):
+            return self.default_copies
+
+    def import_batch(self, rows):
+        """导入一批数据"""
+        books = {}
+        copies_wanted = {}
+        for row in rows:
+            self.stats['rows'] += 1
+            book = self.build_book(row)
+            if book is None:
+                self.stats['skipped'] += 1
+                continue
+            # 同一批次内重复的 ISBN 以最后一行为准
+            books[book.isbn] = book
+            copies_wanted[book.isbn] = self.copies_wanted(row)
+
+        if not books:
+            return
+
+        with transaction.atomic():
+            Book.objects.bulk_create(
+                list(books.values()),
+                update_conflicts=True,
+                unique_fields=['isbn'],
+                # 导入已软删除的图书时恢复该图书
+                update_fields=BOOK_FIELDS + ['updated_at', 'deleted_at'],
+            )
+            book_ids = dict(Book.objects.filter(isbn__in=books.keys()).values_list('isbn', 'id'))
+            copy_counts = dict(
+                BookCopy.objects.filter(book_id__in=book_ids.values())
+                .values('book_id').annotate(n=Count('id')).values_list('book_id', 'n')
+            )
+
+            # 需要补充的副本数 -> 图书ID
+            missing_by_count = {}
+            for isbn, book_id in book_ids.items():
+                missing = copies_wanted[isbn] - copy_counts.get(book_id, 0)
+                if missing > 0:
+                    missing_by_count.setdefault(missing, []).append(book_id)
+
+            # 与 BookCopyManager.reserve_copy_numbers 相同，用 F() 自增预留副本序号，
+            # 同时进行的导入或添加副本不会拿到相同的编号；补充数量相同的图书用一条 UPDATE
+            new_copies = []
+            for missing, ids in missing_by_count.items():
+                Book.all_objects.filter(pk__in=ids).update(copy_sequence=F('copy_sequence') + missing)
+                for book_id, last in Book.all_objects.filter(pk__in=ids).values_list('id', 'copy_sequence'):
+                    new_copies.extend(
+                        BookCopy(book_id=book_id, copy_number=format_copy_number(book_id, seq))
+                        for seq in range(last - missing + 1, last + 1)
+                    )
+            BookCopy.objects.bulk_create(new_copies)
+            update_available_counts([book_id for ids in missing_by_count.values() for book_id in ids])
+
+        self.stats['books'] += len(books)
+        self.stats['copies'] += len(new_copies)
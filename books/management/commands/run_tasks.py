@@ -14,7 +14,7 @@ from books.tasks import run_all_tasks
 
 
 class Command(BaseCommand):
-    help = '运行图书管理系统的定时任务（到期提醒、预约过期检查等）'
+    help = '运行图书管理系统的定时任务（到期提醒、预约过期检查、过期会话清理等）'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -42,6 +42,15 @@ class Command(BaseCommand):
             expired = results.get('expired_reservations', 0)
             self.stdout.write(f'  - 过期预约处理: {expired} 条')
 
+            # 输出图书统计刷新结果
+            self.stdout.write(f'  - 图书借阅热度刷新: {results.get("catalog_stats", 0)} 本')
+
+            # 输出过期会话清理结果
+            self.stdout.write(f'  - 过期会话清理: {results.get("expired_sessions", 0)} 条')
+            self.stdout.write(f'  - 过期验证码清理: {results.get("verification_tokens", 0)} 条')
+            self.stdout.write(f'  - 目录删除记录清理: {results.get("catalog_tombstones", 0)} 条')
+            self.stdout.write(f'  - 已删除图书清理: {results.get("deleted_books", 0)} 本')
+
             self.stdout.write(self.style.SUCCESS(
                 f'[{timezone.now().strftime("%Y-%m-%d %H:%M:%S")}] 定时任务执行完成'
             ))
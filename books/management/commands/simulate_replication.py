@@ -0,0 +1,49 @@
+"""
+模拟主从复制（本地测试只读副本路由）
+
+使用方法：
+DB_REPLICAS=replica.sqlite3 python manage.py simulate_replication --interval 2
+
+按固定间隔用 SQLite 备份 API 将主库完整复制到每个副本文件，
+间隔即为模拟的复制延迟。仅适用于 SQLite。
+"""
+import sqlite3
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from config.db import replica_aliases
+
+
+class Command(BaseCommand):
+    help = '将 SQLite 主库定期复制到只读副本，模拟复制延迟'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=2.0, help='复制间隔（秒），即模拟的复制延迟')
+        parser.add_argument('--once', action='store_true', help='只复制一次')
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        replicas = [settings.DATABASES[alias] for alias in replica_aliases(settings.DATABASES)]
+        if 'sqlite3' not in primary['ENGINE']:
+            raise CommandError('仅支持 SQLite 数据库')
+        if not replicas:
+            raise CommandError('未配置只读副本，请设置 DB_REPLICAS')
+
+        self.stdout.write(f'主库 {primary["NAME"]} -> 副本 {", ".join(str(r["NAME"]) for r in replicas)}')
+        while True:
+            start = time.monotonic()
+            source = sqlite3.connect(primary['NAME'])
+            try:
+                for replica in replicas:
+                    target = sqlite3.connect(replica['NAME'])
+                    try:
+                        source.backup(target)
+                    finally:
+                        target.close()
+            finally:
+                source.close()
+            self.stdout.write(f'[{time.strftime("%H:%M:%S")}] 已同步 ({(time.monotonic() - start) * 1000:.0f} ms)')
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
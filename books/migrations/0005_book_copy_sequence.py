@@ -0,0 +1,41 @@
+# Generated by Django 6.0 on 2026-10-19 07:32
+
+from django.db import migrations, models
+
+
+def init_copy_sequence(apps, schema_editor):
+    """根据已有副本编号初始化每本书的副本序号"""
+    Book = apps.get_model('books', 'Book')
+    BookCopy = apps.get_model('books', 'BookCopy')
+
+    sequences = {}
+    counts = {}
+    for book_id, copy_number in BookCopy.objects.values_list('book_id', 'copy_number').iterator():
+        try:
+            seq = int(copy_number.rsplit('-', 1)[-1])
+        except ValueError:
+            seq = 0
+        counts[book_id] = counts.get(book_id, 0) + 1
+        sequences[book_id] = max(sequences.get(book_id, 0), seq, counts[book_id])
+
+    books = []
+    for book in Book.objects.filter(pk__in=sequences.keys()).only('pk'):
+        book.copy_sequence = sequences[book.pk]
+        books.append(book)
+    Book.objects.bulk_update(books, ['copy_sequence'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0004_book_cover'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='copy_sequence',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='副本序号'),
+        ),
+        migrations.RunPython(init_copy_sequence, migrations.RunPython.noop),
+    ]
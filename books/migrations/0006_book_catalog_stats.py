@@ -0,0 +1,59 @@
+# Generated by Django 6.0 on 2026-10-19 07:34
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def init_catalog_stats(apps, schema_editor):
+    """初始化可借副本数和近30天借阅次数"""
+    Book = apps.get_model('books', 'Book')
+    BookCopy = apps.get_model('books', 'BookCopy')
+    BorrowRecord = apps.get_model('books', 'BorrowRecord')
+
+    available = BookCopy.objects.filter(
+        book=OuterRef('pk'), status='available'
+    ).order_by().values('book').annotate(n=Count('pk')).values('n')
+    recent = BorrowRecord.objects.filter(
+        book=OuterRef('pk'), borrow_date__gte=timezone.now() - timedelta(days=30)
+    ).order_by().values('book').annotate(n=Count('pk')).values('n')
+    Book.objects.update(
+        available_count=Coalesce(Subquery(available), 0),
+        recent_borrow_count=Coalesce(Subquery(recent), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0005_book_copy_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='available_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='可借副本数'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='recent_borrow_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='近30天借阅次数'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-created_at'], name='book_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-recent_borrow_count', '-created_at'], name='book_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-available_count', '-created_at'], name='book_available_idx'),
+        ),
+        migrations.RunPython(init_catalog_stats, migrations.RunPython.noop),
+    ]
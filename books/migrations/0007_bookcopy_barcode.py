@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+
+def init_barcodes(apps, schema_editor):
+    """用已有的副本编号作为条码，编号在不同图书间重复时追加副本ID"""
+    BookCopy = apps.get_model('books', 'BookCopy')
+
+    used = set()
+    copies = []
+    for copy in BookCopy.objects.only('pk', 'copy_number').order_by('pk').iterator():
+        barcode = copy.copy_number
+        if not barcode or barcode in used:
+            barcode = f'{copy.copy_number}#{copy.pk}'
+        used.add(barcode)
+        copy.barcode = barcode
+        copies.append(copy)
+    BookCopy.objects.bulk_update(copies, ['barcode'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0006_book_catalog_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookcopy',
+            name='barcode',
+            field=models.CharField(editable=False, max_length=50, null=True, verbose_name='条码'),
+        ),
+        migrations.RunPython(init_barcodes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='bookcopy',
+            name='barcode',
+            field=models.CharField(editable=False, max_length=50, unique=True, verbose_name='条码'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-19 13:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0009_book_soft_delete'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBorrowRecord',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('borrow_date', models.DateTimeField(verbose_name='借阅日期')),
+                ('due_date', models.DateTimeField(verbose_name='应还日期')),
+                ('return_date', models.DateTimeField(blank=True, null=True, verbose_name='归还日期')),
+                ('status', models.CharField(choices=[('borrowed', '借阅中'), ('returned', '已归还'), ('overdue', '已逾期')], default='returned', max_length=20, verbose_name='状态')),
+                ('notes', models.TextField(blank=True, verbose_name='备注')),
+                ('reminder_3days_sent', models.BooleanField(default=False, verbose_name='3天提醒已发送')),
+                ('reminder_1day_sent', models.BooleanField(default=False, verbose_name='1天提醒已发送')),
+                ('overdue_reminder_sent', models.BooleanField(default=False, verbose_name='逾期提醒已发送')),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_borrow_records', to='books.book', verbose_name='图书')),
+                ('book_copy', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_borrow_records', to='books.bookcopy', verbose_name='图书副本')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_borrow_records', to=settings.AUTH_USER_MODEL, verbose_name='借阅人')),
+            ],
+            options={
+                'verbose_name': '归档借阅记录',
+                'verbose_name_plural': '归档借阅记录',
+                'ordering': ['-borrow_date'],
+                'indexes': [models.Index(fields=['user', '-borrow_date'], name='archived_loan_user_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:21
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def init_total_count(apps, schema_editor):
+    """初始化副本总数"""
+    Book = apps.get_model('books', 'Book')
+    BookCopy = apps.get_model('books', 'BookCopy')
+
+    copies = BookCopy.objects.filter(
+        book=OuterRef('pk')
+    ).order_by().values('book').annotate(n=Count('pk')).values('n')
+    Book.objects.update(total_count=Coalesce(Subquery(copies), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0011_borrow_record_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='total_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='副本总数'),
+        ),
+        migrations.RunPython(init_total_count, migrations.RunPython.noop),
+    ]
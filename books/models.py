@@ -1,9 +1,16 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q, Case, Count, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.core.cache import cache
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
 from datetime import timedelta
 from django.utils import timezone
+from .categories import invalidate_categories
+from .fragments import invalidate_fragments
 
 
 class Category(models.Model):
@@ -28,6 +35,13 @@ class Category(models.Model):
                 raise ValidationError({'name': '分类名称不能超过100个字符'})
 
 
+class BookManager(models.Manager):
+    """默认只返回未删除的图书，已删除的图书通过 Book.all_objects 访问"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Book(models.Model):
     """图书模型"""
     isbn = models.CharField(max_length=20, unique=True, verbose_name='ISBN')
@@ -45,17 +59,41 @@ class Book(models.Model):
     description = models.TextField(blank=True, verbose_name='简介')
     cover = models.ImageField(upload_to='covers/', blank=True, null=True, verbose_name='封面')
     location = models.CharField(max_length=100, blank=True, verbose_name='存放位置')
+    # 已分配的最大副本序号，用于生成不重复的副本编号
+    copy_sequence = models.PositiveIntegerField(default=0, editable=False, verbose_name='副本序号')
+    # 冗余统计字段，供首页筛选和排序使用，避免每次查询都聚合副本和借阅记录
+    available_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='可借副本数')
+    total_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='副本总数')
+    recent_borrow_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='近30天借阅次数')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='添加时间')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    # 软删除时间，删除后由定时任务分批清理副本和预约记录，借阅记录保留（见 tasks.purge_deleted_books）
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False, db_index=True, verbose_name='删除时间')
+
+    objects = BookManager()
+    all_objects = models.Manager()
 
     class Meta:
         verbose_name = '图书'
         verbose_name_plural = '图书'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='book_newest_idx'),
+            models.Index(fields=['-recent_borrow_count', '-created_at'], name='book_popular_idx'),
+            models.Index(fields=['-available_count', '-created_at'], name='book_available_idx'),
+            # 目录接口按 (updated_at, id) 增量同步
+            models.Index(fields=['updated_at', 'id'], name='book_updated_idx'),
+        ]
+
+    COUNTER_FIELDS = ('copy_sequence', 'available_count', 'total_count', 'recent_borrow_count')
 
     def __str__(self):
         return f'{self.title} - {self.author}'
 
+    def soft_delete(self):
+        self.deleted_at = timezone.now()
+        soft_delete_books([self.pk], now=self.deleted_at)
+
     @property
     def total_copies(self):
         """总副本数"""
@@ -72,7 +110,7 @@ class Book(models.Model):
         return self.copies.filter(status='borrowed').count()
 
     def is_available(self):
-        return self.available_copies > 0
+        return self.available_count > 0
 
     def get_available_copy(self):
         """获取一本可借的副本"""
@@ -103,9 +141,145 @@ class Book(models.Model):
             self.author = self.author.strip()
         if self.isbn:
             self.isbn = self.isbn.strip()
+        # 统计字段由数据库原子更新，编辑图书时不覆盖
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTER_FIELDS
+            ]
         super().save(*args, **kwargs)
 
 
+def update_available_counts(book_ids):
+    """重新计算指定图书的可借副本数和副本总数（副本有变化，同时更新 updated_at 供目录接口增量同步）"""
+    copies = BookCopy.objects.filter(book=OuterRef('pk')).order_by().values('book')
+    Book.objects.filter(pk__in=book_ids).update(
+        available_count=Coalesce(Subquery(
+            copies.filter(status='available').annotate(n=Count('pk')).values('n')
+        ), 0),
+        total_count=Coalesce(Subquery(copies.annotate(n=Count('pk')).values('n')), 0),
+        updated_at=timezone.now(),
+    )
+
+
+def soft_delete_books(book_ids, now=None):
+    """
+    软删除图书：只标记删除时间、取消有效预约并写入删除记录，
+    副本保留到 purge_deleted_books 清理，借出的副本仍可归还
+    """
+    from .barcodes import invalidate_barcodes
+
+    now = now or timezone.now()
+    with transaction.atomic():
+        book_ids = list(Book.objects.filter(pk__in=book_ids).values_list('pk', flat=True))
+        if not book_ids:
+            return 0
+        Book.all_objects.filter(pk__in=book_ids).update(deleted_at=now, updated_at=now)
+        CatalogTombstone.objects.bulk_create([
+            CatalogTombstone(model='book', object_id=book_id, deleted_at=now) for book_id in book_ids
+        ])
+
+        reservations = Reservation.objects.filter(book_id__in=book_ids, status__in=['waiting', 'notified'])
+        user_ids = set(reservations.values_list('user_id', flat=True))
+        reservations.update(status='cancelled')
+        for user_id in user_ids:
+            invalidate_loan_summary(user_id)
+        invalidate_barcodes(BookCopy.objects.filter(book_id__in=book_ids).values_list('barcode', flat=True))
+    return len(book_ids)
+
+
+def update_recent_borrow_counts(days=30):
+    """重新计算所有图书近 days 天的借阅次数"""
+    since = timezone.now() - timedelta(days=days)
+    recent = BorrowRecord.objects.filter(
+        book=OuterRef('pk'), borrow_date__gte=since
+    ).order_by().values('book').annotate(n=Count('pk')).values('n')
+    return Book.objects.update(recent_borrow_count=Coalesce(Subquery(recent), 0))
+
+
+class CatalogTombstone(models.Model):
+    """目录删除记录，目录接口据此告知客户端哪些数据已删除"""
+    MODEL_CHOICES = [
+        ('book', '图书'),
+    ]
+
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES, verbose_name='类型')
+    object_id = models.PositiveIntegerField(verbose_name='对象ID')
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True, verbose_name='删除时间')
+
+    class Meta:
+        verbose_name = '目录删除记录'
+        verbose_name_plural = '目录删除记录'
+        ordering = ['deleted_at']
+
+    def __str__(self):
+        return f'{self.get_model_display()} #{self.object_id}'
+
+
+def format_copy_number(book_id, seq):
+    """副本编号格式：图书ID-序号，如 0042-003"""
+    return f'{book_id:04d}-{seq:03d}'
+
+
+class BookCopyManager(models.Manager):
+    """图书副本管理器"""
+
+    def reserve_copy_numbers(self, book, count):
+        """原子地为图书预留 count 个副本编号"""
+        with transaction.atomic():
+            # 已软删除的图书仍可能添加副本（如导入时恢复），不经过默认管理器的过滤
+            Book.all_objects.filter(pk=book.pk).update(copy_sequence=F('copy_sequence') + count)
+            last = Book.all_objects.filter(pk=book.pk).values_list('copy_sequence', flat=True).get()
+        book.copy_sequence = last
+        return [format_copy_number(book.pk, seq) for seq in range(last - count + 1, last + 1)]
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # 条码默认与副本编号相同
+        objs = list(objs)
+        for obj in objs:
+            if not obj.barcode:
+                obj.barcode = obj.copy_number
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def set_status(self, book, copy_ids, status):
+        """
+        批量修改副本状态，用一条 UPDATE ... WHERE id IN 完成；
+        借出中的副本只能通过还书改变状态，会被跳过。返回实际修改的副本
+        """
+        from .barcodes import invalidate_barcodes
+        from .tasks import notify_reservation
+
+        with transaction.atomic():
+            changed = list(
+                self.select_for_update(of=('self',))
+                .filter(book=book, pk__in=copy_ids)
+                .exclude(status__in=['borrowed', status])
+            )
+            if not changed:
+                return []
+            self.filter(pk__in=[copy.pk for copy in changed]).update(status=status)
+            for copy in changed:
+                copy.status = status
+            update_available_counts([book.pk])
+            invalidate_barcodes(copy.barcode for copy in changed)
+            if status == 'available':
+                transaction.on_commit(lambda: notify_reservation(book))
+        return changed
+
+    def create_many(self, book, count, **fields):
+        """批量创建 count 个副本，编号一次性预留"""
+        if count <= 0:
+            return []
+        with transaction.atomic():
+            numbers = self.reserve_copy_numbers(book, count)
+            copies = self.bulk_create([
+                self.model(book=book, copy_number=number, **fields)
+                for number in numbers
+            ])
+            update_available_counts([book.pk])
+        return copies
+
+
 class BookCopy(models.Model):
     """图书副本模型 - 每本实体书"""
     STATUS_CHOICES = [
@@ -115,6 +289,8 @@ class BookCopy(models.Model):
         ('maintenance', '维护中'),
         ('lost', '已丢失'),
     ]
+    # 副本管理页可以手动设置的状态
+    MANUAL_STATUSES = ['available', 'maintenance', 'lost']
 
     book = models.ForeignKey(
         Book,
@@ -123,6 +299,8 @@ class BookCopy(models.Model):
         verbose_name='图书'
     )
     copy_number = models.CharField(max_length=50, verbose_name='副本编号')
+    # 贴在书上的条码，全局唯一；新副本默认等于副本编号，之后修改副本编号不影响条码
+    barcode = models.CharField(max_length=50, unique=True, editable=False, verbose_name='条码')
     status = models.CharField(
         max_length=20,
         choices=STATUS_CHOICES,
@@ -133,6 +311,8 @@ class BookCopy(models.Model):
     notes = models.TextField(blank=True, verbose_name='备注')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='入库时间')
 
+    objects = BookCopyManager()
+
     class Meta:
         verbose_name = '图书副本'
         verbose_name_plural = '图书副本'
@@ -145,9 +325,91 @@ class BookCopy(models.Model):
     def save(self, *args, **kwargs):
         # 如果没有副本编号，自动生成
         if not self.copy_number:
-            existing_count = BookCopy.objects.filter(book=self.book).count()
-            self.copy_number = f'{self.book.id:04d}-{existing_count + 1:03d}'
+            self.copy_number = BookCopy.objects.reserve_copy_numbers(self.book, 1)[0]
+        if not self.barcode:
+            self.barcode = self.copy_number
         super().save(*args, **kwargs)
+        update_available_counts([self.book_id])
+        from .barcodes import invalidate_barcodes
+        invalidate_barcodes([self.barcode])
+
+    def delete(self, *args, **kwargs):
+        book_id = self.book_id
+        barcode = self.barcode
+        result = super().delete(*args, **kwargs)
+        update_available_counts([book_id])
+        from .barcodes import invalidate_barcodes
+        invalidate_barcodes([barcode])
+        return result
+
+
+class DaysUntil(models.Func):
+    """
+    两个时间之间相差的整天数（在数据库中计算），DaysUntil(较晚的时间, 较早的时间)
+    与 timedelta.days 相同，向下取整：相差 -1.5 天时为 -2，而不是 -1
+    """
+    output_field = models.IntegerField()
+    arg_joiner = ' - '
+    template = 'CAST(FLOOR(EXTRACT(EPOCH FROM (%(expressions)s)) / 86400) AS INTEGER)'
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # SQLite 没有内置 FLOOR 时由 Django 在连接上注册
+        return self.as_sql(
+            compiler, connection,
+            template='CAST(FLOOR(julianday(%(expressions)s)) AS INTEGER)',
+            arg_joiner=') - julianday(',
+            **extra_context
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        clone = self.copy()
+        clone.set_source_expressions(clone.get_source_expressions()[::-1])
+        return clone.as_sql(
+            compiler, connection,
+            template='FLOOR(TIMESTAMPDIFF(SECOND, %(expressions)s) / 86400)',
+            arg_joiner=', ',
+            **extra_context
+        )
+
+
+class BorrowRecordQuerySet(models.QuerySet):
+
+    def with_due_status(self, now=None):
+        """
+        在 SQL 中计算逾期状态和剩余天数，结果与模型的 is_overdue()、days_remaining() 相同，
+        分别保存在 overdue 和 days_left 属性中（不与方法同名，以免覆盖方法）
+        """
+        now = now or timezone.now()
+        return self.annotate(
+            overdue=Case(
+                When(~Q(status='returned') & Q(due_date__lt=now), then=Value(True)),
+                default=Value(False),
+                output_field=models.BooleanField(),
+            ),
+            days_left=Case(
+                When(status='returned', then=Value(0)),
+                default=DaysUntil(F('due_date'), Value(now, output_field=models.DateTimeField())),
+            ),
+        )
+
+
+class BorrowHistoryManager(models.Manager):
+    """在线借阅记录和归档记录的联合查询，用于借阅历史、统计和导出"""
+
+    def with_archived(self, fields=None, **filters):
+        """
+        对 BorrowRecord 和 ArchivedBorrowRecord 使用相同的筛选条件，返回 UNION ALL 查询集。
+        未指定 fields 时结果为 BorrowRecord 实例（关联对象需用 prefetch_related_objects 加载）；
+        指定 fields 时返回 values_list 元组，可以包含 user__username 等关联字段。
+        结果只支持 order_by、切片和 count 等操作
+        """
+        querysets = []
+        for model in (self.model, ArchivedBorrowRecord):
+            queryset = model.objects.filter(**filters).order_by()
+            if fields:
+                queryset = queryset.values_list(*fields)
+            querysets.append(queryset)
+        return querysets[0].union(*querysets[1:], all=True)
 
 
 class BorrowRecord(models.Model):
@@ -193,10 +455,18 @@ class BorrowRecord(models.Model):
     reminder_1day_sent = models.BooleanField(default=False, verbose_name='1天提醒已发送')
     overdue_reminder_sent = models.BooleanField(default=False, verbose_name='逾期提醒已发送')
 
+    objects = BorrowRecordQuerySet.as_manager()
+    history = BorrowHistoryManager()
+
     class Meta:
         verbose_name = '借阅记录'
         verbose_name_plural = '借阅记录'
         ordering = ['-borrow_date']
+        indexes = [
+            # 后台和管理员列表按借阅时间倒序分页，可按状态筛选
+            models.Index(fields=['-borrow_date'], name='borrow_date_idx'),
+            models.Index(fields=['status', '-borrow_date'], name='borrow_status_date_idx'),
+        ]
 
     def __str__(self):
         copy_info = f' [{self.book_copy.copy_number}]' if self.book_copy else ''
@@ -207,6 +477,12 @@ class BorrowRecord(models.Model):
             # 默认借阅期限30天
             self.due_date = timezone.now() + timedelta(days=30)
         super().save(*args, **kwargs)
+        invalidate_loan_summary(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        invalidate_loan_summary(self.user_id)
+        return result
 
     def is_overdue(self):
         if self.status == 'returned':
@@ -220,6 +496,59 @@ class BorrowRecord(models.Model):
         return delta.days
 
 
+class ArchivedBorrowRecord(models.Model):
+    """
+    已归档的借阅记录（archive_loans 命令从 BorrowRecord 移入的已归还记录）
+    字段与 BorrowRecord 一一对应且顺序相同、保留原记录ID，
+    因此两张表可以直接 UNION 查询（见 BorrowHistoryManager）
+    """
+    id = models.BigIntegerField(primary_key=True, verbose_name='ID')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='archived_borrow_records',
+        verbose_name='借阅人'
+    )
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.CASCADE,
+        related_name='archived_borrow_records',
+        verbose_name='图书'
+    )
+    book_copy = models.ForeignKey(
+        BookCopy,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_borrow_records',
+        verbose_name='图书副本'
+    )
+    borrow_date = models.DateTimeField(verbose_name='借阅日期')
+    due_date = models.DateTimeField(verbose_name='应还日期')
+    return_date = models.DateTimeField(null=True, blank=True, verbose_name='归还日期')
+    status = models.CharField(
+        max_length=20,
+        choices=BorrowRecord.STATUS_CHOICES,
+        default='returned',
+        verbose_name='状态'
+    )
+    notes = models.TextField(blank=True, verbose_name='备注')
+    reminder_3days_sent = models.BooleanField(default=False, verbose_name='3天提醒已发送')
+    reminder_1day_sent = models.BooleanField(default=False, verbose_name='1天提醒已发送')
+    overdue_reminder_sent = models.BooleanField(default=False, verbose_name='逾期提醒已发送')
+
+    class Meta:
+        verbose_name = '归档借阅记录'
+        verbose_name_plural = '归档借阅记录'
+        ordering = ['-borrow_date']
+        indexes = [
+            models.Index(fields=['user', '-borrow_date'], name='archived_loan_user_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user.username} 借阅 {self.book.title}（已归档）'
+
+
 class Reservation(models.Model):
     """预约记录"""
     STATUS_CHOICES = [
@@ -260,6 +589,15 @@ class Reservation(models.Model):
     def __str__(self):
         return f'{self.user.username} 预约 {self.book.title}'
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        invalidate_loan_summary(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        invalidate_loan_summary(self.user_id)
+        return result
+
     @property
     def queue_position(self):
         """获取在等待队列中的位置"""
@@ -270,3 +608,52 @@ class Reservation(models.Model):
             status='waiting',
             created_at__lt=self.created_at
         ).count() + 1
+
+
+# 导航栏借阅摘要的缓存时间（秒），批量更新不会触发失效，逾期数量也会随时间变化
+LOAN_SUMMARY_TIMEOUT = 300
+
+
+def loan_summary_key(user_id):
+    return f'loan_summary:{user_id}'
+
+
+def get_loan_summary(user_id):
+    """用户当前借阅数、逾期数和有效预约数（带缓存）"""
+    key = loan_summary_key(user_id)
+    summary = cache.get(key)
+    if summary is None:
+        summary = BorrowRecord.objects.filter(user_id=user_id, status='borrowed').aggregate(
+            active_loans=Count('pk'),
+            overdue=Count('pk', filter=Q(due_date__lt=timezone.now())),
+        )
+        summary['reservations'] = Reservation.objects.filter(
+            user_id=user_id, status__in=['waiting', 'notified']
+        ).count()
+        cache.set(key, summary, LOAN_SUMMARY_TIMEOUT)
+    return summary
+
+
+def invalidate_loan_summary(user_id):
+    cache.delete(loan_summary_key(user_id))
+
+
+@receiver(post_delete, sender=Book)
+def record_book_tombstone(sender, instance, **kwargs):
+    """直接删除图书时记录删除时间，软删除时已经记录过"""
+    if instance.deleted_at is None:
+        CatalogTombstone.objects.create(model='book', object_id=instance.pk)
+
+
+@receiver(pre_delete, sender=Category)
+def touch_category_books(sender, instance, **kwargs):
+    """删除分类会把图书的分类置空（不经过 save），先更新这些图书的 updated_at"""
+    Book.objects.filter(category=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_caches(sender, instance, **kwargs):
+    """分类增删改后，进程内的分类缓存、缓存的分类下拉框和图书卡片上的分类名称失效"""
+    invalidate_categories()
+    invalidate_fragments('categories')
@@ -0,0 +1,46 @@
+"""
+大表分页
+借阅记录等大表的 COUNT(*) 需要扫描整张表，后台列表页未筛选时改用数据库的行数估计值，
+行数较少或有筛选条件时仍然精确计数。
+SQLite 没有自动维护的行数估计值（MAX(rowid) 在归档或删除记录后会偏大，最后几页为空），始终精确计数。
+"""
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# 估计值小于该行数时直接精确计数
+EXACT_COUNT_THRESHOLD = 10000
+
+
+def estimated_row_count(model, using='default'):
+    """PostgreSQL、MySQL 维护的表行数估计值，其他数据库返回 None"""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT TABLE_ROWS FROM information_schema.TABLES '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s', [table]
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """未筛选的查询集使用行数估计值作为总数"""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is not None and not query.where and not query.combinator and not query.distinct:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= EXACT_COUNT_THRESHOLD:
+                return estimate
+        return super().count
@@ -0,0 +1,237 @@
+"""
+请求级性能分析
+记录每个视图的耗时、数据库查询次数与耗时、模板渲染耗时，并检测重复查询。
+通过环境变量 PROFILING_ENABLED=1 开启，统计数据保存在进程内存中。
+
+查询统计依赖在当前线程的数据库连接上安装的 execute_wrapper，只适用于同步请求。
+异步请求（ASGI 应用中的 AI 接口）的查询在 sync_to_async 的线程中执行，无法这样统计，
+中间件对异步请求直接放行，不做统计，也不会把异步视图切换到线程中执行。
+"""
+import logging
+import threading
+import time
+import traceback
+from contextlib import ExitStack, contextmanager
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template as DjangoTemplate
+
+logger = logging.getLogger(__name__)
+
+# 直方图分桶上界
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_local = threading.local()
+
+# 流式响应内容迭代结束的标记
+_END = object()
+
+
+class Histogram:
+    """累计分桶直方图"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'buckets': dict(zip((str(b) for b in self.buckets), self.counts)),
+        }
+
+
+class ViewStats:
+    """单个视图的统计数据"""
+
+    def __init__(self):
+        self.wall_time = Histogram(TIME_BUCKETS)
+        self.db_time = Histogram(TIME_BUCKETS)
+        self.template_time = Histogram(TIME_BUCKETS)
+        self.query_count = Histogram(COUNT_BUCKETS)
+        self.duplicate_queries = 0
+
+    def to_dict(self):
+        return {
+            'wall_time': self.wall_time.to_dict(),
+            'db_time': self.db_time.to_dict(),
+            'template_time': self.template_time.to_dict(),
+            'query_count': self.query_count.to_dict(),
+            'duplicate_queries': self.duplicate_queries,
+        }
+
+
+class MetricsRegistry:
+    """进程内的视图统计汇总"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def record(self, view_name, profile):
+        with self.lock:
+            stats = self.views.setdefault(view_name, ViewStats())
+            stats.wall_time.observe(profile.wall_time)
+            stats.db_time.observe(profile.db_time)
+            stats.template_time.observe(profile.template_time)
+            stats.query_count.observe(profile.query_count)
+            stats.duplicate_queries += profile.duplicate_count
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+
+    def to_dict(self):
+        with self.lock:
+            return {name: stats.to_dict() for name, stats in sorted(self.views.items())}
+
+    def to_prometheus(self):
+        """以 Prometheus 文本格式输出"""
+        metrics = [
+            ('library_view_duration_seconds', 'wall_time', '视图总耗时'),
+            ('library_view_db_seconds', 'db_time', '数据库查询耗时'),
+            ('library_view_template_seconds', 'template_time', '模板渲染耗时'),
+            ('library_view_queries', 'query_count', '数据库查询次数'),
+        ]
+        data = self.to_dict()
+        lines = []
+        for metric, key, help_text in metrics:
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} histogram')
+            for view, stats in data.items():
+                hist = stats[key]
+                for bound, count in hist['buckets'].items():
+                    lines.append(f'{metric}_bucket{{view="{view}",le="{bound}"}} {count}')
+                lines.append(f'{metric}_bucket{{view="{view}",le="+Inf"}} {hist["count"]}')
+                lines.append(f'{metric}_sum{{view="{view}"}} {hist["sum"]}')
+                lines.append(f'{metric}_count{{view="{view}"}} {hist["count"]}')
+        lines.append('# HELP library_view_duplicate_queries_total 重复查询次数')
+        lines.append('# TYPE library_view_duplicate_queries_total counter')
+        for view, stats in data.items():
+            lines.append(f'library_view_duplicate_queries_total{{view="{view}"}} {stats["duplicate_queries"]}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class RequestProfile:
+    """单个请求的统计数据"""
+
+    def __init__(self, duplicate_threshold):
+        self.duplicate_threshold = duplicate_threshold
+        self.wall_time = 0
+        self.db_time = 0
+        self.template_time = 0
+        self.query_count = 0
+        self.duplicate_count = 0
+        self.seen_sql = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        """connection.execute_wrapper 回调"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.query_count += 1
+            times = self.seen_sql.get(sql, 0) + 1
+            self.seen_sql[sql] = times
+            if times > 1:
+                self.duplicate_count += 1
+            if times == self.duplicate_threshold + 1:
+                logger.warning(
+                    '同一请求中查询重复超过 %s 次: %s\n%s',
+                    self.duplicate_threshold, sql, ''.join(traceback.format_stack(limit=15))
+                )
+
+
+def _install_template_timer():
+    """为 Django 模板渲染计时（只安装一次）"""
+    if getattr(DjangoTemplate.render, '_profiled', False):
+        return
+    original_render = DjangoTemplate.render
+
+    def render(self, context=None, request=None):
+        profile = getattr(_local, 'profile', None)
+        if profile is None:
+            return original_render(self, context, request)
+        start = time.perf_counter()
+        try:
+            return original_render(self, context, request)
+        finally:
+            profile.template_time += time.perf_counter() - start
+
+    render._profiled = True
+    DjangoTemplate.render = render
+
+
+class ProfilingMiddleware:
+    """记录每个同步请求的耗时和查询统计，异步请求不统计"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.duplicate_threshold = getattr(settings, 'PROFILING_DUPLICATE_QUERY_THRESHOLD', 5)
+        _install_template_timer()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.get_response(request)
+        profile = RequestProfile(self.duplicate_threshold)
+        start = time.perf_counter()
+        with profiling(profile):
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else 'unresolved'
+        if response.streaming and not response.is_async:
+            # 流式响应（如数据导出）在服务器迭代响应内容时才执行查询，迭代结束后再记录
+            response.streaming_content = self.profile_stream(response.streaming_content, profile, view_name, start)
+        else:
+            self.record(profile, view_name, start)
+        return response
+
+    def profile_stream(self, content, profile, view_name, start):
+        try:
+            iterator = iter(content)
+            while True:
+                with profiling(profile):
+                    chunk = next(iterator, _END)
+                if chunk is _END:
+                    break
+                yield chunk
+        finally:
+            self.record(profile, view_name, start)
+
+    def record(self, profile, view_name, start):
+        profile.wall_time = time.perf_counter() - start
+        registry.record(view_name, profile)
+
+
+@contextmanager
+def profiling(profile):
+    """在当前线程中统计查询和模板渲染"""
+    _local.profile = profile
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            yield
+    finally:
+        _local.profile = None
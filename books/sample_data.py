@@ -0,0 +1,125 @@
+"""
+样例数据生成
+使用 bulk_create 快速生成接近真实规模的图书馆数据，供测试和 benchmarks/ 中的压测脚本使用
+"""
+import random
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+from books.models import (
+    Book, BookCopy, BorrowRecord, Category, Reservation,
+    format_copy_number, update_available_counts, update_recent_borrow_counts,
+)
+from users.models import User
+
+
+CATEGORY_NAMES = ['计算机', '文学', '历史', '科学', '经济', '哲学', '心理学', '艺术']
+
+
+def _chunks(items, size=900):
+    """分块，避免 SQLite 单条语句参数过多"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def build_library(books=2000, copies_per_book=3, users=50, records=3000, reservations=500, seed=42):
+    """
+    生成图书、副本、用户、借阅记录和预约记录，返回 dict 便于测试引用
+    用户密码均为 test123
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    password = make_password('test123')
+
+    categories = [
+        Category.objects.get_or_create(name=name, defaults={'description': f'{name}类书籍'})[0]
+        for name in CATEGORY_NAMES
+    ]
+    # 在已有数据之后继续编号，便于多次生成
+    book_offset = Book.objects.count()
+    user_offset = User.objects.filter(username__startswith='reader').count()
+    last_book_pk = Book.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    last_user_pk = User.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+    Book.objects.bulk_create([
+        Book(
+            isbn=f'979{i:010d}',
+            title=f'测试图书 {i}',
+            author=f'作者 {i % 200}',
+            publisher=f'出版社 {i % 30}',
+            category=categories[i % len(categories)],
+            description='用于性能测试的示例图书。',
+            location=f'A区-{i % 50}',
+            copy_sequence=copies_per_book,
+        )
+        for i in range(book_offset, book_offset + books)
+    ], batch_size=500)
+    book_ids = list(Book.objects.filter(pk__gt=last_book_pk).order_by('pk').values_list('pk', flat=True))
+
+    BookCopy.objects.bulk_create([
+        BookCopy(book_id=book_id, copy_number=format_copy_number(book_id, seq))
+        for book_id in book_ids
+        for seq in range(1, copies_per_book + 1)
+    ], batch_size=1000)
+
+    User.objects.bulk_create([
+        User(
+            username=f'reader{i}',
+            email=f'reader{i}@example.com',
+            password=password,
+            is_active=True,
+            email_verified=True,
+        )
+        for i in range(user_offset, user_offset + users)
+    ])
+    user_ids = list(User.objects.filter(pk__gt=last_user_pk).order_by('pk').values_list('pk', flat=True))
+
+    # 借阅记录：约三分之一仍在借阅中，对应副本标记为已借出
+    copies = list(BookCopy.objects.filter(book_id__gt=last_book_pk).order_by('pk').values_list('pk', 'book_id'))
+    rng.shuffle(copies)
+    borrow_records = []
+    borrowed_copy_ids = []
+    for i in range(records if copies else 0):
+        copy_id, book_id = copies[i % len(copies)]
+        borrow_date = (now - timedelta(days=rng.randint(0, 120))).replace(microsecond=0)
+        # 每个副本最多只有一条借阅中的记录
+        returned = i % 3 != 0 or i >= len(copies)
+        borrow_records.append(BorrowRecord(
+            user_id=user_ids[i % len(user_ids)],
+            book_id=book_id,
+            book_copy_id=copy_id,
+            due_date=borrow_date + timedelta(days=30),
+            return_date=borrow_date + timedelta(days=rng.randint(1, 30)) if returned else None,
+            status='returned' if returned else 'borrowed',
+        ))
+        if not returned:
+            borrowed_copy_ids.append(copy_id)
+    BorrowRecord.objects.bulk_create(borrow_records, batch_size=1000)
+    # borrow_date 为 auto_now_add，按借阅日期分组回填
+    by_date = {}
+    for record in borrow_records:
+        by_date.setdefault(record.due_date - timedelta(days=30), []).append(record.pk)
+    for borrow_date, pks in by_date.items():
+        for chunk in _chunks(pks):
+            BorrowRecord.objects.filter(pk__in=chunk).update(borrow_date=borrow_date)
+    for chunk in _chunks(borrowed_copy_ids):
+        BookCopy.objects.filter(pk__in=chunk).update(status='borrowed')
+
+    Reservation.objects.bulk_create([
+        Reservation(
+            user_id=user_ids[i % len(user_ids)],
+            book_id=book_ids[rng.randrange(len(book_ids))],
+            status=rng.choice(['waiting', 'waiting', 'notified', 'fulfilled', 'cancelled']),
+        )
+        for i in range(reservations)
+    ], batch_size=1000)
+
+    for chunk in _chunks(book_ids):
+        update_available_counts(chunk)
+    update_recent_borrow_counts()
+
+    return {
+        'categories': categories,
+        'book_ids': book_ids,
+        'user_ids': user_ids,
+    }
@@ -178,10 +178,129 @@ def check_expired_reservations():
     return expired
 
 
+def refresh_catalog_stats():
+    """重新计算图书的近30天借阅次数（借阅时只会递增，需定期校正）"""
+    from .models import update_recent_borrow_counts
+
+    return update_recent_borrow_counts(days=30)
+
+
+def delete_in_batches(queryset, batch_size=1000):
+    """按主键分批删除，避免一次删除大量数据时长时间占用写锁"""
+    deleted = 0
+    while True:
+        pks = list(queryset.order_by().values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            break
+        deleted += queryset.model._base_manager.filter(pk__in=pks).delete()[0]
+    return deleted
+
+
+def purge_expired_sessions(batch_size=1000):
+    """分批删除过期会话"""
+    from django.contrib.sessions.models import Session
+
+    return delete_in_batches(Session.objects.filter(expire_date__lt=timezone.now()), batch_size)
+
+
+def purge_verification_tokens(batch_size=1000):
+    """分批删除已使用或已过期的邮箱验证Token"""
+    from django.db.models import Q
+    from users.models import EmailVerificationToken, VERIFICATION_CODE_TTL
+
+    stale = Q(is_used=True) | Q(created_at__lt=timezone.now() - VERIFICATION_CODE_TTL)
+    return delete_in_batches(EmailVerificationToken.objects.filter(stale), batch_size)
+
+
+def purge_catalog_tombstones(batch_size=1000):
+    """分批删除超过保留期的目录删除记录（游标更早的客户端需要重新全量同步）"""
+    from .catalog_api import TOMBSTONE_RETENTION_DAYS
+    from .models import CatalogTombstone
+
+    cutoff = timezone.now() - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    return delete_in_batches(CatalogTombstone.objects.filter(deleted_at__lt=cutoff), batch_size)
+
+
+# 图书软删除后保留的天数，期间借阅历史仍可用于统计
+BOOK_PURGE_DAYS = 30
+
+
+def purge_deleted_books(batch_size=1000):
+    """
+    清理软删除超过 BOOK_PURGE_DAYS 天的图书：分批删除预约和副本（借阅记录中的副本置空）。
+    借阅记录和归档记录是读者的借阅历史，不删除；有借阅记录的图书保留为已删除状态供其引用，
+    没有借阅记录的图书直接删除。仍有未归还副本的图书跳过，归还后下次运行时再清理。
+    返回本次清理的图书数
+    """
+    from django.db.models import Exists, OuterRef
+    from .barcodes import invalidate_barcodes
+    from .models import ArchivedBorrowRecord, Book, BookCopy, BorrowRecord, Reservation
+
+    cutoff = timezone.now() - timedelta(days=BOOK_PURGE_DAYS)
+    has_history = (
+        Exists(BorrowRecord.objects.filter(book=OuterRef('pk')))
+        | Exists(ArchivedBorrowRecord.objects.filter(book=OuterRef('pk')))
+    )
+    # 已清理过副本和预约、只为借阅记录保留的图书不再计入
+    book_ids = list(
+        Book.all_objects.filter(deleted_at__lt=cutoff)
+        .exclude(borrow_records__status='borrowed')
+        .filter(
+            Exists(BookCopy.objects.filter(book=OuterRef('pk')))
+            | Exists(Reservation.objects.filter(book=OuterRef('pk')))
+            | ~has_history
+        )
+        .values_list('pk', flat=True)
+    )
+    if not book_ids:
+        return 0
+
+    delete_in_batches(Reservation.objects.filter(book_id__in=book_ids), batch_size)
+    invalidate_barcodes(BookCopy.objects.filter(book_id__in=book_ids).values_list('barcode', flat=True))
+    delete_in_batches(BookCopy.objects.filter(book_id__in=book_ids), batch_size)
+    delete_in_batches(Book.all_objects.filter(pk__in=book_ids).exclude(has_history), batch_size)
+    return len(book_ids)
+
+
+# 归档的最小天数：近30天借阅次数只统计在线表，更早归还的记录才能归档
+MIN_ARCHIVE_DAYS = 30
+
+
+def archive_returned_loans(older_than_days, batch_size=1000):
+    """
+    把归还时间早于 older_than_days 天的借阅记录分批移入 ArchivedBorrowRecord，
+    每批在一个事务中复制并删除，中途中断不会丢失或重复记录
+    """
+    from django.db import transaction
+    from .models import ArchivedBorrowRecord, BorrowRecord
+
+    if older_than_days < MIN_ARCHIVE_DAYS:
+        raise ValueError(f'归档天数不能少于 {MIN_ARCHIVE_DAYS} 天')
+
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    closed = BorrowRecord.objects.filter(status='returned', return_date__lt=cutoff).order_by()
+    fields = [f.attname for f in ArchivedBorrowRecord._meta.concrete_fields]
+    archived = 0
+    while True:
+        with transaction.atomic():
+            rows = list(closed.values(*fields)[:batch_size])
+            if not rows:
+                break
+            ArchivedBorrowRecord.objects.bulk_create([ArchivedBorrowRecord(**row) for row in rows])
+            BorrowRecord.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+        archived += len(rows)
+    return archived
+
+
 def run_all_tasks():
     """运行所有定时任务"""
     results = {
         'due_reminders': check_due_reminders(),
         'expired_reservations': check_expired_reservations(),
+        'catalog_stats': refresh_catalog_stats(),
+        'expired_sessions': purge_expired_sessions(),
+        'verification_tokens': purge_verification_tokens(),
+        'catalog_tombstones': purge_catalog_tombstones(),
+        'deleted_books': purge_deleted_books(),
     }
     return results
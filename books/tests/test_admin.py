@@ -0,0 +1,83 @@
+"""
+后台列表页测试
+"""
+from unittest import mock
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from books.models import Book, BookCopy, BorrowRecord
+from books.paginators import EstimatedCountPaginator, estimated_row_count
+from users.models import User
+
+
+class AdminChangelistTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('root', 'root@example.com', 'root123')
+        cls.reader = User.objects.create_user('reader', 'reader@example.com', 'reader123')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_books(self, count):
+        for i in range(count):
+            book = Book.objects.create(isbn=f'978{Book.all_objects.count():010d}', title=f'图书{i}', author='作者')
+            copy = BookCopy.objects.create_many(book, 2)[0]
+            BorrowRecord.objects.create(user=self.reader, book=book, book_copy=copy)
+
+    def count_queries(self, url, data=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, data or {})
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        for name in ('admin:books_book_changelist', 'admin:books_borrowrecord_changelist'):
+            self.add_books(2)
+            few = self.count_queries(reverse(name))
+            self.add_books(10)
+            self.assertEqual(self.count_queries(reverse(name)), few, name)
+
+    def test_book_list_shows_copy_counts(self):
+        self.add_books(1)
+        response = self.client.get(reverse('admin:books_book_changelist'))
+        book = response.context['cl'].result_list[0]
+        self.assertEqual((book.total_count, book.available_count), (2, 2))
+
+    def test_loan_search_matches_title_username_and_barcode(self):
+        self.add_books(3)
+        url = reverse('admin:books_borrowrecord_changelist')
+        copy = BookCopy.objects.get(book__title='图书1', borrow_records__isnull=False)
+
+        for term in ('图书1', copy.barcode, copy.book.isbn):
+            results = self.client.get(url, {'q': term}).context['cl'].result_list
+            self.assertEqual([r.book_copy_id for r in results], [copy.pk], term)
+        self.assertEqual(len(self.client.get(url, {'q': 'read'}).context['cl'].result_list), 3)
+
+    def test_estimated_count_only_for_unfiltered_large_tables(self):
+        self.add_books(3)
+        with mock.patch('books.paginators.EXACT_COUNT_THRESHOLD', 0), \
+                mock.patch('books.paginators.estimated_row_count', return_value=5000):
+            paginator = EstimatedCountPaginator(BorrowRecord.objects.order_by('pk'), 20)
+            self.assertEqual(paginator.count, 5000)
+            filtered = EstimatedCountPaginator(BorrowRecord.objects.filter(status='returned'), 20)
+            self.assertEqual(filtered.count, 0)
+        self.assertEqual(EstimatedCountPaginator(BorrowRecord.objects.order_by('pk'), 20).count, 3)
+
+    def test_sqlite_counts_exactly_after_deletes(self):
+        self.add_books(3)
+        BorrowRecord.objects.order_by('-pk')[:1].get().delete()
+        self.assertIsNone(estimated_row_count(BorrowRecord))
+        with mock.patch('books.paginators.EXACT_COUNT_THRESHOLD', 0):
+            self.assertEqual(EstimatedCountPaginator(BorrowRecord.objects.order_by('pk'), 20).count, 2)
+
+    def test_add_deleted_isbn_is_form_error(self):
+        Book.objects.create(isbn='9787111000001', title='图书', author='作者').soft_delete()
+        response = self.client.post(reverse('admin:books_book_add'), {
+            'isbn': '9787111000001', 'title': '图书', 'author': '作者',
+            'copies-TOTAL_FORMS': 0, 'copies-INITIAL_FORMS': 0,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('isbn', response.context['adminform'].form.errors)
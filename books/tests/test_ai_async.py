@@ -0,0 +1,137 @@
+"""
+异步 AI 接口测试
+"""
+import asyncio
+import json
+import time
+from unittest import mock
+import httpx
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from books.ai_chat import BUSY_MESSAGE, TIMEOUT_MESSAGE, AIChatService
+from books.ai_client import AIBusyError, chat_completion
+from books.ai_recommend import AIRecommendService
+from books.categories import registry
+from books.models import Book, BookCopy
+from users.models import User
+
+RECOMMEND_CONTENT = '```json\n' + json.dumps({
+    'recommendations': [{'title': '深入理解计算机系统', 'reason': '经典教材'}],
+    'summary': '为您推荐',
+}, ensure_ascii=False) + '\n```'
+
+
+class SlowUpstream:
+    """模拟响应很慢的 AI 服务，记录同时处理的请求数"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+
+    async def post(self, url, **kwargs):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        return httpx.Response(200, json={'choices': [{'message': {'content': '回复'}}]},
+                              request=httpx.Request('POST', url))
+
+
+class ChatCompletionConcurrencyTests(SimpleTestCase):
+
+    def run_requests(self, upstream, count):
+        async def main():
+            return await asyncio.gather(
+                *[chat_completion('http://ai.test/v1/chat/completions', 'key', {}, timeout=5) for _ in range(count)],
+                return_exceptions=True,
+            )
+        with mock.patch.object(httpx.AsyncClient, 'post', upstream.post):
+            return asyncio.run(main())
+
+    def test_hundreds_of_requests_wait_concurrently(self):
+        upstream = SlowUpstream(0.5)
+        start = time.monotonic()
+        results = self.run_requests(upstream, 200)
+        self.assertEqual(results, ['回复'] * 200)
+        self.assertEqual(upstream.max_active, 100)
+        # 200 个请求按上限分两批，总耗时约为两次上游延迟
+        self.assertLess(time.monotonic() - start, 3)
+
+    @override_settings(AI_MAX_CONCURRENCY=2, AI_QUEUE_TIMEOUT=0.75)
+    def test_queue_timeout(self):
+        upstream = SlowUpstream(0.5)
+        results = self.run_requests(upstream, 6)
+        # 前 4 个请求分两批完成，最后 2 个排队超过 0.75 秒
+        self.assertEqual(upstream.max_active, 2)
+        self.assertEqual(results[:4], ['回复'] * 4)
+        self.assertTrue(all(isinstance(r, AIBusyError) for r in results[4:]))
+
+
+@override_settings(
+    AI_API_KEY='test-key',
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class AsyncAIServiceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', 'reader@example.com', 'reader123')
+        cls.book = Book.objects.create(isbn='9787111000001', title='深入理解计算机系统', author='Bryant')
+        BookCopy.objects.create(book=cls.book)
+
+    def setUp(self):
+        cache.clear()
+        registry.invalidate()
+
+    async def test_achat_marks_library_books(self):
+        with mock.patch('books.ai_chat.chat_completion', return_value='推荐《深入理解计算机系统》【本馆有藏】') as call:
+            result = await AIChatService().achat('推荐一本书', [{'role': 'user', 'content': '你好'}])
+
+        self.assertTrue(result['success'])
+        self.assertEqual([b['id'] for b in result['books_mentioned']], [self.book.pk])
+        self.assertTrue(result['books_mentioned'][0]['available'])
+        messages = call.call_args.args[2]['messages']
+        self.assertIn('深入理解计算机系统', messages[0]['content'])
+        self.assertEqual([m['content'] for m in messages[1:]], ['你好', '推荐一本书'])
+
+    async def test_achat_upstream_timeout(self):
+        with mock.patch('books.ai_chat.chat_completion', side_effect=httpx.ReadTimeout('timeout')):
+            result = await AIChatService().achat('推荐一本书')
+        self.assertEqual(result, {'success': False, 'message': TIMEOUT_MESSAGE, 'books_mentioned': []})
+
+        with mock.patch('books.ai_chat.chat_completion', side_effect=AIBusyError):
+            result = await AIChatService().achat('推荐一本书')
+        self.assertEqual(result['message'], BUSY_MESSAGE)
+
+    async def test_aget_recommendations_matches_books(self):
+        with mock.patch('books.ai_recommend.chat_completion', return_value=RECOMMEND_CONTENT):
+            result = await AIRecommendService().aget_recommendations(self.user)
+        self.assertTrue(result['is_ai'])
+        self.assertEqual([r['book'].pk for r in result['recommendations']], [self.book.pk])
+
+    async def test_aget_recommendations_falls_back_to_rules(self):
+        with mock.patch('books.ai_recommend.chat_completion', side_effect=httpx.ConnectError('refused')), \
+                self.assertLogs('books.ai_recommend', 'WARNING'):
+            result = await AIRecommendService().aget_recommendations(self.user)
+        self.assertFalse(result['is_ai'])
+        self.assertEqual([r['book'].pk for r in result['recommendations']], [self.book.pk])
+
+    def test_views(self):
+        self.client.force_login(self.user)
+        with mock.patch('books.ai_recommend.chat_completion', return_value=RECOMMEND_CONTENT):
+            response = self.client.get(reverse('books:ai_recommend'))
+        self.assertContains(response, '经典教材')
+
+        with mock.patch('books.ai_chat.chat_completion', return_value='推荐《深入理解计算机系统》'):
+            for _ in range(10):
+                response = self.client.post(reverse('books:ai_chat_api'), {'message': '推荐一本书'},
+                                            content_type='application/json')
+                self.assertTrue(response.json()['success'])
+            # 异步视图同样受频率限制
+            response = self.client.post(reverse('books:ai_chat_api'), {'message': '推荐一本书'},
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 429)
@@ -0,0 +1,68 @@
+"""
+借阅记录归档测试
+"""
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from books.exports import get_export_rows
+from books.models import ArchivedBorrowRecord, Book, BorrowRecord
+from books.tasks import archive_returned_loans
+from users.models import User
+
+
+class ArchiveLoansTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', 'reader@example.com', 'reader123')
+        cls.book = Book.objects.create(isbn='9787111111111', title='测试图书', author='作者')
+        now = timezone.now()
+        cls.active = BorrowRecord.objects.create(user=cls.user, book=cls.book)
+        BorrowRecord.objects.bulk_create([
+            BorrowRecord(user=cls.user, book=cls.book, due_date=now, status='returned', return_date=now)
+            for _ in range(15)
+        ])
+        # 借阅时间交错，奇数条很早归还（会被归档），偶数条最近才归还
+        for i, record in enumerate(BorrowRecord.objects.filter(status='returned').order_by('pk')):
+            return_date = now - timedelta(days=100) if i % 2 else now
+            BorrowRecord.objects.filter(pk=record.pk).update(
+                borrow_date=now - timedelta(days=200 - i), return_date=return_date,
+            )
+        cls.all_ids = set(BorrowRecord.objects.values_list('pk', flat=True))
+
+    def test_moves_old_returned_records_in_batches(self):
+        self.assertEqual(archive_returned_loans(90, batch_size=3), 7)
+
+        archived = set(ArchivedBorrowRecord.objects.values_list('pk', flat=True))
+        live = set(BorrowRecord.objects.values_list('pk', flat=True))
+        self.assertEqual(len(archived), 7)
+        self.assertFalse(archived & live)
+        self.assertEqual(archived | live, self.all_ids)
+        self.assertIn(self.active.pk, live)
+
+    def test_history_reads_across_live_and_archive(self):
+        expected = list(BorrowRecord.objects.filter(status='returned').order_by('-borrow_date', '-pk')
+                        .values_list('pk', flat=True))
+        call_command('archive_loans', '--older-than', '90', stdout=StringIO())
+
+        self.client.force_login(self.user)
+        seen = []
+        url = reverse('users:profile')
+        while url:
+            response = self.client.get(url)
+            seen += [r.pk for r in response.context['history_borrows']]
+            cursor = response.context['next_cursor']
+            url = f"{reverse('users:profile')}?before={cursor}" if cursor else None
+        self.assertEqual(seen, expected)
+
+        self.assertEqual(BorrowRecord.history.with_archived(user=self.user).count(), len(self.all_ids))
+        fields, rows = get_export_rows('records')
+        self.assertEqual({row[0] for row in rows}, self.all_ids)
+
+    def test_rejects_short_retention(self):
+        with self.assertRaises(CommandError):
+            call_command('archive_loans', '--older-than', '7')
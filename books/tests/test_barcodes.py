@@ -0,0 +1,56 @@
+"""
+副本条码查询测试
+"""
+from django.test import TestCase
+from django.urls import reverse
+from books.barcodes import BarcodeLookup, lookup
+from books.models import Book, BookCopy
+from users.models import User
+
+
+class BarcodeLookupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.book = Book.objects.create(isbn='9787111111111', title='测试图书', author='作者')
+        cls.copies = BookCopy.objects.create_many(cls.book, 3)
+
+    def setUp(self):
+        lookup.clear()
+
+    def test_new_copies_get_barcode_from_copy_number(self):
+        for copy in self.copies:
+            self.assertEqual(copy.barcode, copy.copy_number)
+        copy = BookCopy.objects.create(book=self.book)
+        self.assertEqual(copy.barcode, copy.copy_number)
+
+    def test_cached_lookup_skips_database(self):
+        barcode = self.copies[0].barcode
+        ref = lookup.get(barcode)
+        self.assertEqual((ref.copy_id, ref.book_id, ref.status), (self.copies[0].pk, self.book.pk, 'available'))
+        with self.assertNumQueries(0):
+            self.assertEqual(lookup.get(barcode), ref)
+        self.assertIsNone(lookup.get('missing'))
+
+    def test_status_change_invalidates_entry(self):
+        copy = self.copies[1]
+        lookup.get(copy.barcode)
+        copy.status = 'maintenance'
+        copy.save()
+        self.assertEqual(lookup.get(copy.barcode).status, 'maintenance')
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = BarcodeLookup(maxsize=2)
+        barcodes = [c.barcode for c in self.copies]
+        cache.get_many(barcodes[:2])
+        cache.get(barcodes[0])
+        cache.get(barcodes[2])
+        self.assertEqual(list(cache.entries), [barcodes[0], barcodes[2]])
+
+    def test_lookup_api(self):
+        admin = User.objects.create_user('librarian', 'librarian@example.com', 'admin123', role='admin')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('books:copy_lookup', args=[self.copies[2].barcode]))
+        self.assertEqual(response.json()['copy_id'], self.copies[2].pk)
+        response = self.client.get(reverse('books:copy_lookup', args=['missing']))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,61 @@
+"""
+副本批量管理测试
+"""
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from books.models import Book, BookCopy
+from users.models import User
+
+
+class BookCopiesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('librarian', 'librarian@example.com', 'admin123', role='admin')
+        cls.book = Book.objects.create(isbn='9787111000001', title='图书', author='作者')
+        cls.copies = BookCopy.objects.create_many(cls.book, 60)
+        BookCopy.objects.filter(pk=cls.copies[0].pk).update(status='borrowed')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.url = reverse('books:book_copies', args=[self.book.pk])
+
+    def post_update(self, copies, status, **headers):
+        data = {'action': 'update', 'status': status, 'copy_ids': [c.pk for c in copies]}
+        return self.client.post(self.url, data, **headers)
+
+    def test_bulk_update_uses_single_update_and_skips_borrowed(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.post_update(self.copies[:10], 'maintenance')
+        updates = [q for q in ctx.captured_queries
+                   if q['sql'].startswith('UPDATE "books_bookcopy"')]
+        self.assertEqual(len(updates), 1)
+
+        statuses = dict(BookCopy.objects.filter(book=self.book).values_list('pk', 'status'))
+        self.assertEqual(statuses[self.copies[0].pk], 'borrowed')
+        self.assertEqual([statuses[c.pk] for c in self.copies[1:10]], ['maintenance'] * 9)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_count, 50)
+
+    def test_ajax_returns_changed_rows_and_stats(self):
+        response = self.post_update(self.copies[:3], 'lost', HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        data = response.json()
+
+        self.assertTrue(data['success'])
+        self.assertEqual(set(data['rows']), {str(c.pk) for c in self.copies[1:3]})
+        self.assertIn(f'id="copy-{self.copies[1].pk}"', data['rows'][str(self.copies[1].pk)])
+        self.assertEqual(data['stats'], {'available': 57, 'borrowed': 1, 'lost': 2, 'total': 60})
+
+        invalid = self.post_update([], 'borrowed', HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(invalid.status_code, 400)
+
+    def test_filter_and_pagination(self):
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.context['copies']), 50)
+        self.assertEqual(response.context['copies'].paginator.num_pages, 2)
+
+        response = self.client.get(self.url, {'status': 'borrowed'})
+        self.assertEqual([c.pk for c in response.context['copies']], [self.copies[0].pk])
+        self.assertNotContains(response, 'name="copy_ids"')
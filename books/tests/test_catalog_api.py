@@ -0,0 +1,107 @@
+"""
+目录同步接口测试
+"""
+import gzip
+import json
+from datetime import timedelta
+from unittest import mock
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from books.catalog_api import book_changes, decode_cursor, encode_cursor
+from books.models import Book, BookCopy, Category
+
+
+class CatalogBooksTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='计算机')
+        cls.books = []
+        for i in range(3):
+            book = Book.objects.create(isbn=f'978711100000{i}', title=f'图书{i}', author='作者', category=cls.category)
+            BookCopy.objects.create_many(book, 2)
+            cls.books.append(book)
+
+    def setUp(self):
+        # 同步接口只返回几秒之前的修改，测试中把数据时间往前调
+        self.age(Book.objects.all(), minutes=10)
+
+    def age(self, queryset, minutes):
+        queryset.update(updated_at=timezone.now() - timedelta(minutes=minutes))
+
+    def get(self, since=None, **headers):
+        params = {'since': since} if since else {}
+        return self.client.get(reverse('books:catalog_books'), params, **headers)
+
+    def get_later(self, since):
+        """两分钟之后再同步，刚才的修改已经超出 SYNC_LAG"""
+        later = timezone.now() + timedelta(minutes=2)
+        with mock.patch('books.catalog_api.timezone.now', return_value=later):
+            return self.get(since)
+
+    def test_full_sync_includes_copies(self):
+        data = self.get().json()
+
+        self.assertFalse(data['has_more'])
+        self.assertEqual([b['id'] for b in data['books']], sorted(b.pk for b in self.books))
+        book = data['books'][0]
+        self.assertEqual(book['category_id'], self.category.pk)
+        self.assertEqual(book['available_count'], 2)
+        self.assertEqual([c['status'] for c in book['copies']], ['available', 'available'])
+
+    def test_delta_returns_changed_and_deleted_books(self):
+        cursor = self.get().json()['next']
+        self.assertEqual(self.get(cursor).json()['books'], [])
+
+        # 借出副本会更新图书的可借数量和 updated_at
+        copy = self.books[0].copies.first()
+        copy.status = 'borrowed'
+        copy.save()
+        deleted_id = self.books[1].pk
+        Book.objects.get(pk=deleted_id).delete()
+
+        data = self.get_later(cursor).json()
+        self.assertEqual([b['id'] for b in data['books']], [self.books[0].pk])
+        self.assertEqual(data['books'][0]['available_count'], 1)
+        self.assertEqual(data['deleted'], [deleted_id])
+
+    def test_pages_follow_cursor(self):
+        first = book_changes(page_size=2)
+        second = book_changes(decode_cursor(first['next']), page_size=2)
+
+        self.assertTrue(first['has_more'])
+        self.assertFalse(second['has_more'])
+        self.assertEqual([b['id'] for b in first['books'] + second['books']], sorted(b.pk for b in self.books))
+
+    def test_category_delete_touches_books(self):
+        cursor = self.get().json()['next']
+        self.category.delete()
+
+        data = self.get_later(cursor).json()
+        self.assertEqual(len(data['books']), 3)
+        self.assertTrue(all(b['category_id'] is None for b in data['books']))
+
+    def test_etag_and_gzip(self):
+        response = self.get(HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['books']), 3)
+
+        etag = response['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        self.assertEqual(self.get(HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # 未压缩的表示使用不同的 ETag
+        plain = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(plain.status_code, 200)
+        self.assertNotEqual(plain['ETag'], etag)
+
+    def test_invalid_and_expired_cursor(self):
+        self.assertEqual(self.get('bad').status_code, 400)
+        expired = encode_cursor(timezone.now() - timedelta(days=60), 0)
+        self.assertEqual(self.get(expired).status_code, 410)
+
+    def test_categories(self):
+        response = self.client.get(reverse('books:catalog_categories'))
+        self.assertEqual(response.json()['categories'], [
+            {'id': self.category.pk, 'name': '计算机', 'description': ''},
+        ])
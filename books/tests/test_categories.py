@@ -0,0 +1,68 @@
+"""
+分类缓存测试
+"""
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from books.ai_recommend import AIRecommendService
+from books.categories import VERSION_CHECK_INTERVAL, registry
+from books.forms import BookSearchForm
+from books.fragments import version_key
+from books.management.commands.generate_covers import Command as GenerateCoversCommand
+from books.models import Book, BorrowRecord, Category
+from users.models import User
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CategoryRegistryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.computer = Category.objects.create(name='计算机')
+        cls.history = Category.objects.create(name='历史')
+        cls.book = Book.objects.create(isbn='9787111000001', title='图书', author='作者', category=cls.computer)
+
+    def setUp(self):
+        cache.clear()
+        registry.invalidate()
+
+    def test_search_form_uses_cached_choices(self):
+        registry.all()
+        with self.assertNumQueries(0):
+            form = BookSearchForm({'category': str(self.history.pk)})
+            self.assertTrue(form.is_valid())
+            form['category'].as_widget()
+        self.assertEqual(form.cleaned_data['category'], self.history.pk)
+        self.assertFalse(BookSearchForm({'category': '999'}).is_valid())
+
+    def test_save_and_delete_invalidate_immediately(self):
+        self.assertEqual([c.name for c in registry.all()], ['历史', '计算机'])
+        self.history.name = '世界历史'
+        self.history.save()
+        self.assertEqual(registry.name(self.history.pk), '世界历史')
+
+        self.history.delete()
+        self.assertIsNone(registry.get(self.history.pk))
+
+    def test_other_process_changes_seen_after_version_check(self):
+        registry.all()
+        # 模拟其他进程修改分类：数据库已更新，共享缓存中的版本号被删除
+        Category.objects.filter(pk=self.computer.pk).update(name='计算机科学')
+        cache.delete(version_key('categories'))
+        self.assertEqual(registry.name(self.computer.pk), '计算机')
+
+        with mock.patch('books.categories.time.monotonic', return_value=10 ** 9 + VERSION_CHECK_INTERVAL):
+            self.assertEqual(registry.name(self.computer.pk), '计算机科学')
+
+    def test_ai_profile_and_cover_style_use_registry(self):
+        user = User.objects.create_user('reader', 'reader@example.com', 'reader123')
+        BorrowRecord.objects.create(user=user, book=self.book)
+        registry.all()
+
+        profile = AIRecommendService().get_user_reading_profile(user)
+        self.assertEqual(profile['favorite_categories'], ['计算机'])
+
+        book = Book.objects.get(pk=self.book.pk)
+        with self.assertNumQueries(0):
+            prompt = GenerateCoversCommand().generate_cover_prompt(book)
+        self.assertIn('modern tech style', prompt)
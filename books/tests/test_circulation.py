@@ -0,0 +1,91 @@
+"""
+流通台批量借还测试
+"""
+import json
+from unittest import mock
+from django.test import TestCase
+from django.urls import reverse
+from books.barcodes import lookup
+from books.models import Book, BookCopy, BorrowRecord, Reservation
+from users.models import User
+
+
+class CirculationBatchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('librarian', 'librarian@example.com', 'admin123', role='admin')
+        cls.reader = User.objects.create_user('reader', 'reader@example.com', 'reader123')
+        cls.other = User.objects.create_user('other', 'other@example.com', 'other123')
+        cls.books = []
+        for i in range(5):
+            book = Book.objects.create(isbn=f'978711100000{i}', title=f'图书{i}', author='作者')
+            BookCopy.objects.create_many(book, 2)
+            cls.books.append(book)
+
+    def setUp(self):
+        lookup.clear()
+        self.client.force_login(self.admin)
+
+    def post(self, data):
+        return self.client.post(reverse('books:circulation_batch'), json.dumps(data), content_type='application/json')
+
+    def copy_number(self, book, index=0):
+        return book.copies.order_by('copy_number')[index].copy_number
+
+    def test_borrow_by_copy_number_and_isbn(self):
+        items = [self.copy_number(self.books[0]), self.books[1].isbn, self.books[2].isbn, 'missing']
+        response = self.post({'action': 'borrow', 'username': 'reader', 'items': items})
+        data = response.json()
+
+        self.assertEqual(data['processed'], 3)
+        self.assertEqual([r['success'] for r in data['results']], [True, True, True, False])
+        self.assertEqual(BorrowRecord.objects.filter(user=self.reader, status='borrowed').count(), 3)
+        for book in self.books[:3]:
+            book.refresh_from_db()
+            self.assertEqual(book.available_count, 1)
+            self.assertEqual(book.recent_borrow_count, 1)
+
+    def test_borrow_rejects_duplicates_and_unavailable(self):
+        first = self.copy_number(self.books[0])
+        self.post({'action': 'borrow', 'username': 'other', 'items': [first]})
+
+        items = [first, self.copy_number(self.books[0], 1), self.books[0].isbn]
+        results = self.post({'action': 'borrow', 'username': 'reader', 'items': items}).json()['results']
+        # 第一项已被借出；第二项成功；第三项是同一本书，不能重复借阅
+        self.assertEqual([r['success'] for r in results], [False, True, False])
+
+    def test_borrow_query_count_does_not_grow_with_items(self):
+        with self.assertNumQueries(12):
+            self.post({'action': 'borrow', 'username': 'reader', 'items': [b.isbn for b in self.books[:2]]})
+        with self.assertNumQueries(12):
+            self.post({'action': 'borrow', 'username': 'other', 'items': [b.isbn for b in self.books]})
+
+    def test_return_notifies_reservations_once_per_book_after_commit(self):
+        items = [self.copy_number(self.books[0]), self.copy_number(self.books[0], 1), self.copy_number(self.books[1])]
+        self.post({'action': 'borrow', 'username': 'reader', 'items': items[:1] + items[2:]})
+        self.post({'action': 'borrow', 'username': 'other', 'items': items[1:2]})
+        Reservation.objects.create(user=self.admin, book=self.books[0])
+
+        with mock.patch('books.tasks.notify_reservation') as notify:
+            with self.captureOnCommitCallbacks(execute=True):
+                data = self.post({'action': 'return', 'items': items}).json()
+                notify.assert_not_called()
+
+        self.assertEqual(data['processed'], 3)
+        self.assertEqual(sorted(call.args[0].pk for call in notify.call_args_list),
+                         [self.books[0].pk, self.books[1].pk])
+        self.assertFalse(BorrowRecord.objects.filter(status='borrowed').exists())
+        self.assertFalse(BookCopy.objects.exclude(status='available').exists())
+
+    def test_return_by_isbn_requires_user(self):
+        self.post({'action': 'borrow', 'username': 'reader', 'items': [self.books[0].isbn]})
+        self.assertFalse(self.post({'action': 'return', 'items': [self.books[0].isbn]}).json()['results'][0]['success'])
+        data = self.post({'action': 'return', 'username': 'reader', 'items': [self.books[0].isbn]}).json()
+        self.assertTrue(data['results'][0]['success'])
+
+    def test_requires_admin(self):
+        self.client.force_login(self.reader)
+        response = self.post({'action': 'borrow', 'username': 'reader', 'items': [self.books[0].isbn]})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(BorrowRecord.objects.exists())
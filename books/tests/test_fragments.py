@@ -0,0 +1,67 @@
+"""
+模板片段缓存测试
+"""
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from books.categories import registry
+from books.models import Book, BookCopy, Category
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class FragmentCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='计算机')
+        cls.book = Book.objects.create(isbn='9787111000001', title='图书', author='作者', category=cls.category)
+        cls.copy = BookCopy.objects.create_many(cls.book, 1)[0]
+
+    def setUp(self):
+        cache.clear()
+        registry.invalidate()
+        self.url = reverse('books:index')
+
+    def category_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url)
+        return [q for q in ctx.captured_queries if 'FROM "books_category"' in q['sql']]
+
+    def test_warm_fragments_skip_category_query(self):
+        self.assertEqual(len(self.category_queries()), 1)
+        self.assertEqual(self.category_queries(), [])
+
+    def test_category_change_invalidates_dropdown_and_cards(self):
+        self.client.get(self.url)
+        self.category.name = '计算机科学'
+        self.category.save()
+
+        response = self.client.get(self.url)
+        self.assertContains(response, '<option value="%d">计算机科学</option>' % self.category.pk, html=True)
+        self.assertContains(response, '<span class="badge bg-secondary">计算机科学</span>', html=True)
+
+    def test_copy_status_change_updates_card(self):
+        self.assertContains(self.client.get(self.url), '库存: 1/1')
+        self.copy.status = 'borrowed'
+        self.copy.save()
+
+        response = self.client.get(self.url)
+        self.assertContains(response, '库存: 0/1')
+        self.assertContains(response, '已借完')
+
+    def test_card_total_count_without_loading_copies(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertContains(self.client.get(self.url), '库存: 1/1')
+        self.assertFalse([q for q in ctx.captured_queries if 'FROM "books_bookcopy"' in q['sql']])
+
+        BookCopy.objects.create_many(self.book, 2)
+        self.assertContains(self.client.get(self.url), '库存: 3/3')
+        self.copy.delete()
+        self.assertContains(self.client.get(self.url), '库存: 2/2')
+
+    def test_selected_category_is_part_of_key(self):
+        self.client.get(self.url)
+        response = self.client.get(self.url, {'category': self.category.pk})
+        self.assertContains(response, '<option value="%d" selected>计算机</option>' % self.category.pk, html=True)
@@ -0,0 +1,91 @@
+"""
+批量导入图书目录测试
+"""
+import json
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from books.models import Book, BookCopy, Category
+
+
+class ImportCatalogTests(TestCase):
+
+    def write_file(self, suffix, content):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def import_file(self, suffix, content, *args):
+        call_command('import_catalog', self.write_file(suffix, content), *args, stdout=StringIO())
+
+    def test_csv_upsert(self):
+        self.import_file('.csv', (
+            'isbn,title,author,category,copies\n'
+            '9787111000001,旧书名,作者,计算机,2\n'
+            'invalid,无效,作者,,1\n'
+        ))
+        book = Book.objects.get(isbn='9787111000001')
+        self.assertEqual(book.category.name, '计算机')
+
+        self.import_file('.csv', 'isbn,title,author,category\n9787111000001,新书名,作者,计算机\n')
+        self.assertEqual(Book.objects.count(), 1)
+        self.assertEqual(Book.objects.get(pk=book.pk).title, '新书名')
+        self.assertEqual(Category.objects.count(), 1)
+
+    def test_jsonl_upsert(self):
+        rows = [
+            {'isbn': '9787111000001', 'title': '图书一', 'author': '作者', 'copies': 1},
+            {'isbn': '9787111000002', 'title': '图书二', 'author': '作者', 'copies': 0},
+            {'isbn': '9787111000001', 'title': '图书一（第二版）', 'author': '作者', 'copies': 1},
+        ]
+        self.import_file('.jsonl', '\n'.join(json.dumps(row, ensure_ascii=False) for row in rows))
+        self.assertEqual(
+            dict(Book.objects.values_list('isbn', 'title')),
+            {'9787111000001': '图书一（第二版）', '9787111000002': '图书二'},
+        )
+        self.assertEqual(BookCopy.objects.count(), 1)
+
+    def test_jsonl_non_object_rows_skipped(self):
+        stdout = StringIO()
+        content = '\n'.join([
+            '[]', '"x"', '1', 'null',
+            json.dumps({'isbn': '9787111000001', 'title': '图书', 'author': '作者', 'copies': 1}),
+        ])
+        call_command('import_catalog', self.write_file('.jsonl', content), stdout=stdout)
+        self.assertEqual(Book.objects.count(), 1)
+        self.assertIn('共 5 行', stdout.getvalue())
+        self.assertIn('跳过 4 行', stdout.getvalue())
+
+    def test_jsonl_numeric_fields(self):
+        row = {'isbn': 9787111000001, 'title': 1984, 'author': '乔治·奥威尔', 'publisher': None,
+               'category': 100, 'location': 3, 'copies': 1}
+        self.import_file('.jsonl', json.dumps(row, ensure_ascii=False))
+        book = Book.objects.get(isbn='9787111000001')
+        self.assertEqual((book.title, book.location, book.category.name), ('1984', '3', '100'))
+
+    def test_restores_soft_deleted_book(self):
+        book = Book.objects.create(isbn='9787111000001', title='图书', author='作者')
+        book.soft_delete()
+        self.assertFalse(Book.objects.filter(pk=book.pk).exists())
+
+        self.import_file('.csv', 'isbn,title,author,copies\n9787111000001,图书,作者,0\n')
+        self.assertIsNone(Book.objects.get(pk=book.pk).deleted_at)
+
+    def test_copies_continue_reserved_sequence(self):
+        self.import_file('.csv', 'isbn,title,author,copies\n9787111000001,图书,作者,2\n')
+        book = Book.objects.get(isbn='9787111000001')
+        # 导入之间通过其他途径添加的副本占用了序号 3
+        BookCopy.objects.reserve_copy_numbers(book, 1)
+
+        self.import_file('.csv', 'isbn,title,author,copies\n9787111000001,图书,作者,4\n')
+        book.refresh_from_db()
+        self.assertEqual(book.copy_sequence, 5)
+        self.assertEqual(
+            sorted(BookCopy.objects.filter(book=book).values_list('copy_number', flat=True)),
+            [f'{book.pk:04d}-001', f'{book.pk:04d}-002', f'{book.pk:04d}-004', f'{book.pk:04d}-005'],
+        )
+        self.assertEqual(book.available_count, 4)
@@ -0,0 +1,64 @@
+"""
+请求性能分析测试
+"""
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from books.models import Book
+from books.profiling import registry
+from users.models import User
+
+
+@override_settings(
+    MIDDLEWARE=['books.profiling.ProfilingMiddleware'] + settings.MIDDLEWARE,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class ProfilingMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('root', 'root@example.com', 'root123')
+        Book.objects.create(isbn='9787111000001', title='图书', author='作者')
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def test_records_queries_and_histograms(self):
+        self.client.get(reverse('books:index'))
+        self.client.get(reverse('books:index'))
+
+        stats = registry.to_dict()['books:index']
+        self.assertEqual(stats['wall_time']['count'], 2)
+        self.assertEqual(stats['query_count']['count'], 2)
+        self.assertGreater(stats['query_count']['sum'], 0)
+        self.assertGreater(stats['template_time']['sum'], 0)
+        self.assertIn('library_view_queries_count{view="books:index"} 2', registry.to_prometheus())
+
+    def test_async_requests_pass_through(self):
+        # 异步请求不统计，中间件也不会使异步视图切换到线程中执行
+        with override_settings(DEBUG=True), self.assertNoLogs('django.request', 'DEBUG'):
+            ASGIHandler().load_middleware(is_async=True)
+
+    async def test_async_view_not_recorded(self):
+        await self.async_client.aforce_login(self.admin)
+        with mock.patch('books.ai_recommend.AIRecommendService.acall_ai_api', return_value=None):
+            response = await self.async_client.get(reverse('books:ai_recommend'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('books:ai_recommend', registry.to_dict())
+
+    def test_streaming_response_queries_counted_after_iteration(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('export_data', args=['books']))
+        # 导出的查询在迭代响应内容时执行，迭代结束前不记录
+        self.assertNotIn('export_data', registry.to_dict())
+
+        content = b''.join(response.streaming_content)
+        self.assertIn('9787111000001'.encode(), content)
+        stats = registry.to_dict()['export_data']
+        self.assertEqual(stats['query_count']['count'], 1)
+        self.assertGreater(stats['query_count']['sum'], 0)
@@ -0,0 +1,141 @@
+"""
+视图查询次数回归测试
+在接近真实规模的数据上以匿名用户、普通用户和管理员身份访问每个 URL，
+检查查询次数和响应时间不超过预算，超出时打印全部 SQL。
+"""
+import time
+from django.db import connection, transaction
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from books import urls as books_urls
+from books.models import Book, BorrowRecord, Reservation
+from users import urls as users_urls
+from users.models import EmailVerificationToken, User
+from books.sample_data import build_library
+
+
+# 单个请求允许的最长响应时间（秒）
+MAX_RESPONSE_TIME = 2.0
+
+# (URL 名称, 参数, 请求方法, 请求数据, {角色: 查询次数上限})
+# 参数中的字符串表示测试类上对应对象的主键
+VIEW_BUDGETS = [
+    ('books:index', {}, 'get', {}, {'anon': 3, 'user': 4, 'admin': 4}),
+    ('books:index', {}, 'get', {'keyword': '测试', 'available_only': 'on', 'sort': 'popular'}, {'anon': 3, 'user': 3, 'admin': 3}),
+    ('books:detail', {'pk': 'book'}, 'get', {}, {'anon': 6, 'user': 8, 'admin': 8}),
+    ('books:ai_recommend', {}, 'get', {}, {'anon': 0, 'user': 20, 'admin': 18}),
+    ('books:ai_chat', {}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 0}),
+    ('books:ai_chat_api', {}, 'post', {'message': '推荐一本书'}, {'anon': 0, 'user': 0, 'admin': 0}),
+    ('books:borrow', {'pk': 'book'}, 'get', {}, {'anon': 0, 'user': 8, 'admin': 8}),
+    ('books:return', {'pk': 'record'}, 'get', {}, {'anon': 0, 'user': 5, 'admin': 1}),
+    ('books:circulation_batch', {}, 'post', {'action': 'return', 'items': ['0000-000']}, {'anon': 0, 'user': 0, 'admin': 3}),
+    ('books:catalog_books', {}, 'get', {}, {'anon': 2, 'user': 2, 'admin': 2}),
+    ('books:catalog_categories', {}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 0}),
+    ('books:copy_lookup', {'barcode': '0001-001'}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 1}),
+    ('books:reserve', {'pk': 'book'}, 'get', {}, {'anon': 0, 'user': 3, 'admin': 3}),
+    ('books:cancel_reservation', {'pk': 'reservation'}, 'get', {}, {'anon': 0, 'user': 3, 'admin': 1}),
+    ('books:my_reservations', {}, 'get', {}, {'anon': 0, 'user': 7, 'admin': 3}),
+    ('books:book_copies', {'pk': 'book'}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 4}),
+    ('books:all_reservations', {}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 2}),
+    ('books:book_add', {}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 1}),
+    ('books:book_edit', {'pk': 'book'}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 2}),
+    ('books:book_delete', {'pk': 'book'}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 1}),
+    ('books:category_list', {}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 1}),
+    ('books:category_add', {}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 0}),
+    ('books:category_edit', {'pk': 'category'}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 1}),
+    ('books:category_delete', {'pk': 'category'}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 1}),
+    ('books:upgrade_admin', {}, 'post', {'code': 'invalid'}, {'anon': 0, 'user': 0, 'admin': 0}),
+    ('admin_dashboard', {}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 6}),
+    ('all_borrow_records', {}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 5}),
+    ('export_data', {'kind': 'records'}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 1}),
+    ('performance_metrics', {}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 0}),
+    ('users:register', {}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 0}),
+    ('users:login', {}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 0}),
+    ('users:logout', {}, 'get', {}, {'anon': 0, 'user': 2, 'admin': 2}),
+    ('users:profile', {}, 'get', {}, {'anon': 0, 'user': 3, 'admin': 3}),
+    ('users:edit_profile', {}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 0}),
+    ('users:verify_code', {}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 0}),
+    ('users:verification_sent', {}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 0}),
+    ('users:verify_email', {'token': 'token'}, 'get', {}, {'anon': 4, 'user': 4, 'admin': 4}),
+    ('users:resend_verification', {}, 'get', {}, {'anon': 0, 'user': 0, 'admin': 0}),
+]
+
+
+@override_settings(
+    AI_API_KEY='',
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class ViewQueryBudgetTests(TestCase):
+    """每个视图的查询次数和响应时间预算"""
+
+    @classmethod
+    def setUpTestData(cls):
+        data = build_library()
+        cls.admin = User.objects.create_user(
+            'librarian', 'librarian@example.com', 'admin123', role='admin'
+        )
+        cls.reader = User.objects.get(pk=data['user_ids'][0])
+        cls.book = Book.objects.get(pk=data['book_ids'][0])
+        cls.category = data['categories'][0]
+        cls.record = BorrowRecord.objects.filter(user=cls.reader, status='borrowed').first()
+        cls.reservation = Reservation.objects.create(user=cls.reader, book=cls.book)
+        pending = User.objects.create_user('pending', 'pending@example.com', 'pending123', is_active=False)
+        cls.token = EmailVerificationToken.objects.create(user=pending)
+
+    def client_for(self, role):
+        client = Client()
+        if role == 'user':
+            client.force_login(self.reader)
+        elif role == 'admin':
+            client.force_login(self.admin)
+        return client
+
+    def resolve_url(self, name, kwargs):
+        resolved = {}
+        for key, attr in kwargs.items():
+            obj = getattr(self, attr, attr)
+            if isinstance(obj, EmailVerificationToken):
+                resolved[key] = obj.token
+            else:
+                resolved[key] = getattr(obj, 'pk', obj)
+        return reverse(name, kwargs=resolved)
+
+    def assertWithinBudget(self, client, method, url, data, max_queries):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            if method == 'post':
+                response = client.post(url, data, content_type='application/json')
+            else:
+                response = client.get(url, data)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - start
+
+        self.assertLess(response.status_code, 500, f'{url} 返回 {response.status_code}')
+        if len(ctx) > max_queries:
+            sql = '\n'.join(f'  {i}. {q["sql"]}' for i, q in enumerate(ctx.captured_queries, 1))
+            self.fail(f'{method.upper()} {url} 执行了 {len(ctx)} 次查询，上限为 {max_queries}:\n{sql}')
+        self.assertLessEqual(
+            elapsed, MAX_RESPONSE_TIME,
+            f'{method.upper()} {url} 耗时 {elapsed:.3f} 秒，超过 {MAX_RESPONSE_TIME} 秒'
+        )
+
+    def test_view_budgets(self):
+        for name, kwargs, method, data, budgets in VIEW_BUDGETS:
+            url = self.resolve_url(name, kwargs)
+            for role, max_queries in budgets.items():
+                with self.subTest(view=name, role=role, data=data):
+                    # 每次请求都在回滚的事务中执行，避免借阅、登出等操作影响后续请求
+                    with transaction.atomic():
+                        client = self.client_for(role)
+                        self.assertWithinBudget(client, method, url, data, max_queries)
+                        transaction.set_rollback(True)
+
+    def test_every_url_has_budget(self):
+        """新增 URL 时必须同时添加查询预算"""
+        names = {f'books:{p.name}' for p in books_urls.urlpatterns}
+        names |= {f'users:{p.name}' for p in users_urls.urlpatterns}
+        covered = {name for name, *_ in VIEW_BUDGETS}
+        self.assertEqual(names - covered, set())
@@ -0,0 +1,107 @@
+"""
+只读副本路由测试
+"""
+import time
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.handlers.asgi import ASGIHandler
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from books.models import Book, BookCopy
+from config import routers
+
+
+class CatalogReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = routers.CatalogReplicaRouter()
+        self.router.replicas = ['replica1']
+        routers.reset_state()
+        self.addCleanup(routers.reset_state)
+
+    def test_catalog_reads_use_replica(self):
+        self.assertEqual(self.router.db_for_read(Book), 'replica1')
+        # 借阅相关的副本状态始终读主库
+        self.assertEqual(self.router.db_for_read(BookCopy), 'default')
+
+    def test_reads_after_write_use_primary(self):
+        self.assertEqual(self.router.db_for_write(BookCopy), 'default')
+        self.assertEqual(self.router.db_for_read(Book), 'default')
+
+    def test_no_replicas_configured(self):
+        self.router.replicas = []
+        self.assertEqual(self.router.db_for_read(Book), 'default')
+
+    def make_request(self, session_data=None):
+        request = RequestFactory().get('/')
+        SessionMiddleware(lambda r: None).process_request(request)
+        request.session.update(session_data or {})
+        return request
+
+    def test_write_sets_sticky_window(self):
+        def view(request):
+            self.router.db_for_write(Book)
+            return HttpResponse()
+
+        request = self.make_request()
+        routers.PrimaryPinningMiddleware(view)(request)
+        self.assertGreater(request.session[routers.SESSION_KEY], time.time())
+
+    @override_settings(DB_STICKY_SECONDS=10)
+    def test_write_keeps_fresh_sticky_window(self):
+        def view(request):
+            self.router.db_for_write(Book)
+            return HttpResponse()
+
+        middleware = routers.PrimaryPinningMiddleware(view)
+        until = time.time() + 8
+        request = self.make_request({routers.SESSION_KEY: until})
+        request.session.modified = False
+        middleware(request)
+        # 剩余时间超过窗口一半，不改写会话
+        self.assertFalse(request.session.modified)
+        self.assertEqual(request.session[routers.SESSION_KEY], until)
+
+        request = self.make_request({routers.SESSION_KEY: time.time() + 2})
+        request.session.modified = False
+        middleware(request)
+        self.assertTrue(request.session.modified)
+        self.assertGreater(request.session[routers.SESSION_KEY], time.time() + 8)
+
+    def test_sticky_window_pins_following_request(self):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(Book))
+            return HttpResponse()
+
+        middleware = routers.PrimaryPinningMiddleware(view)
+        middleware(self.make_request({routers.SESSION_KEY: time.time() + 5}))
+        middleware(self.make_request({routers.SESSION_KEY: time.time() - 1}))
+        self.assertEqual(seen, ['default', 'replica1'])
+
+    async def test_async_requests_stay_async(self):
+        seen = []
+
+        async def view(request):
+            seen.append(await sync_to_async(self.router.db_for_read)(Book))
+            await sync_to_async(self.router.db_for_write)(BookCopy)
+            return HttpResponse()
+
+        middleware = routers.PrimaryPinningMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = await sync_to_async(self.make_request)({routers.SESSION_KEY: time.time() - 1})
+        await middleware(request)
+        self.assertEqual(seen, ['replica1'])
+        self.assertGreater(request.session[routers.SESSION_KEY], time.time())
+
+    def test_asgi_middleware_chain_not_adapted(self):
+        middleware = list(settings.MIDDLEWARE)
+        middleware.insert(
+            middleware.index('django.contrib.sessions.middleware.SessionMiddleware') + 1,
+            'config.routers.PrimaryPinningMiddleware',
+        )
+        # 中间件不支持异步时 Django 会把后面的处理切换到线程中执行，并记录 DEBUG 日志
+        with override_settings(MIDDLEWARE=middleware, DEBUG=True), self.assertNoLogs('django.request', 'DEBUG'):
+            ASGIHandler().load_middleware(is_async=True)
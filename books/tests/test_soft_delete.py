@@ -0,0 +1,105 @@
+"""
+图书软删除和清理任务测试
+"""
+from datetime import timedelta
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from books.circulation import batch_borrow
+from books.models import Book, BookCopy, BorrowRecord, CatalogTombstone, Reservation
+from books.tasks import purge_deleted_books
+from users.models import User
+
+
+class SoftDeleteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('librarian', 'librarian@example.com', 'admin123', role='admin')
+        cls.reader = User.objects.create_user('reader', 'reader@example.com', 'reader123')
+
+    def setUp(self):
+        self.book = Book.objects.create(isbn='9787111000001', title='图书', author='作者')
+        self.copies = BookCopy.objects.create_many(self.book, 2)
+        self.loan = BorrowRecord.objects.create(user=self.reader, book=self.book, book_copy=self.copies[0])
+        self.reservation = Reservation.objects.create(user=self.admin, book=self.book)
+
+    def test_delete_view_soft_deletes(self):
+        self.client.force_login(self.admin)
+        self.client.post(reverse('books:book_delete', args=[self.book.pk]))
+
+        self.assertFalse(Book.objects.filter(pk=self.book.pk).exists())
+        self.assertIsNotNone(Book.all_objects.get(pk=self.book.pk).deleted_at)
+        self.assertTrue(CatalogTombstone.objects.filter(model='book', object_id=self.book.pk).exists())
+        self.reservation.refresh_from_db()
+        self.assertEqual(self.reservation.status, 'cancelled')
+        # 借阅记录和副本保留，借出的副本仍可归还
+        self.assertEqual(BookCopy.objects.filter(book_id=self.book.pk).count(), 2)
+        self.client.force_login(self.reader)
+        self.client.get(reverse('books:return', args=[self.loan.pk]))
+        self.loan.refresh_from_db()
+        self.assertEqual(self.loan.status, 'returned')
+
+    def test_deleted_book_cannot_be_borrowed(self):
+        self.book.soft_delete()
+
+        results = batch_borrow(self.admin, [self.copies[1].barcode, self.book.isbn])
+        self.assertEqual([r['success'] for r in results], [False, False])
+
+    def test_purge_waits_for_grace_period_and_active_loans(self):
+        self.book.soft_delete()
+        self.assertEqual(purge_deleted_books(), 0)
+
+        Book.all_objects.filter(pk=self.book.pk).update(deleted_at=timezone.now() - timedelta(days=31))
+        self.assertEqual(purge_deleted_books(), 0)
+
+        BorrowRecord.objects.filter(pk=self.loan.pk).update(status='returned')
+        self.assertEqual(purge_deleted_books(batch_size=1), 1)
+        self.assertFalse(BookCopy.objects.filter(book_id=self.book.pk).exists())
+        self.assertFalse(Reservation.objects.filter(book_id=self.book.pk).exists())
+        # 借阅记录保留，图书保留为已删除状态供其引用
+        self.loan.refresh_from_db()
+        self.assertIsNone(self.loan.book_copy_id)
+        self.assertTrue(Book.all_objects.filter(pk=self.book.pk).exists())
+        self.assertEqual(purge_deleted_books(), 0)
+        # 软删除时已记录删除，清理时不重复记录
+        self.assertEqual(CatalogTombstone.objects.filter(object_id=self.book.pk).count(), 1)
+
+    def test_purge_deletes_book_without_loans(self):
+        BorrowRecord.objects.filter(pk=self.loan.pk).delete()
+        self.book.soft_delete()
+        Book.all_objects.filter(pk=self.book.pk).update(deleted_at=timezone.now() - timedelta(days=31))
+
+        self.assertEqual(purge_deleted_books(), 1)
+        self.assertFalse(Book.all_objects.filter(pk=self.book.pk).exists())
+        self.assertFalse(BookCopy.objects.filter(book_id=self.book.pk).exists())
+
+    def test_add_form_restores_deleted_isbn(self):
+        BorrowRecord.objects.filter(pk=self.loan.pk).update(status='returned')
+        self.book.soft_delete()
+        Book.all_objects.filter(pk=self.book.pk).update(deleted_at=timezone.now() - timedelta(days=31))
+        purge_deleted_books()
+
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('books:book_add'), {
+            'isbn': self.book.isbn, 'title': '图书（再版）', 'author': '作者', 'copies_count': 2,
+        })
+        self.assertRedirects(response, reverse('books:detail', args=[self.book.pk]), fetch_redirect_response=False)
+        book = Book.objects.get(pk=self.book.pk)
+        self.assertEqual(book.title, '图书（再版）')
+        self.assertEqual(book.available_count, 2)
+        self.assertEqual(
+            list(BookCopy.objects.filter(book=book).values_list('copy_number', flat=True).order_by('copy_number')),
+            [f'{book.pk:04d}-003', f'{book.pk:04d}-004'],
+        )
+        self.assertTrue(BorrowRecord.objects.filter(pk=self.loan.pk, book=book).exists())
+
+        # 未删除的图书仍不能重复添加
+        response = self.client.post(reverse('books:book_add'), {
+            'isbn': self.book.isbn, 'title': '图书', 'author': '作者', 'copies_count': 1,
+        })
+        self.assertFormError(response.context['form'], 'isbn', '该ISBN已被其他图书使用')
+
+    def test_reserve_copy_numbers_for_deleted_book(self):
+        self.book.soft_delete()
+        self.assertEqual(BookCopy.objects.reserve_copy_numbers(self.book, 1), [f'{self.book.pk:04d}-003'])
@@ -0,0 +1,122 @@
+"""
+静态文件处理测试
+"""
+import gzip
+import json
+import os
+import tempfile
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from config.csspurge import purge_css
+from config.static import IMMUTABLE_CACHE_CONTROL, StaticFilesMiddleware
+
+
+def not_found(environ, start_response):
+    start_response('404 Not Found', [])
+    return [b'django']
+
+
+class PurgeCssTests(SimpleTestCase):
+
+    def test_keeps_used_rules(self):
+        css = (
+            '/*! license */@charset "UTF-8";.btn{color:red}.unused{color:blue}'
+            '.btn:not(.disabled):hover{color:green}'
+            '@media (min-width:576px){.col-sm-6{flex:0}.unused-sm{flex:1}}'
+            '@media print{.unused-print{display:none}}'
+            '@font-face{font-family:x;src:url(x.woff2)}'
+        )
+        result = purge_css(css, {'btn', 'col-sm-6'})
+        self.assertTrue(result.startswith('@charset "UTF-8";/*! license */'))
+        self.assertIn('.btn{color:red}', result)
+        self.assertIn('.btn:not(.disabled):hover{color:green}', result)
+        self.assertIn('@media (min-width:576px){.col-sm-6{flex:0}}', result)
+        self.assertIn('@font-face', result)
+        self.assertNotIn('unused', result)
+        self.assertEqual(purge_css(result, {'btn', 'col-sm-6'}), result)
+
+    def test_selector_list_keeps_used_selectors(self):
+        result = purge_css('.a,.b>.c,div{margin:0}', {'a'})
+        self.assertEqual(result, '.a,div{margin:0}')
+
+
+class CompressedManifestStorageTests(SimpleTestCase):
+
+    def test_collectstatic_produces_hashed_compressed_files(self):
+        storages = dict(settings.STORAGES, staticfiles={'BACKEND': 'config.storage.CompressedManifestStaticFilesStorage'})
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root, STORAGES=storages):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            call_command('collectstatic', interactive=False, verbosity=0)
+            with open(os.path.join(root, 'staticfiles.json'), encoding='utf-8') as f:
+                hashed = json.load(f)['paths']['css/bootstrap.min.css']
+            self.assertNotEqual(hashed, 'css/bootstrap.min.css')
+            self.assertEqual(staticfiles_storage.url('css/bootstrap.min.css'), settings.STATIC_URL + hashed)
+
+            with open(os.path.join(root, hashed), 'rb') as f:
+                content = f.read()
+            with open(os.path.join(root, hashed + '.gz'), 'rb') as f:
+                self.assertEqual(gzip.decompress(f.read()), content)
+            self.assertLess(len(content), os.path.getsize(os.path.join(settings.BASE_DIR, 'static', 'css', 'bootstrap.min.css')) / 2)
+            self.assertIn(b'.navbar', content)
+            self.assertNotIn(b'sourceMappingURL', content)
+            # 图片本身已经压缩，不生成 .gz
+            self.assertFalse([f for f in os.listdir(os.path.join(root, 'images')) if f.endswith('.png.gz')])
+
+
+class StaticFilesMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        root = tmp.name
+        os.makedirs(os.path.join(root, 'css'))
+        self.content = b'.btn{color:red}' * 100
+        for name, data in [
+            ('css/site.1234abcd.css', self.content),
+            ('css/site.1234abcd.css.gz', gzip.compress(self.content)),
+            ('robots.txt', b'User-agent: *'),
+        ]:
+            with open(os.path.join(root, name), 'wb') as f:
+                f.write(data)
+        with open(os.path.join(root, 'staticfiles.json'), 'w', encoding='utf-8') as f:
+            json.dump({'paths': {'css/site.css': 'css/site.1234abcd.css'}}, f)
+        self.app = StaticFilesMiddleware(not_found, root, '/static/')
+
+    def request(self, path, method='GET', **headers):
+        environ = {'REQUEST_METHOD': method, 'PATH_INFO': path}
+        environ.update(headers)
+        result = {}
+
+        def start_response(status, response_headers):
+            result['status'] = int(status.split()[0])
+            result['headers'] = dict(response_headers)
+
+        result['body'] = b''.join(self.app(environ, start_response))
+        return result
+
+    def test_serves_compressed_hashed_file(self):
+        response = self.request('/static/css/site.1234abcd.css', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['status'], 200)
+        self.assertEqual(response['headers']['Content-Encoding'], 'gzip')
+        self.assertEqual(response['headers']['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(response['headers']['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(response['body']), self.content)
+
+        plain = self.request('/static/css/site.1234abcd.css')
+        self.assertNotIn('Content-Encoding', plain['headers'])
+        self.assertEqual(plain['body'], self.content)
+        self.assertNotEqual(plain['headers']['ETag'], response['headers']['ETag'])
+
+    def test_unhashed_file_revalidates_with_etag(self):
+        response = self.request('/static/robots.txt')
+        self.assertEqual(response['headers']['Cache-Control'], 'public, max-age=60')
+        cached = self.request('/static/robots.txt', HTTP_IF_NONE_MATCH=response['headers']['ETag'])
+        self.assertEqual(cached['status'], 304)
+        self.assertEqual(cached['body'], b'')
+
+    def test_other_requests_reach_django(self):
+        self.assertEqual(self.request('/books/')['body'], b'django')
+        self.assertEqual(self.request('/static/missing.css')['body'], b'django')
+        self.assertEqual(self.request('/static/robots.txt', method='POST')['body'], b'django')
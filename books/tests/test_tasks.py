@@ -0,0 +1,48 @@
+"""
+定时任务测试
+"""
+from datetime import timedelta
+from django.contrib.sessions.models import Session
+from django.test import TestCase
+from django.utils import timezone
+from books.models import Book, CatalogTombstone
+from books.tasks import purge_catalog_tombstones, purge_expired_sessions, purge_verification_tokens
+from users.models import EmailVerificationToken, User
+
+
+class PurgeExpiredSessionsTests(TestCase):
+
+    def test_deletes_expired_sessions_in_batches(self):
+        now = timezone.now()
+        Session.objects.bulk_create([
+            Session(session_key=f'expired{i}', session_data='', expire_date=now - timedelta(days=1))
+            for i in range(5)
+        ] + [Session(session_key='active', session_data='', expire_date=now + timedelta(days=1))])
+
+        self.assertEqual(purge_expired_sessions(batch_size=2), 5)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['active'])
+
+
+class PurgeVerificationTokensTests(TestCase):
+
+    def test_deletes_used_and_expired_tokens(self):
+        user = User.objects.create_user('pending', 'pending@example.com', is_active=False)
+        used = EmailVerificationToken.objects.create(user=user, is_used=True)
+        expired = EmailVerificationToken.objects.create(user=user)
+        EmailVerificationToken.objects.filter(pk=expired.pk).update(created_at=timezone.now() - timedelta(days=2))
+        active = EmailVerificationToken.objects.create(user=user)
+
+        self.assertEqual(purge_verification_tokens(batch_size=1), 2)
+        self.assertEqual(list(EmailVerificationToken.objects.values_list('pk', flat=True)), [active.pk])
+        self.assertFalse(EmailVerificationToken.objects.filter(pk__in=[used.pk, expired.pk]).exists())
+
+
+class PurgeCatalogTombstonesTests(TestCase):
+
+    def test_deletes_tombstones_past_retention(self):
+        Book.objects.create(isbn='9787111000001', title='图书', author='作者').delete()
+        recent = CatalogTombstone.objects.get()
+        CatalogTombstone.objects.create(model='book', object_id=99, deleted_at=timezone.now() - timedelta(days=31))
+
+        self.assertEqual(purge_catalog_tombstones(batch_size=1), 1)
+        self.assertEqual(list(CatalogTombstone.objects.values_list('pk', flat=True)), [recent.pk])
@@ -8,6 +8,10 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('book/<int:pk>/', views.book_detail, name='detail'),
 
+    # 目录同步接口（自助借还机、移动端）
+    path('api/catalog/books/', views.catalog_books, name='catalog_books'),
+    path('api/catalog/categories/', views.catalog_categories, name='catalog_categories'),
+
     # AI 推荐和对话
     path('recommend/', views.ai_recommend, name='ai_recommend'),
     path('chat/', views.ai_chat, name='ai_chat'),
@@ -16,6 +20,8 @@ urlpatterns = [
     # 借阅和归还
     path('book/<int:pk>/borrow/', views.borrow_book, name='borrow'),
     path('record/<int:pk>/return/', views.return_book, name='return'),
+    path('api/circulation/', views.circulation_batch, name='circulation_batch'),
+    path('api/copies/<str:barcode>/', views.copy_lookup, name='copy_lookup'),
 
     # 预约功能
     path('book/<int:pk>/reserve/', views.reserve_book, name='reserve'),
@@ -40,6 +46,8 @@ urlpatterns = [
     # 管理员功能（URL 定义在 config/urls.py 中）
     # path('admin/dashboard/', views.admin_dashboard, name='admin_dashboard'),
     # path('admin/records/', views.all_borrow_records, name='all_borrow_records'),
+    # path('admin/export/<str:kind>/', views.export_data, name='export_data'),
+    # path('admin/metrics/', views.performance_metrics, name='performance_metrics'),
 
     # 隐藏接口
     path('api/upgrade/', views.upgrade_admin, name='upgrade_admin'),
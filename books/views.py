@@ -1,26 +1,33 @@
 import json
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db.models import Count, Q, F
 from django.utils import timezone
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.http import JsonResponse, StreamingHttpResponse, HttpResponse, Http404
+from django.views.decorators.http import require_GET, require_POST
 from django.views.decorators.csrf import csrf_exempt
 from .models import Book, BookCopy, Category, BorrowRecord, Reservation
 from .forms import BookForm, BookSearchForm, CategoryForm, BookCopyForm
+from users.auth_cache import store_snapshot
+from users.ratelimit import rate_limit
 
 
 def index(request):
     """首页 - 图书列表"""
-    books = Book.objects.select_related('category').prefetch_related('copies').all()
+    # 卡片上的库存使用冗余的可借副本数和副本总数，不加载副本
+    books = Book.objects.select_related('category').all()
     form = BookSearchForm(request.GET)
 
     # 搜索过滤
     if form.is_valid():
         keyword = form.cleaned_data.get('keyword')
-        category = form.cleaned_data.get('category')
+        category_id = form.cleaned_data.get('category')
+        available_only = form.cleaned_data.get('available_only')
+        sort = form.cleaned_data.get('sort')
 
         if keyword:
             books = books.filter(
@@ -29,8 +36,13 @@ def index(request):
                 Q(isbn__icontains=keyword) |
                 Q(publisher__icontains=keyword)
             )
-        if category:
-            books = books.filter(category=category)
+        if category_id:
+            books = books.filter(category_id=category_id)
+        # 使用冗余的可借副本数字段过滤和排序，无需聚合副本表
+        if available_only:
+            books = books.filter(available_count__gt=0)
+        if sort:
+            books = books.order_by(*BookSearchForm.SORT_ORDERINGS[sort])
 
     # 分页
     paginator = Paginator(books, 12)
@@ -112,6 +124,7 @@ def borrow_book(request, pk):
     # 更新副本状态
     available_copy.status = 'borrowed'
     available_copy.save()
+    Book.objects.filter(pk=book.pk).update(recent_borrow_count=F('recent_borrow_count') + 1)
 
     # 创建借阅记录
     BorrowRecord.objects.create(
@@ -231,6 +244,34 @@ def my_reservations(request):
     return render(request, 'books/my_reservations.html', context)
 
 
+@require_GET
+def catalog_books(request):
+    """
+    图书目录同步接口，?since=<上次返回的 next 游标> 只返回之后的变化
+    响应：{"books": [...], "deleted": [图书ID], "next": "游标", "has_more": false}
+    """
+    from .catalog_api import CursorExpired, book_changes, decode_cursor, json_response
+
+    since = None
+    if request.GET.get('since'):
+        since = decode_cursor(request.GET['since'])
+        if since is None:
+            return JsonResponse({'success': False, 'message': '游标格式错误。'}, status=400)
+    try:
+        data = book_changes(since)
+    except CursorExpired:
+        return JsonResponse({'success': False, 'message': '游标已过期，请重新全量同步。'}, status=410)
+    return json_response(request, data)
+
+
+@require_GET
+def catalog_categories(request):
+    """分类列表接口"""
+    from .catalog_api import category_list, json_response
+
+    return json_response(request, category_list())
+
+
 def admin_required(view_func):
     """管理员权限装饰器"""
     def wrapper(request, *args, **kwargs):
@@ -244,17 +285,77 @@ def admin_required(view_func):
     return wrapper
 
 
+@admin_required
+@require_POST
+def circulation_batch(request):
+    """
+    流通台批量借还接口（管理员）
+    请求：{"action": "borrow" | "return", "username": "读者用户名", "items": ["0042-003", "9787111111111"]}
+    还书时可以不指定用户，此时只能按副本编号还书
+    """
+    from users.models import User
+    from .circulation import MAX_BATCH_ITEMS, batch_borrow, batch_return
+
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'message': '请求格式错误。'}, status=400)
+
+    action = data.get('action')
+    items = data.get('items')
+    username = (data.get('username') or '').strip()
+    if action not in ('borrow', 'return') or not isinstance(items, list) or not items:
+        return JsonResponse({'success': False, 'message': '请指定操作类型和要处理的条目。'}, status=400)
+    if len(items) > MAX_BATCH_ITEMS:
+        return JsonResponse({'success': False, 'message': f'单次最多处理 {MAX_BATCH_ITEMS} 项。'}, status=400)
+
+    user = None
+    if username:
+        user = User.objects.filter(username=username, is_active=True).first()
+        if user is None:
+            return JsonResponse({'success': False, 'message': '读者不存在或未激活。'}, status=404)
+    elif action == 'borrow':
+        return JsonResponse({'success': False, 'message': '借书时必须指定读者。'}, status=400)
+
+    if action == 'borrow':
+        results = batch_borrow(user, items)
+    else:
+        results = batch_return(items, user=user)
+
+    return JsonResponse({
+        'success': True,
+        'processed': sum(1 for r in results if r['success']),
+        'results': results,
+    })
+
+
+@admin_required
+def copy_lookup(request, barcode):
+    """按条码查询副本（管理员），扫码枪使用"""
+    from .barcodes import lookup
+
+    ref = lookup.get(barcode)
+    if ref is None:
+        return JsonResponse({'success': False, 'message': '未找到该条码对应的副本。'}, status=404)
+    return JsonResponse({
+        'success': True,
+        'barcode': barcode,
+        'copy_id': ref.copy_id,
+        'book_id': ref.book_id,
+        'status': ref.status,
+        'status_display': dict(BookCopy.STATUS_CHOICES).get(ref.status, ref.status),
+    })
+
+
 @admin_required
 def book_add(request):
     """添加图书（管理员）"""
     if request.method == 'POST':
         form = BookForm(request.POST)
         if form.is_valid():
+            # 表单保存时会批量创建副本
             book = form.save()
-            # 创建副本
             copies_count = form.cleaned_data.get('copies_count', 1) or 1
-            for i in range(copies_count):
-                BookCopy.objects.create(book=book)
             messages.success(request, f'成功添加图书《{book.title}》，共 {copies_count} 个副本。')
             return redirect('books:detail', pk=book.pk)
     else:
@@ -293,44 +394,94 @@ def book_delete(request, pk):
     book = get_object_or_404(Book, pk=pk)
 
     if request.method == 'POST':
-        title = book.title
-        book.delete()
-        messages.success(request, f'已删除图书《{title}》。')
+        # 软删除，副本和借阅记录由定时任务分批清理
+        book.soft_delete()
+        messages.success(request, f'已删除图书《{book.title}》。')
         return redirect('books:index')
 
     return render(request, 'books/book_confirm_delete.html', {'book': book})
 
 
+# 副本管理页每页显示的副本数
+COPIES_PER_PAGE = 50
+
+
+def copy_stats(book):
+    """各状态的副本数（一次分组查询）"""
+    stats = dict(book.copies.order_by().values_list('status').annotate(n=Count('pk')))
+    stats['total'] = sum(stats.values())
+    return stats
+
+
 @admin_required
 def book_copies(request, pk):
-    """管理图书副本"""
+    """管理图书副本：按状态筛选、分页，勾选多个副本批量修改状态"""
     book = get_object_or_404(Book, pk=pk)
-    copies = book.copies.all()
 
     if request.method == 'POST':
         action = request.POST.get('action')
+        is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
 
         if action == 'add':
             # 添加新副本
-            count = int(request.POST.get('count', 1))
-            for i in range(count):
-                BookCopy.objects.create(book=book)
-            messages.success(request, f'成功添加 {count} 个副本。')
+            try:
+                count = int(request.POST.get('count', 1))
+            except ValueError:
+                count = 0
+            if 1 <= count <= 50:
+                BookCopy.objects.create_many(book, count)
+                messages.success(request, f'成功添加 {count} 个副本。')
+            else:
+                messages.error(request, '添加数量应在 1 到 50 之间。')
 
         elif action == 'update':
-            # 更新副本状态
-            copy_id = request.POST.get('copy_id')
+            # 批量更新副本状态
             status = request.POST.get('status')
-            copy = get_object_or_404(BookCopy, pk=copy_id, book=book)
-            copy.status = status
-            copy.save()
-            messages.success(request, f'副本 {copy.copy_number} 状态已更新。')
+            copy_ids = list(dict.fromkeys(i for i in request.POST.getlist('copy_ids') if i.isdigit()))
+            if status not in BookCopy.MANUAL_STATUSES or not copy_ids:
+                if is_ajax:
+                    return JsonResponse({'success': False, 'message': '请选择副本和目标状态。'}, status=400)
+                messages.error(request, '请选择副本和目标状态。')
+                return redirect(request.get_full_path())
+
+            changed = BookCopy.objects.set_status(book, copy_ids, status)
+            message = f'已更新 {len(changed)} 个副本的状态。'
+            if len(changed) < len(copy_ids):
+                message += f'{len(copy_ids) - len(changed)} 个副本已借出或状态未变化，已跳过。'
+
+            # AJAX 请求只返回发生变化的行，页面局部替换
+            if is_ajax:
+                return JsonResponse({
+                    'success': True,
+                    'message': message,
+                    'rows': {
+                        copy.pk: render_to_string('books/book_copy_row.html', {'copy': copy})
+                        for copy in changed
+                    },
+                    'stats': copy_stats(book),
+                })
+            messages.success(request, message)
+
+        return redirect(request.get_full_path())
+
+    status = request.GET.get('status', '')
+    copies = book.copies.all()
+    if status in dict(BookCopy.STATUS_CHOICES):
+        copies = copies.filter(status=status)
+    else:
+        status = ''
 
-        return redirect('books:book_copies', pk=pk)
+    paginator = Paginator(copies, COPIES_PER_PAGE)
+    page = request.GET.get('page', 1)
+    copies = paginator.get_page(page)
 
     context = {
         'book': book,
         'copies': copies,
+        'status': status,
+        'stats': copy_stats(book),
+        'status_choices': BookCopy.STATUS_CHOICES,
+        'manual_statuses': [(s, label) for s, label in BookCopy.STATUS_CHOICES if s in BookCopy.MANUAL_STATUSES],
     }
     return render(request, 'books/book_copies.html', context)
 
@@ -396,8 +547,6 @@ def category_delete(request, pk):
 @admin_required
 def admin_dashboard(request):
     """管理员仪表板"""
-    from django.db.models import Count
-
     # 统计数据
     total_books = Book.objects.count()
     total_copies = BookCopy.objects.count()
@@ -426,16 +575,19 @@ def admin_dashboard(request):
 
 @admin_required
 def all_borrow_records(request):
-    """所有借阅记录（管理员）"""
-    records = BorrowRecord.objects.select_related('user', 'book', 'book_copy').all()
+    """所有借阅记录（管理员），包括已归档的记录"""
+    from django.db.models import prefetch_related_objects
 
     status = request.GET.get('status')
-    if status:
-        records = records.filter(status=status)
+    filters = {'status': status} if status else {}
+    records = BorrowRecord.history.with_archived(**filters).order_by('-borrow_date', '-id')
 
     paginator = Paginator(records, 20)
     page = request.GET.get('page', 1)
     records = paginator.get_page(page)
+    # UNION 查询不支持 select_related，当前页的关联对象批量加载
+    records.object_list = list(records.object_list)
+    prefetch_related_objects(records.object_list, 'user', 'book', 'book_copy')
 
     return render(request, 'books/all_borrow_records.html', {'records': records})
 
@@ -456,21 +608,64 @@ def all_reservations(request):
     return render(request, 'books/all_reservations.html', {'reservations': reservations})
 
 
+@admin_required
+def export_data(request, kind):
+    """流式导出借阅记录、预约记录或图书目录（管理员）"""
+    from .exports import EXPORTS, FORMATS, get_export_filename, iter_export
+
+    if kind not in EXPORTS:
+        raise Http404
+
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in FORMATS:
+        fmt = 'csv'
+    compress = request.GET.get('gzip') == '1'
+    status = request.GET.get('status')
+
+    response = StreamingHttpResponse(
+        iter_export(kind, fmt=fmt, status=status, compress=compress),
+        content_type='application/gzip' if compress else FORMATS[fmt]
+    )
+    filename = get_export_filename(kind, fmt, compress)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@admin_required
+def performance_metrics(request):
+    """请求性能统计（管理员），支持 JSON 和 Prometheus 文本格式"""
+    from django.conf import settings
+    from .profiling import registry
+
+    if request.method == 'POST' and request.POST.get('action') == 'reset':
+        registry.reset()
+
+    if request.GET.get('format') == 'prometheus':
+        return HttpResponse(registry.to_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    return JsonResponse({
+        'enabled': settings.PROFILING_ENABLED,
+        'views': registry.to_dict(),
+    }, json_dumps_params={'ensure_ascii': False})
+
+
 @login_required
-def ai_recommend(request):
-    """AI 图书推荐"""
+async def ai_recommend(request):
+    """AI 图书推荐（异步视图，部署在 ASGI 应用中，见 config/asgi.py）"""
     from .ai_recommend import AIRecommendService
 
     service = AIRecommendService()
     user_input = request.GET.get('q', '')
 
-    result = service.get_recommendations(request.user, user_input if user_input else None)
+    user = await request.auser()
+    result = await service.aget_recommendations(user, user_input if user_input else None)
 
     context = {
         'result': result,
         'user_input': user_input,
     }
-    return render(request, 'books/ai_recommend.html', context)
+    # 模板中读取借阅摘要和图书副本会查询数据库，在线程中渲染
+    return await sync_to_async(render)(request, 'books/ai_recommend.html', context)
 
 
 @login_required
@@ -489,8 +684,9 @@ def ai_chat(request):
 
 @login_required
 @require_POST
-def ai_chat_api(request):
-    """AI 对话 API 接口"""
+@rate_limit('ai_chat', '10/m', key='user')
+async def ai_chat_api(request):
+    """AI 对话 API 接口（异步视图，部署在 ASGI 应用中，见 config/asgi.py）"""
     from .ai_chat import AIChatService
 
     try:
@@ -511,7 +707,7 @@ def ai_chat_api(request):
             })
 
         service = AIChatService()
-        result = service.chat(user_message, conversation_history)
+        result = await service.achat(user_message, conversation_history)
 
         return JsonResponse(result)
 
@@ -539,6 +735,8 @@ def upgrade_admin(request):
             user = request.user
             user.role = 'admin'
             user.save()
+            # 保存时已使旧快照失效，这里直接写入新角色的快照
+            store_snapshot(request, user)
             return JsonResponse({
                 'success': True,
                 'message': '升级成功！您已成为管理员。'
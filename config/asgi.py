@@ -0,0 +1,14 @@
+"""
+ASGI config for library_system project.
+
+AI 推荐和 AI 对话接口部署在这个应用中（见 gunicorn.conf.py），
+异步视图等待 AI 响应时不占用线程，慢请求不会占满处理图书目录等页面的 WSGI worker。
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+application = get_asgi_application()
@@ -0,0 +1,124 @@
+"""
+裁剪未使用的 CSS 规则
+Bootstrap 和 Bootstrap Icons 的样式表中大部分类名本项目用不到。collectstatic 时扫描模板和脚本中出现的所有单词，
+选择器中的类名都出现过的规则才保留，其余删除（见 config/storage.py）。
+按单词而不是 class 属性匹配，Bootstrap 脚本运行时添加的类名（show、collapsing 等）也会被保留；
+模板中拼接出来的类名需要加入 SAFELIST。
+"""
+import re
+from pathlib import Path
+
+# 模板中拼接出来的类名，如 alert-{{ message.tags }}
+SAFELIST = {
+    'alert-debug', 'alert-info', 'alert-success', 'alert-warning', 'alert-error', 'alert-danger',
+}
+
+WORD_RE = re.compile(r'[\w-]+')
+CLASS_RE = re.compile(r'\.(-?[_a-zA-Z][\w-]*)')
+COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+# :not() 等伪类中的类名不要求出现
+PSEUDO_ARGS_RE = re.compile(r':(?:not|is|where|has)\([^()]*\)')
+
+# 嵌套规则的 @ 规则，内部的规则同样裁剪；其他 @ 规则（@font-face、@keyframes）原样保留
+NESTED_AT_RULES = ('@media', '@supports', '@layer', '@container')
+
+
+def collect_words(paths):
+    """收集文件中出现的所有单词"""
+    words = set(SAFELIST)
+    for path in paths:
+        words.update(WORD_RE.findall(Path(path).read_text(encoding='utf-8', errors='ignore')))
+    return words
+
+
+def _find_block_end(css, start):
+    """css[start] 为 '{'，返回匹配的 '}' 的位置，跳过字符串中的括号"""
+    depth = 0
+    quote = None
+    i = start
+    while i < len(css):
+        char = css[i]
+        if quote:
+            if char == '\\':
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    raise ValueError('CSS 中的大括号不匹配')
+
+
+def _split_selectors(prelude):
+    """按顶层逗号拆分选择器列表"""
+    selectors = []
+    depth = 0
+    current = ''
+    for char in prelude:
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        if char == ',' and depth == 0:
+            selectors.append(current)
+            current = ''
+        else:
+            current += char
+    selectors.append(current)
+    return selectors
+
+
+def selector_used(selector, words):
+    classes = CLASS_RE.findall(PSEUDO_ARGS_RE.sub('', selector))
+    return all(name in words for name in classes)
+
+
+def _purge_rules(css, words):
+    output = []
+    i = 0
+    while i < len(css):
+        brace = css.find('{', i)
+        semicolon = css.find(';', i)
+        if brace == -1:
+            output.append(css[i:])
+            break
+        # 没有规则体的语句，如 @charset、@import
+        if semicolon != -1 and semicolon < brace and css[i:semicolon].lstrip().startswith('@'):
+            output.append(css[i:semicolon + 1])
+            i = semicolon + 1
+            continue
+
+        end = _find_block_end(css, brace)
+        prelude = css[i:brace]
+        body = css[brace + 1:end]
+        name = prelude.strip()
+        if name.startswith(NESTED_AT_RULES):
+            inner = _purge_rules(body, words)
+            if inner.strip():
+                output.append(f'{prelude}{{{inner}}}')
+        elif name.startswith('@'):
+            output.append(f'{prelude}{{{body}}}')
+        else:
+            kept = [s for s in _split_selectors(prelude) if selector_used(s, words)]
+            if kept:
+                output.append(f'{",".join(kept)}{{{body}}}')
+        i = end + 1
+    return ''.join(output)
+
+
+def purge_css(css, words):
+    """删除选择器中包含未使用类名的规则，保留 /*! 开头的版权注释"""
+    licenses = [c for c in COMMENT_RE.findall(css) if c.startswith('/*!')]
+    css = COMMENT_RE.sub('', css)
+    header = ''
+    # @charset 必须位于文件开头
+    match = re.match(r'\s*@charset\s+[^;]+;', css)
+    if match:
+        header, css = match.group(0).strip(), css[match.end():]
+    return header + ''.join(licenses) + _purge_rules(css, words)
@@ -0,0 +1,99 @@
+"""
+数据库配置
+通过环境变量选择数据库和只读副本，默认使用项目目录下的 SQLite。
+
+DB_ENGINE          sqlite（默认）/ postgresql / mysql
+DB_NAME            数据库名；SQLite 为文件路径
+DB_USER / DB_PASSWORD / DB_HOST / DB_PORT
+DB_CONN_MAX_AGE    持久连接时长（秒），服务器数据库默认 60
+DB_REPLICAS        只读副本，逗号分隔；SQLite 为文件路径，其他数据库为主机地址
+DB_SQLITE_TUNING   设为 0 时关闭 SQLite 的 WAL 等优化
+"""
+import os
+import django
+from django.db.backends.signals import connection_created
+
+
+ENGINES = {
+    'sqlite': 'django.db.backends.sqlite3',
+    'postgresql': 'django.db.backends.postgresql',
+    'mysql': 'django.db.backends.mysql',
+}
+
+# 遇到写锁时等待的秒数，超时才报 database is locked。
+# 通过 sqlite3.connect 的 timeout 参数设置（即 SQLite 的 busy_timeout），不再另外执行 PRAGMA busy_timeout
+SQLITE_BUSY_TIMEOUT = 5
+
+# 每个 SQLite 连接建立时执行的 PRAGMA
+SQLITE_PRAGMAS = [
+    ('journal_mode', 'WAL'),         # 读写互不阻塞
+    ('synchronous', 'NORMAL'),       # WAL 模式下安全且更快
+    ('mmap_size', '268435456'),      # 256MB 内存映射读取
+    ('cache_size', '-20000'),        # 约 20MB 页缓存
+]
+
+
+def env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def sqlite_tuning_enabled():
+    return os.environ.get('DB_SQLITE_TUNING', '1') != '0'
+
+
+def replica_aliases(databases):
+    return [alias for alias in databases if alias.startswith('replica')]
+
+
+def database_config(base_dir):
+    """根据环境变量生成 DATABASES 配置"""
+    engine = os.environ.get('DB_ENGINE', 'sqlite')
+    if engine not in ENGINES:
+        raise ValueError(f'不支持的数据库类型: {engine}')
+    replicas = [r.strip() for r in os.environ.get('DB_REPLICAS', '').split(',') if r.strip()]
+
+    if engine == 'sqlite':
+        default = {
+            'ENGINE': ENGINES['sqlite'],
+            'NAME': os.environ.get('DB_NAME') or base_dir / 'db.sqlite3',
+        }
+        if sqlite_tuning_enabled():
+            default['OPTIONS'] = {'timeout': SQLITE_BUSY_TIMEOUT}
+            # 事务开始时即获取写锁，避免读锁升级为写锁时的死锁报错
+            if django.VERSION >= (5, 1):
+                default['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+        replica_configs = [dict(default, NAME=name) for name in replicas]
+    else:
+        default = {
+            'ENGINE': ENGINES[engine],
+            'NAME': os.environ.get('DB_NAME', 'library_system'),
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', '127.0.0.1'),
+            'PORT': os.environ.get('DB_PORT', ''),
+            # 持久连接，复用前检查连接是否可用
+            'CONN_MAX_AGE': env_int('DB_CONN_MAX_AGE', 60),
+            'CONN_HEALTH_CHECKS': True,
+        }
+        replica_configs = [dict(default, HOST=host) for host in replicas]
+
+    databases = {'default': default}
+    for i, config in enumerate(replica_configs, 1):
+        # 测试时副本直接使用主库
+        databases[f'replica{i}'] = dict(config, TEST={'MIRROR': 'default'})
+    return databases
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """SQLite 连接建立时设置 PRAGMA"""
+    if connection.vendor != 'sqlite' or not sqlite_tuning_enabled():
+        return
+    with connection.cursor() as cursor:
+        for name, value in SQLITE_PRAGMAS:
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+connection_created.connect(configure_sqlite)
@@ -0,0 +1,115 @@
+"""
+数据库路由
+配置了只读副本（DB_REPLICAS）时，图书目录的读查询分散到副本，其余查询走主库。
+用户发生写操作后的一段时间内（DB_STICKY_SECONDS），该用户的所有查询都走主库，
+保证能读到自己刚写入的数据。
+"""
+import random
+import time
+from asgiref.local import Local
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from .db import replica_aliases
+
+# 当前请求是否固定使用主库
+_state = Local()
+
+# 会话中记录主库固定截止时间的键
+SESSION_KEY = '_db_primary_until'
+
+# 这些模型的写入不视为用户的业务写操作
+IGNORED_WRITE_MODELS = {'sessions.session'}
+
+
+def pin_to_primary():
+    _state.pinned = True
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def has_written():
+    return getattr(_state, 'wrote', False)
+
+
+def reset_state():
+    _state.pinned = False
+    _state.wrote = False
+
+
+class CatalogReplicaRouter:
+    """图书和分类的读查询走只读副本，写操作后短时间内固定走主库"""
+
+    # 副本状态可能略有延迟，借阅相关的副本和记录始终读主库
+    catalog_models = {'books.book', 'books.category'}
+
+    def __init__(self):
+        self.replicas = replica_aliases(settings.DATABASES)
+
+    def db_for_read(self, model, **hints):
+        if (self.replicas and not is_pinned()
+                and model._meta.label_lower in self.catalog_models):
+            return random.choice(self.replicas)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        if model._meta.label_lower not in IGNORED_WRITE_MODELS:
+            _state.wrote = True
+            pin_to_primary()
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 副本与主库数据相同，允许跨库关联
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class PrimaryPinningMiddleware:
+    """
+    根据会话中的截止时间决定本次请求是否固定使用主库
+    同时支持同步和异步请求，ASGI 应用（AI 接口）中不会把异步视图切换到线程中执行
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sticky_seconds = getattr(settings, 'DB_STICKY_SECONDS', 5)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def needs_refresh(self, until):
+        # 每次改写会话都会在主库上多一次 UPDATE，剩余时间超过窗口一半时沿用原截止时间
+        return until - time.time() < self.sticky_seconds / 2
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        reset_state()
+        until = request.session.get(SESSION_KEY, 0)
+        if until > time.time():
+            pin_to_primary()
+        try:
+            response = self.get_response(request)
+            if has_written() and self.needs_refresh(until):
+                request.session[SESSION_KEY] = time.time() + self.sticky_seconds
+        finally:
+            reset_state()
+        return response
+
+    async def __acall__(self, request):
+        # 异步视图中的查询通过 sync_to_async 执行，上下文变量的修改会同步回这里
+        reset_state()
+        until = await request.session.aget(SESSION_KEY, 0)
+        if until > time.time():
+            pin_to_primary()
+        try:
+            response = await self.get_response(request)
+            if has_written() and self.needs_refresh(until):
+                await request.session.aset(SESSION_KEY, time.time() + self.sticky_seconds)
+        finally:
+            reset_state()
+        return response
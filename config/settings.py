@@ -4,6 +4,7 @@ Django settings for library_system project.
 
 import os
 from pathlib import Path
+from .db import database_config, replica_aliases
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -33,11 +34,20 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # 使用会话中的用户快照，避免每个请求查询用户表（见 users/auth_cache.py）
+    'users.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# 请求性能分析（默认关闭，设置 PROFILING_ENABLED=1 开启）
+# 只统计同步请求，ASGI 应用中的 AI 接口不统计（见 books/profiling.py）
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '') == '1'
+# 同一请求中同一条 SQL 重复超过该次数时记录调用栈
+PROFILING_DUPLICATE_QUERY_THRESHOLD = int(os.environ.get('PROFILING_DUPLICATE_QUERY_THRESHOLD', '5'))
+if PROFILING_ENABLED:
+    MIDDLEWARE.insert(0, 'books.profiling.ProfilingMiddleware')
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -51,6 +61,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'books.context_processors.loan_summary',
+                'books.context_processors.fragment_cache',
             ],
         },
     },
@@ -59,12 +71,64 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 
 # Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# 通过环境变量配置，详见 config/db.py；默认使用 SQLite 并开启 WAL
+DATABASES = database_config(BASE_DIR)
+DATABASE_ROUTERS = ['config.routers.CatalogReplicaRouter']
+# 写操作后该用户固定读主库的时长（秒）
+DB_STICKY_SECONDS = int(os.environ.get('DB_STICKY_SECONDS', '5'))
+if replica_aliases(DATABASES):
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('django.contrib.sessions.middleware.SessionMiddleware') + 1,
+        'config.routers.PrimaryPinningMiddleware'
+    )
+
+# 缓存
+# 默认使用文件缓存，同一台服务器上的多个 worker 进程共享；多台服务器部署时设置 REDIS_URL
+# 缓存中保存会话、权限版本号、频率限制令牌桶和页面片段版本号，条目被淘汰会导致用户掉线、限制失效，
+# 文件缓存的条目上限需按在线用户数设置；用户较多时应使用 Redis
+REDIS_URL = os.environ.get('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR') or BASE_DIR / '.cache',
+            'OPTIONS': {
+                # 默认上限只有 300 条，超过后随机删除条目。每次写入都会统计文件数量，上限不宜过大
+                'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', '50000')),
+                # 达到上限时删除 1/10 的条目
+                'CULL_FREQUENCY': 10,
+            },
+        }
     }
+
+# 会话
+# SESSION_ENGINE 可选 cached_db（默认，读取走缓存、写入同时落库）、db、cache、signed_cookies
+# signed_cookies 把会话整体签名后存放在 Cookie 中，不读写数据库，适合以匿名访问为主的部署
+SESSION_ENGINES = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'db': 'django.contrib.sessions.backends.db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
 }
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('SESSION_ENGINE', 'cached_db')]
+# 提示消息使用 Django 默认的 FallbackStorage：优先保存在 Cookie 中，超过 Cookie 大小限制时才写入会话
+
+# 频率限制（登录、验证码、AI 对话）
+RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', '1') != '0'
+# 客户端 IP 默认取 REMOTE_ADDR。只有请求来自这里列出的反向代理时才读取 RATELIMIT_IP_HEADER，
+# 否则客户端可以伪造请求头绕过限制。逗号分隔的代理 IP，unix 表示通过 Unix socket 连接的代理（REMOTE_ADDR 为空）
+RATELIMIT_TRUSTED_PROXIES = [
+    p.strip() for p in os.environ.get('RATELIMIT_TRUSTED_PROXIES', '').split(',') if p.strip()
+]
+# 反向代理传递客户端 IP 的请求头，Nginx 配置中设置了 X-Real-IP
+RATELIMIT_IP_HEADER = os.environ.get('RATELIMIT_IP_HEADER', 'HTTP_X_REAL_IP')
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -123,3 +187,6 @@ EMAIL_USE_SSL = True
 AI_API_KEY = os.environ.get('AI_API_KEY', '')
 AI_API_URL = os.environ.get('AI_API_URL', 'https://dashscope.aliyuncs.com/compatible-mode/v1/chat/completions')
 AI_MODEL = os.environ.get('AI_MODEL', 'qwen-turbo')
+# 每个 ASGI worker 同时等待的 AI 请求上限，超过时排队；排队超过 AI_QUEUE_TIMEOUT 秒返回繁忙提示
+AI_MAX_CONCURRENCY = int(os.environ.get('AI_MAX_CONCURRENCY', '100'))
+AI_QUEUE_TIMEOUT = float(os.environ.get('AI_QUEUE_TIMEOUT', '30'))
@@ -0,0 +1,32 @@
+"""
+生产环境配置
+在 config/settings.py 的基础上关闭 DEBUG，并显式使用缓存模板加载器：
+模板文件只在每个 worker 第一次用到时读取和编译，之后直接复用编译结果（修改模板后需重启 Gunicorn）。
+
+使用方式: export DJANGO_SETTINGS_MODULE=config.settings_production
+"""
+import copy
+import os
+from .settings import *  # noqa: F401,F403
+from .settings import TEMPLATES
+
+TEMPLATES = copy.deepcopy(TEMPLATES)
+
+DEBUG = False
+
+ALLOWED_HOSTS = [host for host in os.environ.get('ALLOWED_HOSTS', '*').split(',') if host]
+
+# 指定 loaders 时不能同时开启 APP_DIRS，应用目录下的模板（如 admin）由 app_directories 加载器读取
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+# 静态文件名带内容哈希，collectstatic 时裁剪 Bootstrap 样式表并生成 .gz/.br（见 config/storage.py）
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'config.storage.CompressedManifestStaticFilesStorage'},
+}
@@ -0,0 +1,123 @@
+"""
+由 WSGI 应用直接提供静态文件
+没有 Nginx 等前置代理时（设置 SERVE_STATIC=1，见 config/wsgi.py），在进入 Django 之前处理 STATIC_URL 下的请求：
+  - 启动时扫描 STATIC_ROOT 建立索引，请求时不访问文件系统元数据；
+  - 带内容哈希的文件（staticfiles.json 中的文件名）设置一年的 immutable 缓存，其他文件短期缓存并用 ETag 协商；
+  - 按 Accept-Encoding 返回 collectstatic 生成的 .br / .gz 文件；
+  - 使用服务器提供的 wsgi.file_wrapper（Gunicorn 下为 sendfile）发送文件内容。
+"""
+import json
+import mimetypes
+import os
+from email.utils import formatdate
+from urllib.parse import unquote
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'public, max-age=60'
+MANIFEST_NAME = 'staticfiles.json'
+
+# 预压缩文件的后缀，按优先顺序
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+BLOCK_SIZE = 64 * 1024
+
+
+class StaticFile:
+    def __init__(self, path, stat, immutable):
+        self.path = path
+        self.size = stat.st_size
+        self.immutable = immutable
+        self.etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        content_type, _ = mimetypes.guess_type(path)
+        content_type = content_type or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/javascript', 'image/svg+xml'):
+            content_type += '; charset=utf-8'
+        self.content_type = content_type
+        # 编码 -> (文件路径, 大小)
+        self.variants = {}
+
+
+def build_index(root):
+    """URL 中的相对路径 -> StaticFile"""
+    immutable = set()
+    manifest = os.path.join(root, MANIFEST_NAME)
+    if os.path.exists(manifest):
+        with open(manifest, encoding='utf-8') as f:
+            immutable = set(json.load(f).get('paths', {}).values())
+
+    index = {}
+    compressed = []
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            if name.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+                compressed.append((name, path))
+            else:
+                index[name] = StaticFile(path, os.stat(path), name in immutable)
+
+    for name, path in compressed:
+        for encoding, suffix in ENCODINGS:
+            original = index.get(name[:-len(suffix)]) if name.endswith(suffix) else None
+            if original is not None:
+                original.variants[encoding] = (path, os.stat(path).st_size)
+    return index
+
+
+def read_chunks(f):
+    with f:
+        while chunk := f.read(BLOCK_SIZE):
+            yield chunk
+
+
+class StaticFilesMiddleware:
+    """包装 WSGI 应用，STATIC_URL 下的 GET/HEAD 请求直接返回文件，其余请求交给 Django"""
+
+    def __init__(self, application, root, prefix):
+        self.application = application
+        self.prefix = '/' + prefix.strip('/') + '/'
+        self.files = build_index(root)
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if not path.startswith(self.prefix) or environ['REQUEST_METHOD'] not in ('GET', 'HEAD'):
+            return self.application(environ, start_response)
+        static_file = self.files.get(unquote(path[len(self.prefix):]))
+        if static_file is None:
+            return self.application(environ, start_response)
+        return self.serve(static_file, environ, start_response)
+
+    def serve(self, static_file, environ, start_response):
+        path, size = static_file.path, static_file.size
+        headers = [
+            ('Content-Type', static_file.content_type),
+            ('Cache-Control', IMMUTABLE_CACHE_CONTROL if static_file.immutable else DEFAULT_CACHE_CONTROL),
+            ('Last-Modified', static_file.last_modified),
+        ]
+        etag = static_file.etag
+        if static_file.variants:
+            headers.append(('Vary', 'Accept-Encoding'))
+            accept = environ.get('HTTP_ACCEPT_ENCODING', '')
+            for encoding, _ in ENCODINGS:
+                if encoding in static_file.variants and encoding in accept:
+                    path, size = static_file.variants[encoding]
+                    headers.append(('Content-Encoding', encoding))
+                    # 不同编码的内容不同，使用不同的 ETag
+                    etag = f'{etag[:-1]}-{encoding}"'
+                    break
+        headers.append(('ETag', etag))
+
+        if environ.get('HTTP_IF_NONE_MATCH') == etag:
+            start_response('304 Not Modified', headers)
+            return []
+
+        headers.append(('Content-Length', str(size)))
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        f = open(path, 'rb')
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if file_wrapper is not None:
+            return file_wrapper(f, BLOCK_SIZE)
+        return read_chunks(f)
@@ -0,0 +1,95 @@
+"""
+生产环境静态文件存储
+在 ManifestStaticFilesStorage（文件名带内容哈希，可以长期缓存）的基础上，collectstatic 时：
+  1. 按模板和脚本中出现的类名裁剪 Bootstrap 样式表（见 config/csspurge.py），裁剪后再计算哈希；
+  2. 去掉指向不存在的 .map 文件的 sourceMappingURL 注释（未随项目提供 source map）；
+  3. 为文本类文件生成 .gz，安装了 brotli 包时同时生成 .br，由 config/static.py 按 Accept-Encoding 返回。
+"""
+import gzip
+import re
+from pathlib import Path
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from .csspurge import collect_words, purge_css
+
+try:
+    import brotli
+except ImportError:  # 未安装 brotli 时只生成 .gz
+    brotli = None
+
+SOURCE_MAP_RE = re.compile(rb'\n?(?:/\*# sourceMappingURL=\S+ \*/|//# sourceMappingURL=\S+)\s*$')
+
+# 预压缩的文件类型，图片和字体本身已经压缩
+COMPRESS_EXTENSIONS = ('.css', '.js', '.svg', '.txt', '.json', '.xml', '.html', '.ico')
+# 压缩后至少减小这个比例才保留压缩文件
+MIN_COMPRESS_RATIO = 0.95
+
+
+def template_sources():
+    """需要扫描类名的文件：项目模板、非 Django 自带应用的模板和 STATICFILES_DIRS 中的脚本"""
+    dirs = [Path(d) for engine in settings.TEMPLATES for d in engine.get('DIRS', [])]
+    dirs += [
+        Path(app.path) / 'templates' for app in apps.get_app_configs()
+        if not app.name.startswith('django.')
+    ]
+    files = [f for d in dirs if d.is_dir() for f in d.rglob('*.html')]
+    for static_dir in settings.STATICFILES_DIRS:
+        files += Path(static_dir).rglob('*.js')
+    return files
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # 裁剪的样式表（collectstatic 的相对路径）
+    purge_files = ('css/bootstrap.min.css', 'css/bootstrap-icons.css')
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            yield from super().post_process(paths, dry_run, **options)
+            return
+
+        self.preprocess(paths)
+        yield from super().post_process(paths, dry_run, **options)
+
+        for name in paths:
+            hashed_name = self.hashed_files.get(self.hash_key(self.clean_name(name)))
+            if hashed_name and hashed_name.endswith(COMPRESS_EXTENSIONS):
+                self.compress(hashed_name)
+
+    def preprocess(self, paths):
+        """计算哈希之前改写复制到 STATIC_ROOT 的文件；始终从源文件读取，重复执行 collectstatic 结果相同"""
+        words = None
+        for name, (storage, source_path) in paths.items():
+            if not name.endswith(('.css', '.js')):
+                continue
+            with storage.open(source_path) as f:
+                original = content = f.read()
+
+            match = SOURCE_MAP_RE.search(content)
+            if match and not storage.exists(source_path + '.map'):
+                content = content[:match.start()] + b'\n'
+            if name in self.purge_files:
+                if words is None:
+                    words = collect_words(template_sources())
+                content = purge_css(content.decode('utf-8'), words).encode('utf-8')
+
+            if content != original:
+                self.replace(name, content)
+                # 计算哈希时读取改写后的副本，而不是源文件
+                paths[name] = (self, name)
+
+    def compress(self, name):
+        with self.open(name) as f:
+            content = f.read()
+        variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content)))
+        for suffix, compressed in variants:
+            if len(compressed) < len(content) * MIN_COMPRESS_RATIO:
+                self.replace(name + suffix, compressed)
+
+    def replace(self, name, content):
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(content))
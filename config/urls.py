@@ -11,6 +11,10 @@ urlpatterns = [
     # 管理员功能（放在 Django admin 之前）
     path('admin/dashboard/', books_views.admin_dashboard, name='admin_dashboard'),
     path('admin/records/', books_views.all_borrow_records, name='all_borrow_records'),
+    path('admin/export/<str:kind>/', books_views.export_data, name='export_data'),
+    path('admin/metrics/', books_views.performance_metrics, name='performance_metrics'),
+    # books:all_reservations 同样位于 admin/ 下，需在 Django admin 之前匹配
+    path('admin/reservations/', books_views.all_reservations),
 
     # Django admin
     path('admin/', admin.site.urls),
@@ -9,3 +9,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# 没有 Nginx 等前置代理时由 WSGI 应用直接提供 collectstatic 生成的静态文件（见 config/static.py）
+if os.environ.get('SERVE_STATIC') == '1':
+    from django.conf import settings
+    from .static import StaticFilesMiddleware
+
+    application = StaticFilesMiddleware(application, settings.STATIC_ROOT, settings.STATIC_URL)
@@ -0,0 +1,64 @@
+"""
+Gunicorn 配置
+页面和接口由同步 worker 处理；AI 推荐和 AI 对话一次需要等待上游 30～60 秒，
+单独部署为异步应用（config/asgi.py），由 Nginx 按路径转发，慢请求不会占满处理其他页面的 worker。
+
+    gunicorn -c gunicorn.conf.py                      # 页面和接口（config.wsgi，同步 worker）
+    GUNICORN_ROLE=ai gunicorn -c gunicorn.conf.py     # AI 接口（config.asgi，Uvicorn worker）
+
+GUNICORN_ROLE           web（默认）/ ai
+GUNICORN_BIND           监听地址，默认为项目目录下的 gunicorn.sock / gunicorn-ai.sock
+GUNICORN_WORKERS        worker 数量，默认 web 为 CPU 核数 × 2 + 1，ai 为 CPU 核数
+GUNICORN_TIMEOUT        worker 无响应多少秒后重启，默认 web 为 30，ai 为 90
+GUNICORN_MAX_REQUESTS   每个 worker 处理多少个请求后重启，默认 1000，0 为不重启
+"""
+import multiprocessing
+import os
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+ROLE = os.environ.get('GUNICORN_ROLE', 'web')
+CPU_COUNT = multiprocessing.cpu_count()
+
+
+def env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+if ROLE == 'ai':
+    wsgi_app = 'config.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    # 每个 worker 是一个事件循环，可以同时等待大量 AI 请求，按核数即可用满 CPU
+    workers = env_int('GUNICORN_WORKERS', CPU_COUNT)
+    # AI 对话的上游超时为 60 秒
+    timeout = env_int('GUNICORN_TIMEOUT', 90)
+    socket_name = 'gunicorn-ai.sock'
+else:
+    wsgi_app = 'config.wsgi:application'
+    workers = env_int('GUNICORN_WORKERS', CPU_COUNT * 2 + 1)
+    timeout = env_int('GUNICORN_TIMEOUT', 30)
+    socket_name = 'gunicorn.sock'
+
+bind = os.environ.get('GUNICORN_BIND', f'unix:{BASE_DIR / socket_name}')
+
+# 在主进程中加载 Django 后再 fork，worker 共享已导入模块的内存页，启动也更快
+preload_app = True
+
+# 处理一定数量的请求后重启 worker，回收内存碎片；加上随机量，避免所有 worker 同时重启
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = max_requests // 10
+
+graceful_timeout = 30
+
+# worker 心跳文件放在内存文件系统中，磁盘繁忙时 worker 不会因心跳写入阻塞而被误判超时
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+
+def when_ready(server):
+    # 主进程加载应用时打开的数据库连接不能被 fork 出的 worker 共用，fork 之前关闭
+    from django.db import connections
+    connections.close_all()
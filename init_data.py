@@ -370,8 +370,7 @@ for book_data in books_data:
     if created:
         print(f'创建图书: {book.title}')
         # 创建副本
-        for i in range(total_copies):
-            BookCopy.objects.create(book=book)
+        BookCopy.objects.create_many(book, total_copies)
         print(f'  添加 {total_copies} 个副本')
 
 print('\n初始化完成！')
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class UsersConfig(AppConfig):
+    name = 'users'
+
+    def ready(self):
+        # 注册登录用户缓存的信号处理
+        from . import auth_cache  # noqa: F401
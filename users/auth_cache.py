@@ -0,0 +1,96 @@
+"""
+登录用户缓存
+登录后把用户的常用字段快照保存在会话中，之后的请求直接用快照构造用户对象，
+不再查询 users_user 表。快照带有版本号，版本号保存在共享缓存中，
+用户信息（角色、权限、密码等）修改时删除版本号，所有会话中的旧快照立即失效。
+"""
+import uuid
+from django.contrib import auth
+from django.contrib.auth.signals import user_logged_in
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import User
+
+# 会话中保存快照的键
+SESSION_KEY = '_auth_user_snapshot'
+
+# 快照包含的字段，其余字段在访问时按需加载
+SNAPSHOT_FIELDS = ['id', 'username', 'email', 'phone', 'role', 'is_superuser', 'is_staff', 'is_active']
+
+# 版本号在缓存中的有效期（秒），过期后下次请求重新查询用户
+VERSION_TIMEOUT = 600
+
+
+def version_key(user_id):
+    return f'auth:version:{user_id}'
+
+
+def get_version(user_id):
+    """获取用户当前的快照版本号，不存在时生成新版本号"""
+    key = version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # 并发请求同时生成时以先写入的为准
+        cache.add(key, uuid.uuid4().hex, VERSION_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_user(user_id):
+    """使该用户所有会话中的快照失效"""
+    cache.delete(version_key(user_id))
+    # 事务提交后再删除一次，避免提交前有请求读到旧数据并写入新版本号
+    transaction.on_commit(lambda: cache.delete(version_key(user_id)))
+
+
+def store_snapshot(request, user, version=None):
+    """把用户快照写入会话"""
+    if version is None:
+        version = get_version(user.pk)
+    snapshot = {field: getattr(user, field) for field in SNAPSHOT_FIELDS}
+    snapshot['version'] = version
+    request.session[SESSION_KEY] = snapshot
+
+
+def user_from_snapshot(snapshot):
+    """用快照构造用户对象，未包含的字段为延迟加载字段"""
+    # from_db 要求字段按模型定义的顺序排列
+    names = [f.attname for f in User._meta.concrete_fields if f.attname in SNAPSHOT_FIELDS]
+    return User.from_db('default', names, [snapshot[name] for name in names])
+
+
+def get_user(request):
+    """返回当前请求的用户，快照有效时不查询数据库"""
+    user_id = request.session.get(auth.SESSION_KEY)
+    snapshot = request.session.get(SESSION_KEY)
+    if user_id is None:
+        return auth.get_user(request)
+
+    if (snapshot and str(snapshot.get('id')) == str(user_id) and snapshot.get('is_active')
+            and snapshot.get('version') == cache.get(version_key(user_id))):
+        return user_from_snapshot(snapshot)
+
+    # 先取版本号再查询用户，查询之后发生的修改会删除这个版本号
+    version = get_version(user_id)
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        store_snapshot(request, user, version)
+    return user
+
+
+@receiver(user_logged_in)
+def snapshot_on_login(sender, request, user, **kwargs):
+    """登录时直接写入快照，登录后的第一个请求也不需要查询用户"""
+    if request is not None and hasattr(request, 'session'):
+        store_snapshot(request, user)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_on_change(sender, instance, update_fields=None, **kwargs):
+    # 登录时只更新 last_login，不影响快照
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_user(instance.pk)
@@ -0,0 +1,27 @@
+"""
+用户认证中间件
+"""
+from functools import partial
+from asgiref.sync import sync_to_async
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.utils.functional import SimpleLazyObject
+from .auth_cache import get_user
+
+
+def get_cached_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = get_user(request)
+    return request._cached_user
+
+
+async def aget_cached_user(request):
+    return await sync_to_async(get_cached_user)(request)
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """与 Django 自带的认证中间件相同，但优先使用会话中的用户快照"""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
+        request.auser = partial(aget_cached_user, request)
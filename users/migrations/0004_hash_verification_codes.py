@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+def hash_existing_codes(apps, schema_editor):
+    """把已有的明文验证码替换为摘要"""
+    from users.models import hash_verification_code
+
+    EmailVerificationToken = apps.get_model('users', 'EmailVerificationToken')
+    tokens = list(EmailVerificationToken.objects.all())
+    for token in tokens:
+        token.code = hash_verification_code(token.code)
+    EmailVerificationToken.objects.bulk_update(tokens, ['code'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_emailverificationtoken_code_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='emailverificationtoken',
+            name='code',
+            field=models.CharField(max_length=64, verbose_name='验证码摘要'),
+        ),
+        migrations.RunPython(hash_existing_codes, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,8 @@
+from datetime import timedelta
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
 import uuid
 import random
 import string
@@ -32,16 +35,25 @@ class User(AbstractUser):
         return self.role == 'admin' or self.is_superuser
 
 
+# 验证码有效期
+VERIFICATION_CODE_TTL = timedelta(hours=24)
+
+
 def generate_verification_code():
     """生成6位数字验证码"""
     return ''.join(random.choices(string.digits, k=6))
 
 
+def hash_verification_code(code):
+    """验证码的 HMAC 摘要，数据库中不保存明文"""
+    return salted_hmac('users.EmailVerificationToken.code', code).hexdigest()
+
+
 class EmailVerificationToken(models.Model):
     """邮箱验证Token"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='用户')
     token = models.UUIDField(default=uuid.uuid4, unique=True, verbose_name='Token')
-    code = models.CharField(max_length=6, default=generate_verification_code, verbose_name='验证码')
+    code = models.CharField(max_length=64, verbose_name='验证码摘要')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     is_used = models.BooleanField(default=False, verbose_name='是否已使用')
 
@@ -50,4 +62,14 @@ class EmailVerificationToken(models.Model):
         verbose_name_plural = '邮箱验证Token'
 
     def __str__(self):
-        return f'{self.user.username} - {self.code}'
+        return f'{self.user.username} - {self.created_at:%Y-%m-%d %H:%M}'
+
+    def set_code(self, code):
+        self.code = hash_verification_code(code)
+
+    def check_code(self, code):
+        """常量时间比较，避免通过响应时间猜测验证码"""
+        return constant_time_compare(self.code, hash_verification_code(code))
+
+    def is_expired(self):
+        return timezone.now() - self.created_at > VERIFICATION_CODE_TTL
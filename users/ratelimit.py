@@ -0,0 +1,162 @@
+"""
+请求频率限制
+令牌桶保存在共享缓存中，每个桶最多存放 N 个令牌，并按 N 个/周期的速度补充，
+每次请求消耗一个令牌，令牌用完时拒绝请求。
+
+读取令牌桶、计算和写回必须是原子操作，否则并发请求会读到同一个令牌数而多放行请求：
+使用 Redis 时在服务端执行 Lua 脚本；使用文件缓存时通过缓存目录下的文件锁在多个 worker 进程之间串行执行；
+其他缓存只在当前进程内加锁。
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.redis import RedisCache
+from django.http import JsonResponse
+from django.shortcuts import redirect
+
+try:
+    import fcntl
+except ImportError:  # Windows 上没有 fcntl，只在进程内加锁
+    fcntl = None
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600}
+
+LIMITED_MESSAGE = '操作过于频繁，请稍后再试。'
+
+
+def parse_rate(rate):
+    """'5/m' -> (5, 60)"""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period]
+
+
+def client_ip(request):
+    """
+    客户端 IP
+    请求来自 RATELIMIT_TRUSTED_PROXIES 中的反向代理时从 RATELIMIT_IP_HEADER 指定的请求头读取，
+    否则使用 REMOTE_ADDR。通过 Unix socket 连接时 REMOTE_ADDR 为空，对应的代理写作 unix
+    """
+    remote_addr = request.META.get('REMOTE_ADDR', '')
+    if (remote_addr or 'unix') in getattr(settings, 'RATELIMIT_TRUSTED_PROXIES', []):
+        return request.META.get(settings.RATELIMIT_IP_HEADER) or remote_addr
+    return remote_addr
+
+
+KEY_FUNCTIONS = {
+    'ip': client_ip,
+    'user': lambda request: request.user.pk if request.user.is_authenticated else client_ip(request),
+}
+
+
+LOCK_FILE = 'ratelimit.lock'
+
+_lock = threading.Lock()
+
+# 与 take_token 相同的计算，在 Redis 中原子执行。Lua 返回的小数会被截断为整数，等待时间以字符串返回
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - updated) * capacity / period)
+if tokens < 1 then
+    return {0, tostring((1 - tokens) * period / capacity)}
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - 1), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], period)
+return {1, '0'}
+"""
+
+
+@contextmanager
+def bucket_lock(cache):
+    """串行执行令牌桶的读取和写回"""
+    with _lock:
+        if fcntl is None or not isinstance(cache, FileBasedCache):
+            yield
+            return
+        # 文件缓存由同一台服务器上的多个 worker 进程共享，加文件锁
+        os.makedirs(cache._dir, exist_ok=True)
+        with open(os.path.join(cache._dir, LOCK_FILE), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+
+def take_token(bucket, capacity, period):
+    """从令牌桶中取一个令牌，返回 (是否成功, 需要等待的秒数)"""
+    cache = caches[DEFAULT_CACHE_ALIAS]
+    now = time.time()
+    key = f'ratelimit:{bucket}'
+    if isinstance(cache, RedisCache):
+        key = cache.make_and_validate_key(key)
+        client = cache._cache.get_client(key, write=True)
+        allowed, retry_after = client.eval(TOKEN_BUCKET_SCRIPT, 1, key, capacity, period, now)
+        return bool(allowed), float(retry_after)
+
+    with bucket_lock(cache):
+        tokens, updated = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * capacity / period)
+        if tokens < 1:
+            return False, (1 - tokens) * period / capacity
+        cache.set(key, (tokens - 1, now), period)
+    return True, 0
+
+
+def rate_limit(scope, rate, key='ip', methods=('POST',)):
+    """
+    频率限制装饰器
+    scope: 限制的名称，不同视图使用不同的桶
+    rate: 如 '5/m' 表示每分钟 5 次
+    key: 'ip'、'user' 或接收 request 返回标识的函数，返回 None 时不限制
+    """
+    capacity, period = parse_rate(rate)
+    key_func = KEY_FUNCTIONS.get(key, key)
+
+    def decorator(view_func):
+        def limited_response(request):
+            """消耗一个令牌，令牌用完时返回拒绝请求的响应，否则返回 None"""
+            if not getattr(settings, 'RATELIMIT_ENABLED', True) or request.method not in methods:
+                return None
+            ident = key_func(request)
+            if ident is None:
+                return None
+
+            allowed, retry_after = take_token(f'{scope}:{ident}', capacity, period)
+            if allowed:
+                return None
+
+            if request.content_type == 'application/json':
+                response = JsonResponse({'success': False, 'message': LIMITED_MESSAGE}, status=429)
+            else:
+                messages.error(request, LIMITED_MESSAGE)
+                response = redirect(request.get_full_path())
+            response['Retry-After'] = str(int(retry_after) + 1)
+            return response
+
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                # 读取用户和缓存可能访问数据库或文件，在线程中执行
+                response = await sync_to_async(limited_response)(request)
+                if response is None:
+                    response = await view_func(request, *args, **kwargs)
+                return response
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = limited_response(request)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,65 @@
+"""
+登录用户缓存测试
+"""
+import json
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from users.models import User
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class AuthSnapshotTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('reader', 'reader@example.com', 'reader123')
+        self.client.force_login(self.user)
+
+    def get_with_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        user_queries = [q['sql'] for q in ctx.captured_queries if 'FROM "users_user"' in q['sql']]
+        return response, user_queries
+
+    def test_logged_in_request_skips_user_query(self):
+        response, user_queries = self.get_with_queries(reverse('users:edit_profile'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'reader@example.com')
+        self.assertEqual(user_queries, [])
+
+    def test_role_change_invalidates_snapshot(self):
+        url = reverse('admin_dashboard')
+        self.assertRedirects(self.client.get(url), reverse('books:index'), fetch_redirect_response=False)
+
+        user = User.objects.get(pk=self.user.pk)
+        user.role = 'admin'
+        user.save()
+        response, user_queries = self.get_with_queries(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(user_queries), 1)
+
+        user.role = 'user'
+        user.save()
+        self.assertRedirects(self.client.get(url), reverse('books:index'), fetch_redirect_response=False)
+
+    def test_upgrade_admin_refreshes_snapshot(self):
+        response = self.client.post(
+            reverse('books:upgrade_admin'), json.dumps({'code': 'wky666'}), content_type='application/json'
+        )
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(User.objects.get(pk=self.user.pk).role, 'admin')
+
+        response, user_queries = self.get_with_queries(reverse('admin_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(user_queries, [])
+
+    def test_deactivated_user_is_logged_out(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        User.objects.get(pk=self.user.pk).save(update_fields=['is_active'])
+        response = self.client.get(reverse('users:profile'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('users:login'), response['Location'])
@@ -0,0 +1,64 @@
+"""
+个人中心测试
+"""
+from datetime import timedelta
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from books.models import Book, BorrowRecord, get_loan_summary
+from users.models import User
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ProfileViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', 'reader@example.com', 'reader123')
+        cls.book = Book.objects.create(isbn='9787111111111', title='测试图书', author='作者')
+        now = timezone.now()
+        cls.overdue = BorrowRecord.objects.create(user=cls.user, book=cls.book, due_date=now - timedelta(days=2))
+        cls.due_soon = BorrowRecord.objects.create(user=cls.user, book=cls.book, due_date=now + timedelta(days=2, hours=1))
+        returned = [
+            BorrowRecord(user=cls.user, book=cls.book, due_date=now, status='returned', return_date=now)
+            for _ in range(25)
+        ]
+        BorrowRecord.objects.bulk_create(returned)
+        # 借阅时间相同时按 ID 排序
+        BorrowRecord.objects.filter(status='returned').update(borrow_date=now - timedelta(days=40))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_due_status_matches_python(self):
+        overdue_half_day = BorrowRecord.objects.create(
+            user=self.user, book=self.book, due_date=timezone.now() - timedelta(days=1, hours=12),
+        )
+        records = {r.pk: r for r in BorrowRecord.objects.with_due_status()}
+        for record in BorrowRecord.objects.all():
+            self.assertEqual(records[record.pk].overdue, record.is_overdue())
+            self.assertEqual(records[record.pk].days_left, record.days_remaining())
+        # 逾期 1.5 天向下取整为 -2 天
+        self.assertEqual(records[overdue_half_day.pk].days_left, -2)
+
+    def test_history_keyset_pagination(self):
+        seen = []
+        url = reverse('users:profile')
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(len(response.context['current_borrows']), 2)
+            seen += [r.pk for r in response.context['history_borrows']]
+            cursor = response.context['next_cursor']
+            url = f"{reverse('users:profile')}?before={cursor}" if cursor else None
+
+        expected = list(BorrowRecord.objects.filter(status='returned').order_by('-borrow_date', '-pk')
+                        .values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_loan_summary_is_invalidated(self):
+        self.assertEqual(get_loan_summary(self.user.pk), {'active_loans': 2, 'overdue': 1, 'reservations': 0})
+        self.due_soon.status = 'returned'
+        self.due_soon.save()
+        self.assertEqual(get_loan_summary(self.user.pk)['active_loans'], 1)
@@ -0,0 +1,168 @@
+"""
+频率限制测试
+"""
+import json
+import shutil
+import tempfile
+import threading
+from unittest import mock
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages import get_messages
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from users.models import User
+from users.ratelimit import LIMITED_MESSAGE, client_ip, parse_rate, rate_limit, take_token
+
+
+@rate_limit('test', '2/m')
+def ip_view(request):
+    return HttpResponse('ok')
+
+
+@rate_limit('test_user', '2/m', key='user')
+def user_view(request):
+    return HttpResponse('ok')
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    RATELIMIT_ENABLED=True,
+    RATELIMIT_TRUSTED_PROXIES=[],
+)
+class RateLimitTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def post(self, view, user=None, remote_addr='10.0.0.1', **kwargs):
+        request = self.factory.post('/login/?next=/', REMOTE_ADDR=remote_addr, **kwargs)
+        request.user = user or AnonymousUser()
+        request._messages = CookieStorage(request)
+        return request, view(request)
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('5/m'), (5, 60))
+        self.assertEqual(parse_rate('10/s'), (10, 1))
+        self.assertEqual(parse_rate('5/h'), (5, 3600))
+
+    def test_tokens_exhausted_and_refilled(self):
+        with mock.patch('users.ratelimit.time.time', return_value=1000.0) as now:
+            self.assertEqual(take_token('bucket', 2, 60), (True, 0))
+            self.assertEqual(take_token('bucket', 2, 60), (True, 0))
+            allowed, retry_after = take_token('bucket', 2, 60)
+            self.assertFalse(allowed)
+            self.assertAlmostEqual(retry_after, 30)
+
+            # 每 30 秒补充一个令牌
+            now.return_value = 1015.0
+            allowed, retry_after = take_token('bucket', 2, 60)
+            self.assertFalse(allowed)
+            self.assertAlmostEqual(retry_after, 15)
+            now.return_value = 1030.0
+            self.assertEqual(take_token('bucket', 2, 60), (True, 0))
+            self.assertFalse(take_token('bucket', 2, 60)[0])
+
+            # 补充的令牌不超过容量
+            now.return_value = 2000.0
+            self.assertEqual([take_token('bucket', 2, 60)[0] for _ in range(3)], [True, True, False])
+
+    def test_limited_form_post_redirects_with_message(self):
+        for _ in range(2):
+            self.assertEqual(self.post(ip_view)[1].content, b'ok')
+        request, response = self.post(ip_view)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.url, '/login/?next=/')
+        self.assertIn('Retry-After', response)
+        self.assertEqual([str(m) for m in get_messages(request)], [LIMITED_MESSAGE])
+
+    @mock.patch('users.ratelimit.time.time', return_value=1000.0)
+    def test_limited_json_post_returns_429(self, now):
+        for _ in range(2):
+            self.post(ip_view, content_type='application/json', data='{}')
+        _, response = self.post(ip_view, content_type='application/json', data='{}')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(json.loads(response.content), {'success': False, 'message': LIMITED_MESSAGE})
+        self.assertEqual(response['Retry-After'], '31')
+
+    def test_get_not_limited(self):
+        for _ in range(3):
+            request = self.factory.get('/login/')
+            self.assertEqual(ip_view(request).status_code, 200)
+
+    def test_ip_key(self):
+        for _ in range(2):
+            self.post(ip_view)
+        self.assertEqual(self.post(ip_view)[1].status_code, 302)
+        # 其他 IP 使用各自的令牌桶
+        self.assertEqual(self.post(ip_view, remote_addr='10.0.0.2')[1].status_code, 200)
+
+    def test_user_key(self):
+        alice, bob = User(pk=1, username='alice'), User(pk=2, username='bob')
+        for _ in range(2):
+            self.post(user_view, user=alice)
+        self.assertEqual(self.post(user_view, user=alice, remote_addr='10.0.0.2')[1].status_code, 302)
+        # 同一 IP 的其他用户不受影响
+        self.assertEqual(self.post(user_view, user=bob)[1].status_code, 200)
+        # 未登录时按 IP 限制
+        for _ in range(2):
+            self.assertEqual(self.post(user_view)[1].status_code, 200)
+        self.assertEqual(self.post(user_view)[1].status_code, 302)
+
+    @override_settings(RATELIMIT_ENABLED=False)
+    def test_disabled(self):
+        for _ in range(3):
+            self.assertEqual(self.post(ip_view)[1].status_code, 200)
+
+
+@override_settings(RATELIMIT_IP_HEADER='HTTP_X_REAL_IP')
+class ClientIPTests(SimpleTestCase):
+
+    def ip(self, **meta):
+        return client_ip(RequestFactory().get('/', **meta))
+
+    @override_settings(RATELIMIT_TRUSTED_PROXIES=[])
+    def test_header_ignored_by_default(self):
+        self.assertEqual(self.ip(REMOTE_ADDR='203.0.113.5', HTTP_X_REAL_IP='1.2.3.4'), '203.0.113.5')
+
+    @override_settings(RATELIMIT_TRUSTED_PROXIES=['127.0.0.1'])
+    def test_header_read_from_trusted_proxy(self):
+        self.assertEqual(self.ip(REMOTE_ADDR='127.0.0.1', HTTP_X_REAL_IP='1.2.3.4'), '1.2.3.4')
+        self.assertEqual(self.ip(REMOTE_ADDR='127.0.0.1'), '127.0.0.1')
+        self.assertEqual(self.ip(REMOTE_ADDR='203.0.113.5', HTTP_X_REAL_IP='1.2.3.4'), '203.0.113.5')
+
+    def test_unix_socket_proxy(self):
+        with override_settings(RATELIMIT_TRUSTED_PROXIES=['unix']):
+            self.assertEqual(self.ip(REMOTE_ADDR='', HTTP_X_REAL_IP='1.2.3.4'), '1.2.3.4')
+        with override_settings(RATELIMIT_TRUSTED_PROXIES=[]):
+            self.assertEqual(self.ip(REMOTE_ADDR='', HTTP_X_REAL_IP='1.2.3.4'), '')
+
+
+class FileCacheTokenBucketTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        settings = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': self.cache_dir,
+        }})
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_concurrent_requests_take_at_most_capacity(self):
+        barrier = threading.Barrier(20)
+        results = []
+
+        def take():
+            barrier.wait()
+            results.append(take_token('login:127.0.0.1', 5, 60)[0])
+
+        threads = [threading.Thread(target=take) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 5)
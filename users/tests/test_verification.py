@@ -0,0 +1,64 @@
+"""
+验证码与频率限制测试
+"""
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from users.models import EmailVerificationToken, User
+from users.utils import send_verification_email
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class VerificationCodeTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('pending', 'pending@example.com', 'pending123', is_active=False)
+        session = self.client.session
+        session['pending_user_id'] = self.user.pk
+        session.save()
+
+    def send_code(self):
+        send_verification_email(self.user)
+        return mail.outbox[-1].body.split('验证码是：')[1][:6]
+
+    def test_code_is_stored_hashed(self):
+        code = self.send_code()
+        token = EmailVerificationToken.objects.get(user=self.user)
+        self.assertNotEqual(token.code, code)
+        self.assertTrue(token.check_code(code))
+        self.assertFalse(token.check_code('000000' if code != '000000' else '111111'))
+
+    def test_resend_reuses_token(self):
+        first = self.send_code()
+        second = self.send_code()
+        token = EmailVerificationToken.objects.get(user=self.user)
+        self.assertTrue(token.check_code(second))
+        if first != second:
+            self.assertFalse(token.check_code(first))
+
+    def test_verify_code_activates_user(self):
+        code = self.send_code()
+        response = self.client.post(reverse('users:verify_code'), {'code': code})
+        self.assertRedirects(response, reverse('users:login'), fetch_redirect_response=False)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+
+    def test_verify_code_attempts_are_limited(self):
+        code = self.send_code()
+        wrong = '000000' if code != '000000' else '111111'
+        for _ in range(5):
+            self.assertEqual(self.client.post(reverse('users:verify_code'), {'code': wrong}).status_code, 200)
+
+        # 超过次数后即使验证码正确也会被拒绝
+        response = self.client.post(reverse('users:verify_code'), {'code': code})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], reverse('users:verify_code'))
+        self.assertIn('Retry-After', response)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
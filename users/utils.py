@@ -1,15 +1,25 @@
+import uuid
 from django.core.mail import send_mail
 from django.conf import settings
-from .models import EmailVerificationToken
+from django.utils import timezone
+from .models import EmailVerificationToken, generate_verification_code
 
 
 def send_verification_email(user, request=None):
     """发送验证码邮件"""
-    # 删除该用户之前未使用的验证码
-    EmailVerificationToken.objects.filter(user=user, is_used=False).delete()
-
-    # 创建新的验证Token（包含验证码）
-    token = EmailVerificationToken.objects.create(user=user)
+    code = generate_verification_code()
+
+    # 重新发送时复用该用户未使用的验证Token，只更新验证码和创建时间
+    token = EmailVerificationToken.objects.filter(user=user, is_used=False).order_by('-created_at').first()
+    if token:
+        token.set_code(code)
+        token.token = uuid.uuid4()
+        token.created_at = timezone.now()
+        token.save(update_fields=['code', 'token', 'created_at'])
+    else:
+        token = EmailVerificationToken(user=user)
+        token.set_code(code)
+        token.save()
 
     # 邮件内容
     subject = '【图书管理系统】邮箱验证码'
@@ -18,7 +28,7 @@ def send_verification_email(user, request=None):
 
 感谢您注册图书管理系统！
 
-您的邮箱验证码是：{token.code}
+您的邮箱验证码是：{code}
 
 验证码有效期为24小时，请尽快完成验证。
 
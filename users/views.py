@@ -3,12 +3,14 @@ from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.views.decorators.http import require_POST
-from django.utils import timezone
-from datetime import timedelta
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from datetime import datetime, timedelta, timezone as dt_timezone
 from .forms import UserRegisterForm, UserLoginForm, UserProfileForm
 from .models import EmailVerificationToken, User
+from .ratelimit import rate_limit
 from .utils import send_verification_email
-from books.models import BorrowRecord
+from books.models import ArchivedBorrowRecord, BorrowRecord
 
 
 def register_view(request):
@@ -38,6 +40,7 @@ def register_view(request):
     return render(request, 'users/register.html', {'form': form})
 
 
+@rate_limit('login', '10/m')
 def login_view(request):
     """用户登录"""
     if request.user.is_authenticated:
@@ -65,19 +68,73 @@ def logout_view(request):
     return redirect('users:login')
 
 
+# 个人中心每页显示的历史记录数
+HISTORY_PAGE_SIZE = 10
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_history_cursor(record):
+    """历史记录分页游标：借阅时间（微秒）和记录ID"""
+    micros = (record.borrow_date - EPOCH) // timedelta(microseconds=1)
+    return f'{micros}_{record.pk}'
+
+
+def decode_history_cursor(cursor):
+    try:
+        micros, pk = cursor.split('_')
+        return EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (ValueError, OverflowError):
+        return None
+
+
 @login_required
 def profile_view(request):
     """用户个人中心"""
-    borrow_records = BorrowRecord.objects.filter(
-        user=request.user
-    ).select_related('book').order_by('-borrow_date')
-
-    current_borrows = borrow_records.filter(status='borrowed')
-    history_borrows = borrow_records.filter(status='returned')
+    # 历史记录按 (借阅时间, ID) 做游标分页，不使用 OFFSET
+    history = Q(status='returned')
+    cursor = decode_history_cursor(request.GET.get('before', ''))
+    if cursor:
+        borrow_date, pk = cursor
+        history &= Q(borrow_date__lt=borrow_date) | Q(borrow_date=borrow_date, pk__lt=pk)
+
+    # 当前借阅和一页历史记录在同一条查询中取出，逾期状态和剩余天数在 SQL 中计算
+    records = list(
+        BorrowRecord.objects.filter(user=request.user)
+        .filter(Q(status='borrowed') | history)
+        .select_related('book', 'book_copy')
+        .with_due_status()
+        .annotate(status_rank=Window(
+            RowNumber(),
+            partition_by=[F('status')],
+            order_by=[F('borrow_date').desc(), F('pk').desc()],
+        ))
+        .filter(Q(status='borrowed') | Q(status_rank__lte=HISTORY_PAGE_SIZE + 1))
+        .order_by('-borrow_date', '-pk')
+    )
+
+    # 已归档的历史记录单独取一页后合并（UNION 查询不支持 select_related），两页合并后取前 N 条即为完整结果
+    archived = list(
+        ArchivedBorrowRecord.objects.filter(Q(user=request.user) & history)
+        .select_related('book', 'book_copy')
+        .order_by('-borrow_date', '-pk')[:HISTORY_PAGE_SIZE + 1]
+    )
+
+    current_borrows = [r for r in records if r.status == 'borrowed']
+    history_borrows = sorted(
+        [r for r in records if r.status == 'returned'] + archived,
+        key=lambda r: (r.borrow_date, r.pk), reverse=True,
+    )
+    next_cursor = None
+    if len(history_borrows) > HISTORY_PAGE_SIZE:
+        history_borrows = history_borrows[:HISTORY_PAGE_SIZE]
+        next_cursor = encode_history_cursor(history_borrows[-1])
 
     context = {
         'current_borrows': current_borrows,
-        'history_borrows': history_borrows[:10],  # 最近10条历史记录
+        'history_borrows': history_borrows,
+        'next_cursor': next_cursor,
+        'is_first_page': cursor is None,
     }
     return render(request, 'users/profile.html', context)
 
@@ -102,6 +159,8 @@ def verification_sent_view(request):
     return redirect('users:verify_code')
 
 
+@rate_limit('verify_code', '10/m')
+@rate_limit('verify_code_user', '5/m', key=lambda request: request.session.get('pending_user_id'))
 def verify_code_view(request):
     """验证码输入页面"""
     # 获取待验证用户
@@ -123,16 +182,15 @@ def verify_code_view(request):
             messages.error(request, '请输入验证码。')
             return render(request, 'users/verify_code.html', {'email': user.email})
 
-        # 验证验证码
-        try:
-            verification = EmailVerificationToken.objects.get(
-                user=user,
-                code=code,
-                is_used=False
-            )
+        # 验证验证码（数据库中保存的是摘要，取最新的验证Token比较）
+        verification = EmailVerificationToken.objects.filter(
+            user=user,
+            is_used=False
+        ).order_by('-created_at').first()
 
+        if verification and verification.check_code(code):
             # 检查验证码是否过期（24小时有效）
-            if timezone.now() - verification.created_at > timedelta(hours=24):
+            if verification.is_expired():
                 messages.error(request, '验证码已过期，请点击重新发送。')
                 return render(request, 'users/verify_code.html', {'email': user.email})
 
@@ -151,9 +209,8 @@ def verify_code_view(request):
             messages.success(request, '邮箱验证成功！您现在可以登录了。')
             return redirect('users:login')
 
-        except EmailVerificationToken.DoesNotExist:
-            messages.error(request, '验证码错误，请重新输入。')
-            return render(request, 'users/verify_code.html', {'email': user.email})
+        messages.error(request, '验证码错误，请重新输入。')
+        return render(request, 'users/verify_code.html', {'email': user.email})
 
     return render(request, 'users/verify_code.html', {'email': user.email})
 
@@ -163,7 +220,7 @@ def verify_email_view(request, token):
     try:
         verification = EmailVerificationToken.objects.get(token=token, is_used=False)
         # 检查Token是否过期（24小时有效）
-        if timezone.now() - verification.created_at > timedelta(hours=24):
+        if verification.is_expired():
             messages.error(request, '验证链接已过期，请重新注册或申请新的验证邮件。')
             return redirect('users:login')
 
@@ -184,6 +241,7 @@ def verify_email_view(request, token):
         return redirect('users:login')
 
 
+@rate_limit('resend_verification', '5/h')
 def resend_verification_view(request):
     """重新发送验证码"""
     pending_user_id = request.session.get('pending_user_id')